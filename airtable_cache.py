@@ -0,0 +1,81 @@
+# ------------------------------------------------------------------------
+# MEMÒRIA CAU COMPARTIDA DE TAULES AIRTABLE
+# ------------------------------------------------------------------------
+# Streamlit torna a executar app.py a cada interacció, però els mòduls
+# importats només es carreguen un cop per procés. Per això la memòria cau
+# viu aquí: la comparteixen totes les sessions i totes les execucions.
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+DEFAULT_TTL = 60     # Segons que una taula es considera vigent
+MAX_ENTRIES = 32     # Nombre màxim d'entrades (taula + vista) guardades
+
+
+def cache_key(url):
+    """
+    Torna la clau (taula, vista) per a una URL d'Airtable, ex:
+       ".../appXXX/tblYYY?view=Grid%20view" -> ("tblYYY", "Grid view")
+    """
+    parts = urlsplit(url)
+    table = parts.path.rstrip("/").split("/")[-1]
+    view = parse_qs(parts.query).get("view", [None])[0]
+    return (table, view)
+
+
+class TableCache:
+    """
+    Memòria cau LRU amb caducitat (TTL) per taula.
+    Les claus són tuples on el primer element és la ID de la taula (tblXXX),
+    de manera que invalidate(taula) pot esborrar totes les vistes d'una taula.
+    """
+
+    def __init__(self, default_ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.ttls = {}                  # {tblXXX: segons}
+        self._entries = OrderedDict()   # {clau: (caduca_a, valor)}
+        self._lock = threading.Lock()
+
+    def set_ttl(self, table, seconds):
+        """Defineix el TTL (segons) d'una taula concreta."""
+        self.ttls[table] = seconds
+
+    def get(self, key):
+        """Torna el valor guardat o None si no hi és o ha caducat."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Guarda un valor i descarta les entrades més antigues si cal."""
+        ttl = self.ttls.get(key[0], self.default_ttl)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table):
+        """Esborra totes les entrades (totes les vistes) d'una taula."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == table]:
+                del self._entries[key]
+
+    def clear(self):
+        """Buida completament la memòria cau."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Instàncies úniques per procés: taules senceres i índexs de camps vinculats
+table_cache = TableCache()
+lookup_cache = TableCache(max_entries=64)
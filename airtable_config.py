@@ -0,0 +1,29 @@
+# ------------------------------------------------------------------------
+# CONFIGURACIÓ AIRTABLE (compartida per l'app, els scripts i les eines)
+# ------------------------------------------------------------------------
+import os
+
+AIRTABLE_PAT = "patDfe6ImZED5kfAE.efc27c8fe110443953d082a7e16aae214abbde770d3574c4fdf71d3cc10024ce"  # PAT complet
+BASE_ID = "appIEZptaG5k4Auvh"               # ID de la base de dades
+
+# IDs (tblXXXX) de cada taula Airtable 
+COMANDA_TABLE = "tblydBjfNU9RNCVEl"
+DETALL_TABLE = "tbllukBPzzo83xCe3"
+INVENTARI_TABLE = "tbl4zHZASfatnnCNr"
+CLIENT_TABLE = "tblpi3BYithjP2wI5"
+
+# Arrel de l'API. Es pot apuntar al servidor local (mock_airtable.py) amb
+#     AIRTABLE_API_URL=http://127.0.0.1:8765/v0
+API_URL = os.environ.get("AIRTABLE_API_URL", "https://api.airtable.com/v0").rstrip("/")
+
+# URLs per fer servir les API d'Airtable
+comanda_url = f"{API_URL}/{BASE_ID}/{COMANDA_TABLE}"
+detall_url = f"{API_URL}/{BASE_ID}/{DETALL_TABLE}"
+inventari_url = f"{API_URL}/{BASE_ID}/{INVENTARI_TABLE}"
+client_url = f"{API_URL}/{BASE_ID}/{CLIENT_TABLE}"
+
+# Capçaleres API
+headers = {
+    "Authorization": f"Bearer {AIRTABLE_PAT}",
+    "Content-Type": "application/json"
+}
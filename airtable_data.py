@@ -0,0 +1,371 @@
+# ------------------------------------------------------------------------
+# CAPA DE DADES AIRTABLE (lectura, camps vinculats i escriptures)
+# ------------------------------------------------------------------------
+# Funcions que fan servir les pantalles d'app.py. Viuen en un mòdul a part
+# perquè es puguin importar fora de Streamlit (benchmark.py, scripts).
+import asyncio
+import logging
+
+import pandas as pd
+import streamlit as st
+
+from airtable_cache import table_cache, lookup_cache, cache_key
+from airtable_http import get_client
+from airtable_parser import parse_records
+from airtable_sync import sync_table, AirtableSyncError
+from instrumentation import record, table_label, timed
+from snapshot_store import seed_sync_snapshot
+
+# ------------------------------------------------------------------------
+# 1 CONFIGURACIÓ AIRTABLE
+# ------------------------------------------------------------------------
+# PAT, base, IDs de taula, URLs i capçaleres són a airtable_config.py
+from airtable_config import COMANDA_TABLE, DETALL_TABLE, INVENTARI_TABLE, CLIENT_TABLE, headers
+
+# Client HTTP compartit (pool de connexions, límit de 5 peticions/s i reintents)
+client = get_client(headers)
+
+# Temps de vida (segons) de cada taula a la memòria cau compartida
+CACHE_TTLS = {
+    COMANDA_TABLE: 30,
+    DETALL_TABLE: 30,
+    INVENTARI_TABLE: 60,
+    CLIENT_TABLE: 300
+}
+for table_id, ttl in CACHE_TTLS.items():
+    table_cache.set_ttl(table_id, ttl)
+    lookup_cache.set_ttl(table_id, ttl)
+
+# Taules que mostren camps vinculats (o lookups) d'una altra taula.
+# Quan s'escriu a la taula de la clau, també cal invalidar aquestes.
+LINKED_TABLES = {
+    COMANDA_TABLE: [CLIENT_TABLE, DETALL_TABLE],
+    DETALL_TABLE: [COMANDA_TABLE, INVENTARI_TABLE],
+    INVENTARI_TABLE: [DETALL_TABLE],
+    CLIENT_TABLE: [COMANDA_TABLE]
+}
+
+# Taules que es llegeixen en mode sincronització incremental
+# (snapshot local + només els registres modificats des de l'última lectura).
+# En arrencar, el snapshot s'omple des dels fitxers Parquet de snapshot_store.
+SYNC_TABLES = {COMANDA_TABLE, DETALL_TABLE, INVENTARI_TABLE, CLIENT_TABLE}
+
+# Camp que es demana per reconciliar registres esborrats (resposta mínima)
+RECONCILE_FIELDS = {
+    COMANDA_TABLE: "OrderID",
+    DETALL_TABLE: "Quantity",
+    INVENTARI_TABLE: "ProductID",
+    CLIENT_TABLE: "CustomerID"
+}
+
+# ------------------------------------------------------------------------
+# 2 FUNCIONS AUXILIARS (GET, CREATE, UPDATE)
+# ------------------------------------------------------------------------
+
+# Funció per preparar els paràmetres d'una consulta a Airtable
+def query_params(fields=None, formula=None, sort=None, page_size=None):
+    """
+    Converteix les opcions d'una consulta als paràmetres GET d'Airtable:
+      - fields: llista de camps a retornar (projecció)
+      - formula: filterByFormula (només els registres que la compleixen)
+      - sort: llista de camps o de parelles (camp, "asc"/"desc")
+      - page_size: registres per pàgina (màxim 100)
+    """
+    params = {}
+    if fields:
+        params["fields[]"] = list(fields)
+    if formula:
+        params["filterByFormula"] = formula
+    for i, item in enumerate(sort or []):
+        field, direction = (item, "asc") if isinstance(item, str) else item
+        params[f"sort[{i}][field]"] = field
+        params[f"sort[{i}][direction]"] = direction
+    if page_size:
+        params["pageSize"] = min(int(page_size), 100)
+    return params
+
+
+def _query_key(params):
+    """Part de la clau de memòria cau que identifica la consulta (hashable)."""
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+
+
+def _project(df, fields):
+    """Es queda amb els camps demanats + 'record_id' (els que falten, buits)."""
+    return df.reindex(columns=[c for c in fields if c != "record_id"] + ["record_id"])
+
+
+# Funció per llegir una taula sense fer servir Streamlit (es pot cridar des de fils)
+def fetch_table(url, use_cache=True, fields=None, formula=None, sort=None, page_size=None):
+    """
+    Llegeix tots els registres de la taula a la URL donada (fent pàgines successives)
+    i torna (DataFrame, error). El DataFrame té els camps + la columna 'record_id'
+    interna d'Airtable (amb els tipus d'airtable_parser.py: vinculats com a
+    list<string> d'Arrow, enters Int32, dates datetime64); error és None o el missatge a mostrar.
+    Si use_cache=True, primer es mira la memòria cau compartida (taula + vista + consulta).
+    Amb fields/formula/sort/page_size (vegeu query_params) Airtable només envia les
+    columnes i files demanades; sense cap d'aquests es llegeix la taula sencera.
+    """
+    params = query_params(fields, formula, sort, page_size)
+    key = cache_key(url) + (_query_key(params),) if params else cache_key(url)
+    if use_cache:
+        cached = table_cache.get(key)
+        record("cache", f"{'hit' if cached is not None else 'miss'} {table_label(url)}")
+        if cached is not None:
+            # Tornem una còpia perquè les pantalles modifiquen el DataFrame
+            return cached.copy(), None
+
+    # Taules grans: sincronització incremental en lloc de paginar-ho tot.
+    # Una projecció (només fields) té el seu propi snapshot amb aquests camps.
+    if key[0] in SYNC_TABLES and not formula and not sort:
+        try:
+            # Primera lectura del procés: partim del fitxer local (memory-map), només
+            # amb les columnes de la projecció
+            seed_sync_snapshot(url, fields)
+        except (OSError, ValueError, KeyError) as e:
+            logging.getLogger("airtable").warning("No s'ha pogut llegir el snapshot local: %s", e)
+        try:
+            df = sync_table(url, client, id_field=RECONCILE_FIELDS.get(key[0]), fields=fields)
+        except AirtableSyncError as e:
+            return pd.DataFrame(), f"Error al sincronitzar dades ({e})"
+        if fields:
+            df = _project(df, fields)
+        if use_cache:
+            table_cache.put(key, df)
+            lookup_cache.invalidate(key[0])  # Els índexs vinculats eren del snapshot anterior
+            return df.copy(), None
+        return df, None
+
+    all_records = []  # Aquí anirem acumulant tots els registres
+    error = None      # Missatge si la paginació s'ha interromput
+    offset = None     # Parametre per la paginació
+    while True:
+        # Preparem els paràmetres de la crida GET. Si tenim offset, l'afegim.
+        page_params = dict(params)
+        if offset:
+            page_params["offset"] = offset
+
+        # Fem la crida GET amb la pàgina corresponent
+        response = client.get(url, params=page_params)
+
+        if response.status_code != 200:
+            error = (f"Error al obtenir dades (HTTP {response.status_code}): {response.text}. "
+                     "La taula mostrada pot estar incompleta.")
+            break
+
+        # Convertim la resposta a JSON i recollim els registres
+        data_json = response.json()
+        records = data_json.get("records", [])
+        record("page", table_label(url), rows=len(records))
+
+        # Afegim els registres de la pàgina (id + fields) a la llista 'all_records'
+        all_records.extend(records)
+
+        # Mirem si Airtable ens ha retornat un 'offset' per a la pàgina següent
+        offset = data_json.get("offset")
+
+        # Si no hi ha 'offset', vol dir que ja hem arribat a l'última pàgina
+        if not offset:
+            break
+
+    # Columnes amb tipus (vinculats com a list<string>, enters, dates): airtable_parser.py
+    with timed("transform", "records_to_dataframe", rows=len(all_records)):
+        df = parse_records(all_records, key[0])
+    if fields:
+        # Airtable omet els camps buits: garantim les columnes demanades
+        df = _project(df, fields)
+
+    # Només guardem taules completes (mai una paginació truncada)
+    if use_cache and error is None:
+        table_cache.put(key, df)
+        lookup_cache.invalidate(key[0])  # Els índexs vinculats eren del snapshot anterior
+        return df.copy(), None
+    return df, error
+
+
+# Funció per llegir dades de la taula a la URL donada
+def get_airtable_data(url, use_cache=True, fields=None, formula=None, sort=None, page_size=None):
+    """
+    Llegeix els registres de la taula a la URL donada i torna un DataFrame
+    amb els seus camps + la columna 'record_id'. Els errors es mostren a la pantalla.
+    Opcionalment es pot limitar a uns camps (fields), filtrar (formula, filterByFormula
+    d'Airtable), ordenar (sort) i triar la mida de pàgina (page_size).
+    """
+    df, error = fetch_table(url, use_cache, fields, formula, sort, page_size)
+    if error:
+        st.error(error)
+    return df
+
+
+# Funció per llegir diverses taules alhora
+async def _fetch_tables_async(queries):
+    # Cada taula en un fil; el client compartit manté el límit de 5 peticions/s
+    return await asyncio.gather(*(asyncio.to_thread(fetch_table, url, **query) for url, query in queries))
+
+def load_tables(urls):
+    """
+    Llegeix en paral·lel totes les taules que necessita una pantalla.
+    urls és un diccionari {nom: url} o {nom: (url, consulta)}, on consulta és un
+    diccionari amb les opcions de get_airtable_data (fields, formula, sort, page_size).
+    Torna {nom: DataFrame}.
+    La latència queda marcada per la taula més lenta, no per la suma de totes.
+    """
+    queries = [value if isinstance(value, tuple) else (value, {}) for value in urls.values()]
+    results = asyncio.run(_fetch_tables_async(queries))
+    tables = {}
+    for name, (df, error) in zip(urls.keys(), results):
+        if error:
+            st.error(error)
+        tables[name] = df
+    return tables
+
+
+# Funció per invalidar la memòria cau després d'una escriptura
+def invalidate_table_cache(url):
+    """
+    Esborra de la memòria cau la taula de la URL donada (totes les vistes)
+    i les taules que en mostren camps vinculats.
+    """
+    table_id = cache_key(url)[0]
+    for t in [table_id] + LINKED_TABLES.get(table_id, []):
+        table_cache.invalidate(t)
+        lookup_cache.invalidate(t)
+
+    
+# Funció per obtenir l'índex ID -> valor llegible d'una taula vinculada
+def get_lookup(linked_table_url, linked_df, key_column, value_column):
+    """
+    Torna una Series indexada per key_column (com a text) amb els valors de
+    value_column (com a text). Es construeix un sol cop per cada snapshot de la
+    taula i es guarda a lookup_cache fins que la taula canvia o caduca.
+    """
+    key = (cache_key(linked_table_url)[0], key_column, value_column)
+    lookup = lookup_cache.get(key)
+    if lookup is None:
+        pairs = linked_df[[key_column, value_column]].dropna(subset=[key_column])
+        lookup = pd.Series(pairs[value_column].astype(str).values,
+                           index=pairs[key_column].astype(str).values)
+        # Com amb un diccionari, si hi ha claus repetides guanya l'última
+        lookup = lookup[~lookup.index.duplicated(keep="last")]
+        lookup_cache.put(key, lookup)
+    return lookup
+
+
+# Funció per resoldre una columna vinculada de forma vectoritzada
+def resolve_link_column(column, lookup):
+    """
+    Converteix una columna de llistes d'IDs (o IDs sols) en text llegible:
+    explode -> map contra l'índex -> groupby + join per tornar a una fila per registre.
+    Les IDs desconegudes o nul·les es mostren com "Unknown"; les llistes buides com "".
+    """
+    values = column.reset_index(drop=True)
+    exploded = values.explode()
+    raw = exploded.to_numpy(dtype=object)
+
+    mapped = pd.Series(raw).astype(str).map(lookup)
+    mapped = mapped.where(pd.notna(raw)).fillna("Unknown")
+    mapped.index = exploded.index
+
+    resolved = mapped.groupby(level=0, sort=False).agg(", ".join)
+    is_empty_list = [isinstance(v, list) and not v for v in values]
+    resolved[is_empty_list] = ""
+    return resolved.reindex(values.index).values
+
+
+# Funció per canviar IDs de diversos camps vinculats en una sola passada
+def resolve_linked_fields(dataframe, links):
+    """
+    Reemplaça IDs de diverses columnes vinculades amb valors llegibles.
+    links és una llista de tuples
+       (link_column, linked_table_url, key_column, value_column, linked_df)
+    on linked_df pot ser None (llavors es llegeix la taula vinculada).
+    """
+    for link_column, linked_table_url, key_column, value_column, linked_df in links:
+        if link_column not in dataframe.columns:
+            continue
+        # Obtenir dades de la taula vinculada
+        linked_table_data = linked_df if linked_df is not None else get_airtable_data(linked_table_url)
+        if linked_table_data.empty or key_column not in linked_table_data.columns \
+                or value_column not in linked_table_data.columns:
+            st.warning(f"No s'ha pogut cargar la taula vinculada des de {linked_table_url}.")
+            continue
+        with timed("transform", f"resolve {link_column}", rows=len(dataframe)):
+            lookup = get_lookup(linked_table_url, linked_table_data, key_column, value_column)
+            dataframe[link_column] = resolve_link_column(dataframe[link_column], lookup)
+    return dataframe
+
+
+# Funció per canviar IDs de camps amb link a una altra taula a valors llegibles
+def map_linked_fields(dataframe, link_column, linked_table_url, key_column, value_column, linked_df=None):
+    """
+    Reemplaça IDs a una columna vinculada (link_column) amb valors llegibles
+    de la tabla vinculada especificada.
+    Si ja s'ha carregat la taula vinculada (load_tables), es pot passar a linked_df.
+    """
+    return resolve_linked_fields(
+        dataframe, [(link_column, linked_table_url, key_column, value_column, linked_df)]
+    )
+
+# Funció per crear un registre a la taula corresponent
+def create_airtable_record(url, fields_dict):
+    """
+    Crea un registre a la taula corresponent fent servir un POST.
+    fields_dict és un diccionari amb els camps, ex:
+       {"OrderID": "123", "Status": "Valid", ...}
+    """
+    payload = {
+        "records": [
+            {
+                "fields": fields_dict
+            }
+        ]
+    }
+    with timed("write", f"create {table_label(url)}", rows=1):
+        response = client.post(url, json=payload)
+    if response.status_code in (200, 201):
+        invalidate_table_cache(url)
+    return response
+
+# Funció per actualitzar registres
+def update_airtable_record(url, record_id, fields_dict):
+    """
+    Actualitza un registre a la taula corresponent fent servir PATCH.
+    record_id és la ID interna "recXXX...".
+    fields_dict és un diccionari amb els camps que cal actualitzar.
+    """
+    patch_url = f"{url}/{record_id}"
+    payload = {
+        "fields": fields_dict
+    }
+    with timed("write", f"update {table_label(url)}", rows=1):
+        response = client.patch(patch_url, json=payload)
+    if response.status_code == 200:
+        invalidate_table_cache(url)
+    return response
+
+# Funció per crear molts registres alhora (lots de 10)
+def create_airtable_records(url, fields_list):
+    """
+    Crea diversos registres a la taula corresponent en lots de 10 (un POST per lot).
+    fields_list és una llista de diccionaris de camps.
+    Torna (ids, failures): ids alineada amb fields_list (record_id o None) i
+    failures amb l'índex, els camps i l'error de cada registre no creat.
+    """
+    with timed("write", f"create {table_label(url)}", rows=len(fields_list)):
+        ids, failures = client.batch_create(url, fields_list)
+    if any(ids):
+        invalidate_table_cache(url)
+    return ids, failures
+
+# Funció per actualitzar molts registres alhora (lots de 10)
+def update_airtable_records(url, updates):
+    """
+    Actualitza diversos registres en lots de 10 (un PATCH per lot).
+    updates és una llista de parelles (record_id, fields_dict).
+    Torna (updated, failures): les record_id actualitzades i els errors per registre.
+    """
+    with timed("write", f"update {table_label(url)}", rows=len(updates)):
+        updated, failures = client.batch_update(url, updates)
+    if updated:
+        invalidate_table_cache(url)
+    return updated, failures
@@ -0,0 +1,241 @@
+# ------------------------------------------------------------------------
+# CLIENT HTTP COMPARTIT PER A L'API D'AIRTABLE
+# ------------------------------------------------------------------------
+# Una sola requests.Session per token (connexions keep-alive reutilitzades),
+# un limitador de peticions (token bucket) per respectar les 5 peticions/s
+# d'Airtable, reintents amb espera exponencial que respecten 'Retry-After',
+# i registre de la latència de cada petició.
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from instrumentation import record, table_label
+
+logger = logging.getLogger("airtable")
+
+RATE_LIMIT = 5          # Peticions per segon permeses per Airtable (per base)
+POOL_SIZE = 10          # Connexions keep-alive del pool
+TIMEOUT = 30            # Segons màxims d'espera per resposta
+MAX_RETRIES = 5         # Reintents per petició
+BACKOFF_BASE = 0.5      # Segons d'espera del primer reintent (després es dobla)
+BACKOFF_MAX = 30        # Espera màxima entre reintents
+LATENCY_HISTORY = 200   # Peticions que es guarden per a les estadístiques
+BATCH_SIZE = 10         # Registres màxims per petició de creació/actualització
+
+# 429 vol dir que Airtable no ha processat la petició: sempre es pot reintentar.
+# Els 5xx només es reintenten en mètodes idempotents (un POST podria duplicar registres).
+# El mateix amb els errors de xarxa: un POST només es reintenta si la petició no ha
+# sortit (connexió rebutjada o timeout de connexió), mai després d'un timeout de lectura.
+RETRY_ALWAYS = {429}
+RETRY_IDEMPOTENT = {500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "PATCH", "PUT", "DELETE"}
+
+
+class RateLimiter:
+    """Token bucket: com a màxim 'rate' peticions per segon, amb ràfegues de 'capacity'."""
+
+    def __init__(self, rate=RATE_LIMIT, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueja fins que hi ha un token disponible i el consumeix."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def request_not_sent(error):
+    """True si l'error de xarxa és d'abans d'enviar la petició (Airtable no l'ha rebut)."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # requests.ConnectionError(MaxRetryError(reason=NewConnectionError)): connexió rebutjada o DNS
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+def retry_delay(response, attempt):
+    """Segons d'espera abans del reintent: 'Retry-After' si hi és, si no backoff exponencial."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    delay = BACKOFF_BASE * (2 ** attempt)
+    return min(delay, BACKOFF_MAX) * random.uniform(0.8, 1.2)
+
+
+class AirtableClient:
+    """
+    Client HTTP compartit. Fa servir una requests.Session amb pool de connexions,
+    limita el ritme de peticions i reintenta els errors transitoris.
+    Les respostes finals es tornen tal qual (els qui criden miren status_code).
+    """
+
+    def __init__(self, headers, rate=RATE_LIMIT, pool_size=POOL_SIZE, max_retries=MAX_RETRIES):
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.limiter = RateLimiter(rate)
+        self.max_retries = max_retries
+        # Historial: (mètode, url, status, segons, intent)
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        """Fa la petició amb límit de ritme i reintents. Torna la requests.Response final."""
+        method = method.upper()
+        kwargs.setdefault("timeout", TIMEOUT)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                elapsed = time.perf_counter() - start
+                self._record(method, url, None, elapsed, attempt)
+                if attempt >= self.max_retries or not (method in IDEMPOTENT_METHODS or request_not_sent(e)):
+                    raise
+                delay = retry_delay(None, attempt)
+                logger.warning("%s %s: %s (reintent en %.1fs)", method, url, e, delay)
+                time.sleep(delay)
+                continue
+
+            elapsed = time.perf_counter() - start
+            self._record(method, url, response.status_code, elapsed, attempt, len(response.content))
+
+            retryable = (response.status_code in RETRY_ALWAYS
+                         or (response.status_code in RETRY_IDEMPOTENT and method in IDEMPOTENT_METHODS))
+            if not retryable or attempt >= self.max_retries:
+                return response
+
+            delay = retry_delay(response, attempt)
+            logger.warning("%s %s: HTTP %s (reintent en %.1fs)", method, url, response.status_code, delay)
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def batch_create(self, url, fields_list):
+        """
+        Crea registres en lots de BATCH_SIZE (un POST per lot).
+        Torna (ids, failures):
+          - ids: llista alineada amb fields_list amb la record_id creada o None
+          - failures: [{"index": i, "fields": {...}, "status": ..., "error": "..."}]
+        Airtable accepta o rebutja cada lot sencer, per això un error marca
+        com a fallits tots els registres del lot. Si un lot es queda sense resposta
+        (timeout de lectura), no es reintenta: surt a failures amb status None,
+        perquè Airtable el pot haver creat igualment.
+        """
+        ids = [None] * len(fields_list)
+        failures = []
+        for start in range(0, len(fields_list), BATCH_SIZE):
+            chunk = fields_list[start:start + BATCH_SIZE]
+            payload = {"records": [{"fields": f} for f in chunk]}
+            try:
+                response = self.post(url, json=payload)
+            except requests.RequestException as e:
+                for i, f in enumerate(chunk):
+                    failures.append({"index": start + i, "fields": f, "status": None,
+                                     "error": f"Sense resposta ({e}); comproveu si s'ha creat abans de repetir-lo"})
+                continue
+            if response.status_code in (200, 201):
+                for i, rec in enumerate(response.json().get("records", [])):
+                    ids[start + i] = rec["id"]
+            else:
+                for i, f in enumerate(chunk):
+                    failures.append({"index": start + i, "fields": f,
+                                     "status": response.status_code, "error": response.text})
+        return ids, failures
+
+    def batch_update(self, url, updates):
+        """
+        Actualitza registres en lots de BATCH_SIZE (un PATCH per lot).
+        updates és una llista de parelles (record_id, fields_dict).
+        Torna (updated, failures):
+          - updated: llista de record_id actualitzades
+          - failures: [{"index": i, "record_id": ..., "fields": {...}, "status": ..., "error": "..."}]
+        Si un lot es queda sense resposta després dels reintents, surt a failures
+        amb status None i es continua amb el següent (el PATCH es pot repetir).
+        """
+        updated = []
+        failures = []
+        for start in range(0, len(updates), BATCH_SIZE):
+            chunk = updates[start:start + BATCH_SIZE]
+            payload = {"records": [{"id": rec_id, "fields": f} for rec_id, f in chunk]}
+            try:
+                response = self.patch(url, json=payload)
+            except requests.RequestException as e:
+                for i, (rec_id, f) in enumerate(chunk):
+                    failures.append({"index": start + i, "record_id": rec_id, "fields": f, "status": None,
+                                     "error": f"Sense resposta ({e})"})
+                continue
+            if response.status_code == 200:
+                updated.extend(rec["id"] for rec in response.json().get("records", []))
+            else:
+                for i, (rec_id, f) in enumerate(chunk):
+                    failures.append({"index": start + i, "record_id": rec_id, "fields": f,
+                                     "status": response.status_code, "error": response.text})
+        return updated, failures
+
+    def _record(self, method, url, status, elapsed, attempt, nbytes=0):
+        with self.lock:
+            self.latencies.append((method, url, status, elapsed, attempt))
+        # Per pantalla: una entrada per mètode i taula (els reintents, a part)
+        record("http_retry" if attempt else "http", f"{method} {table_label(url)}", elapsed, nbytes)
+        logger.debug("%s %s -> %s en %.0f ms (intent %d)", method, url, status, elapsed * 1000, attempt + 1)
+
+    def stats(self):
+        """Resum de latències de les últimes peticions (en mil·lisegons)."""
+        with self.lock:
+            times = sorted(t for _, _, _, t, _ in self.latencies)
+            retries = sum(1 for _, _, _, _, a in self.latencies if a > 0)
+        if not times:
+            return {"requests": 0}
+        return {
+            "requests": len(times),
+            "retries": retries,
+            "mean_ms": sum(times) / len(times) * 1000,
+            "p50_ms": times[len(times) // 2] * 1000,
+            "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+            "max_ms": times[-1] * 1000,
+        }
+
+
+# Un client per token, compartit per tot el procés
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(headers):
+    """Torna el client compartit per a les capçaleres (token) donades."""
+    key = headers.get("Authorization")
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = AirtableClient(headers)
+        return _clients[key]
@@ -0,0 +1,146 @@
+# ------------------------------------------------------------------------
+# DESCODIFICACIÓ DE REGISTRES D'AIRTABLE A COLUMNES AMB TIPUS
+# ------------------------------------------------------------------------
+# pd.DataFrame(llista de diccionaris) crea una cel·la Python per camp i
+# registre: llistes Python als camps vinculats i enters/dates com a objectes.
+# Aquí cada camp es llegeix en una sola passada (una llista per camp) i es
+# converteix d'una vegada al tipus de snapshot_store.SCHEMAS:
+#   - camps vinculats: list<string> d'Arrow (un array d'offsets + un buffer
+#     amb totes les record_id), no una llista Python per cel·la
+#   - quantitats i IDs numèrics: Int32 (Int64 o float64 si no hi caben)
+#   - dates: datetime64 sense zona (les que porten zona, passades a UTC)
+#   - record_id i text: str (en pandas 3, també en buffers d'Arrow)
+# Els lookups (llistes) també passen a Arrow; la resta de camps, tal qual.
+# Les cel·les buides són nul·les (Airtable omet els camps buits).
+# arrow_to_frame dona el mateix DataFrame a partir d'un snapshot en Parquet,
+# columna a columna, sense passar per registres.
+import itertools
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from snapshot_store import SCHEMAS
+
+LINK_TYPE = pa.list_(pa.string())
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+# Tipus de cada taula per ID (tblXXX)
+TABLE_SCHEMAS = {spec["table"]: spec for spec in SCHEMAS.values()}
+
+
+def _link_column(values):
+    """Llistes de record_id -> list<string> d'Arrow (les cel·les que no són llistes, nul·les)."""
+    try:
+        array = pa.array(values, type=LINK_TYPE)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = pa.array([[str(x) for x in v] if isinstance(v, list) else None for v in values], type=LINK_TYPE)
+    return pd.arrays.ArrowExtensionArray(array)
+
+
+def _int_column(values):
+    """Enters -> Int32 amb nul·les (Int64 si no hi caben, float64 si hi ha decimals)."""
+    return _int_array(pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64))
+
+
+def _int_array(numbers):
+    """float64 amb NaN a les cel·les buides -> Int32/Int64 amb nul·les (float64 si hi ha decimals)."""
+    present = ~np.isnan(numbers)
+    if not (numbers[present] % 1 == 0).all():
+        return numbers
+    fits = not present.any() or (numbers[present].min() >= INT32_MIN and numbers[present].max() <= INT32_MAX)
+    data = np.where(present, numbers, 0).astype(np.int32 if fits else np.int64)
+    return pd.arrays.IntegerArray(data, ~present)
+
+
+def _date_column(values):
+    """Dates en text ISO -> datetime64 sense zona, en UTC (NaT si no és una data)."""
+    try:
+        # Dates sense hora ni zona (el cas habitual): la conversió la fa Arrow
+        return pa.array(values, type=pa.string()).cast(pa.timestamp("us")).to_pandas().array
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Amb hora "…Z", o barrejades amb dates sense zona (snapshot en Parquet + registres
+        # delta): sense utc=True, pandas llança "Mixed timezones" encara que hi hagi errors="coerce"
+        dates = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce", format="ISO8601", utc=True)
+        return dates.dt.tz_convert(None).array
+
+
+def _other_column(values):
+    """
+    Camps sense tipus a SCHEMAS: els lookups (llistes) passen a list<...> d'Arrow
+    si Arrow en pot inferir el tipus; la resta es queda tal qual.
+    """
+    if isinstance(next((v for v in values if v is not None), None), list):
+        try:
+            array = pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = None
+        if array is not None and pa.types.is_list(array.type):
+            return pd.arrays.ArrowExtensionArray(array)
+    return pd.Series(values, dtype=object).infer_objects().fillna(np.nan).array
+
+
+def parse_records(records, table=None):
+    """
+    Converteix registres d'Airtable en un DataFrame amb tipus.
+    - records: iterable de parelles (record_id, fields) o de registres {"id", "fields"}
+    - table: ID de la taula (tblXXX) per triar els tipus de SCHEMAS; sense, tot es queda tal qual
+    Torna un DataFrame amb els camps (en l'ordre en què apareixen) + 'record_id'.
+    """
+    spec = TABLE_SCHEMAS.get(table, {})
+    links, ints, dates = set(spec.get("links", [])), set(spec.get("ints", [])), set(spec.get("dates", []))
+
+    records = list(records)
+    if not records:
+        return pd.DataFrame()  # Com pd.DataFrame([]): sense files ni columnes
+    if isinstance(records[0], dict):
+        ids = [r["id"] for r in records]
+        fields_list = [r.get("fields", {}) for r in records]
+    else:
+        ids = [rec_id for rec_id, _ in records]
+        fields_list = [fields for _, fields in records]
+
+    # Una passada per camp (llistes per comprensió) en lloc d'un diccionari per fila
+    data = {}
+    for name in dict.fromkeys(itertools.chain.from_iterable(fields_list)):
+        values = [fields.get(name) for fields in fields_list]
+        if name in links:
+            data[name] = _link_column(values)
+        elif name in ints:
+            data[name] = _int_column(values)
+        elif name in dates:
+            data[name] = _date_column(values)
+        else:
+            data[name] = _other_column(values)
+    data["record_id"] = pd.array(ids, dtype="str")
+    return pd.DataFrame(data, index=pd.RangeIndex(len(ids)))
+
+
+def arrow_to_frame(arrow_table, table=None):
+    """
+    Taula Arrow (snapshot_store) -> el mateix DataFrame amb tipus que parse_records,
+    convertint cada columna sencera (sense llistes Python ni diccionaris per registre).
+    """
+    spec = TABLE_SCHEMAS.get(table, {})
+    links, ints, dates = set(spec.get("links", [])), set(spec.get("ints", [])), set(spec.get("dates", []))
+
+    data = {}
+    for name in arrow_table.column_names:
+        if name == "record_id":
+            continue
+        column = arrow_table.column(name).combine_chunks()
+        if name in links:
+            data[name] = pd.arrays.ArrowExtensionArray(column.cast(LINK_TYPE))
+        elif name in ints:
+            data[name] = _int_array(column.cast(pa.float64()).to_numpy(zero_copy_only=False))
+        elif name in dates and pa.types.is_timestamp(column.type):
+            # Les dates amb zona ja són en UTC: només es treu la zona
+            data[name] = column.cast(pa.timestamp("us")).to_pandas().array
+        elif name in dates:
+            data[name] = _date_column(column.to_pylist())
+        elif pa.types.is_list(column.type):
+            data[name] = pd.arrays.ArrowExtensionArray(column)
+        else:
+            data[name] = column.to_pandas().array
+    data["record_id"] = pd.array(arrow_table.column("record_id").to_pandas(), dtype="str")
+    return pd.DataFrame(data, index=pd.RangeIndex(arrow_table.num_rows))
@@ -0,0 +1,260 @@
+# ------------------------------------------------------------------------
+# SINCRONITZACIÓ INCREMENTAL DE TAULES AIRTABLE
+# ------------------------------------------------------------------------
+# Es guarda una còpia local (snapshot) de cada taula + vista. La primera
+# lectura recorre totes les pàgines; les següents només demanen els
+# registres modificats des de l'última sincronització (filterByFormula
+# sobre LAST_MODIFIED_TIME()) i els fusionen amb la còpia local.
+# Els registres esborrats no apareixen mai en un delta, per això cal
+# reconciliar de tant en tant la llista d'IDs.
+# La còpia local ja és el DataFrame amb tipus (airtable_parser.py): cada
+# delta només descodifica els registres que arriben.
+# Ordre: un delta no diu on van els registres nous (ni on s'han mogut els
+# modificats si la vista està ordenada per algun camp). La llista d'IDs de
+# la reconciliació sí que ve en l'ordre de la vista, per això en una vista
+# cada delta amb canvis es reconcilia de seguida (una lectura d'un sol camp).
+# Sense vista, els nous s'afegeixen al final, com l'ordre per defecte d'Airtable.
+import collections
+import datetime
+import threading
+import time
+
+import pandas as pd
+
+from airtable_cache import cache_key
+from airtable_parser import parse_records
+from instrumentation import record, table_label, timed
+
+SYNC_OVERLAP = 5            # Segons de marge per desfasaments de rellotge
+RECONCILE_INTERVAL = 300    # Cada quants segons es reconcilien els esborrats
+CHANGE_HISTORY = 100        # Sincronitzacions amb canvis que es recorden (vegeu changes_since)
+
+# Expressió de data de modificació per defecte. LAST_MODIFIED_TIME() només
+# canvia amb edicions de camps no calculats: els lookups (ex. OrderID a
+# Detall comanda) no actualitzen la data si canvia el registre d'origen.
+DEFAULT_MODIFIED_EXPR = "LAST_MODIFIED_TIME()"
+
+
+class AirtableSyncError(Exception):
+    """Error HTTP durant una sincronització."""
+
+    def __init__(self, status_code, text):
+        super().__init__(f"HTTP {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+class TableSnapshot:
+    """
+    Còpia local d'una taula: DataFrame amb tipus (airtable_parser) indexat per
+    record_id + data de l'última sincronització. Els deltes es fusionen per
+    record_id: només es descodifiquen els registres que arriben.
+    """
+
+    def __init__(self, table=None):
+        self.table = table          # tblXXX, per als tipus de les columnes (airtable_parser)
+        self.frame = pd.DataFrame(index=pd.Index([], dtype="str", name="record_id"))
+        self.last_sync = None       # datetime UTC de l'inici de l'última sincronització
+        self.last_reconcile = None  # time.monotonic() de l'última reconciliació
+        self.version = 0            # Puja cada vegada que canvien els registres
+        self.full_version = 0       # Versió de l'última càrrega completa (Airtable o fitxer)
+        self.changes = collections.deque(maxlen=CHANGE_HISTORY)  # (versió, modificats, esborrats)
+        self.lock = threading.Lock()
+
+    def to_dataframe(self, ids=None):
+        """
+        DataFrame amb els camps (amb tipus) + 'record_id', com get_airtable_data.
+        Amb ids, només aquests registres (els que existeixen).
+        """
+        frame = self.frame
+        if ids is not None:
+            frame = frame.loc[frame.index.intersection(list(ids), sort=False)]
+        with timed("transform", "snapshot_to_dataframe", rows=len(frame)):
+            return frame.reset_index()[list(frame.columns) + ["record_id"]]
+
+    def replace(self, df):
+        """Substitueix tots els registres (lectura completa o fitxer local)."""
+        self.frame = _by_id(df)
+        self.version += 1
+        self.full_version = self.version
+        self.changes.clear()
+
+    def merge(self, df):
+        """Fusiona registres modificats o nous; els modificats es queden a la seva posició."""
+        changed = _by_id(df)
+        if changed.empty:
+            return
+        added = changed.index[~changed.index.isin(self.frame.index)]
+        order = self.frame.index.append(added)
+        kept = self.frame.drop(changed.index.difference(added))
+        self.frame = pd.concat([kept, changed]).reindex(order)
+        self._log(changed.index, ())
+
+    def keep(self, live_ids):
+        """Es queda només amb live_ids, en el seu ordre (el de la vista). Torna els esborrats."""
+        live = pd.Index(live_ids, dtype="str", name="record_id")
+        removed = self.frame.index.difference(live)
+        self.frame = self.frame.reindex(live[live.isin(self.frame.index)])
+        if len(removed):
+            self._log((), removed)
+        return removed
+
+    def _log(self, changed, removed):
+        self.version += 1
+        self.changes.append((self.version, set(changed), set(removed)))
+
+    def changes_since(self, version):
+        """
+        (modificats, esborrats): record_id que han canviat des de la versió donada, o
+        None si cal tornar-ho a llegir tot (hi ha hagut una càrrega completa o
+        l'historial de CHANGE_HISTORY canvis ja no hi arriba).
+        """
+        oldest = self.changes[0][0] if self.changes else self.version + 1
+        if version < self.full_version or oldest > version + 1:
+            return None
+        changed, removed = set(), set()
+        for v, c, r in self.changes:
+            if v > version:
+                changed |= c
+                removed |= r
+        return changed - removed, removed
+
+
+def _by_id(df):
+    """DataFrame de parse_records -> indexat per record_id (sense la columna)."""
+    if "record_id" not in df.columns:
+        return pd.DataFrame(index=pd.Index([], dtype="str", name="record_id"))
+    return df.set_index("record_id")
+
+
+def _parse(records, table):
+    records = list(records)
+    with timed("transform", "records_to_dataframe", rows=len(records)):
+        return parse_records(records, table)
+
+
+# Snapshots per procés: {(taula, vista[, camps]): TableSnapshot}
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(url, fields=None):
+    """
+    Torna (i crea si cal) el snapshot de la taula + vista de la URL.
+    Amb fields, el snapshot només guarda aquests camps (és independent del de la taula sencera).
+    """
+    key = cache_key(url) + (tuple(fields),) if fields else cache_key(url)
+    with _snapshots_lock:
+        if key not in _snapshots:
+            _snapshots[key] = TableSnapshot(key[0])
+        return _snapshots[key]
+
+
+def fetch_records(url, client, params=None):
+    """
+    Generador que recorre totes les pàgines de la URL donada i torna els
+    registres bruts d'Airtable ({"id": ..., "fields": {...}}), fent servir
+    el client HTTP compartit (airtable_http.AirtableClient).
+    Llença AirtableSyncError si alguna pàgina falla.
+    """
+    params = dict(params or {})
+    while True:
+        response = client.get(url, params=params)
+        if response.status_code != 200:
+            raise AirtableSyncError(response.status_code, response.text)
+        data_json = response.json()
+        records = data_json.get("records", [])
+        record("page", table_label(url), rows=len(records))
+        for r in records:
+            yield r
+        offset = data_json.get("offset")
+        if not offset:
+            break
+        params["offset"] = offset
+
+
+def delta_formula(since, modified_expr=DEFAULT_MODIFIED_EXPR):
+    """Fórmula per demanar només els registres modificats després de 'since' (UTC)."""
+    since_str = since.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return f"IS_AFTER({modified_expr}, DATETIME_PARSE('{since_str}'))"
+
+
+def reconcile_deletions(url, client, snapshot, id_field=None):
+    """
+    Esborra del snapshot els registres que ja no existeixen a Airtable i deixa
+    la resta en l'ordre en què els torna Airtable (el de la vista, si n'hi ha).
+    Si es dona id_field, només es demana aquest camp (resposta molt més petita).
+    Torna el nombre de registres esborrats.
+    """
+    params = {"fields[]": id_field} if id_field else {}
+    removed = snapshot.keep([r["id"] for r in fetch_records(url, client, params)])
+    snapshot.last_reconcile = time.monotonic()
+    return len(removed)
+
+
+def sync_table(url, client, id_field=None, reconcile=False, modified_expr=DEFAULT_MODIFIED_EXPR, fields=None):
+    """
+    Sincronitza el snapshot de la URL donada i el torna com a DataFrame.
+    - Primera crida: lectura completa.
+    - Següents: només els registres modificats des de l'última sincronització.
+    - Els esborrats es reconcilien cada RECONCILE_INTERVAL segons (o si reconcile=True);
+      en una vista, també després de cada delta amb canvis (per l'ordre de la vista).
+    - fields: només es demanen (i es guarden) aquests camps
+    Si falla una crida, el snapshot queda com estava i es llença AirtableSyncError.
+    """
+    snapshot = get_snapshot(url, fields)
+    base_params = {"fields[]": list(fields)} if fields else {}
+    with snapshot.lock:
+        started = datetime.datetime.now(datetime.timezone.utc)
+
+        if snapshot.last_sync is None:
+            # Lectura completa: no substituïm el snapshot fins tenir totes les pàgines
+            snapshot.replace(_parse(fetch_records(url, client, base_params), snapshot.table))
+            snapshot.last_reconcile = time.monotonic()
+        else:
+            since = snapshot.last_sync - datetime.timedelta(seconds=SYNC_OVERLAP)
+            params = dict(base_params, filterByFormula=delta_formula(since, modified_expr))
+            changed = _parse(fetch_records(url, client, params), snapshot.table)
+            snapshot.merge(changed)
+
+            due = (snapshot.last_reconcile is None
+                   or time.monotonic() - snapshot.last_reconcile >= RECONCILE_INTERVAL)
+            # En una vista, la reconciliació també torna a posar els canvis en l'ordre de la vista
+            reorder = cache_key(url)[1] is not None and not changed.empty
+            if reconcile or due or reorder:
+                reconcile_deletions(url, client, snapshot, id_field)
+
+        snapshot.last_sync = started
+        return snapshot.to_dataframe()
+
+
+def seed_snapshot(url, df, synced_at, fields=None):
+    """
+    Inicialitza un snapshot buit amb registres ja guardats en local (ex. un
+    fitxer Parquet, com el DataFrame de parse_records) i la data en què es van
+    llegir. La propera sincronització només demanarà els canvis posteriors a
+    synced_at i reconciliarà els esborrats de seguida (el fitxer pot tenir dies).
+    fields: el snapshot de la projecció (vegeu get_snapshot).
+    Torna False si el snapshot ja tenia dades.
+    """
+    snapshot = get_snapshot(url, fields)
+    with snapshot.lock:
+        if snapshot.last_sync is not None:
+            return False
+        snapshot.replace(df)
+        snapshot.last_sync = synced_at
+        snapshot.last_reconcile = None
+        return True
+
+
+def request_reconcile():
+    """Marca tots els snapshots perquè la propera sincronització reconciliï esborrats."""
+    with _snapshots_lock:
+        for snapshot in _snapshots.values():
+            snapshot.last_reconcile = None
+
+
+def reset_snapshots():
+    """Oblida tots els snapshots: la propera lectura de cada taula serà completa."""
+    with _snapshots_lock:
+        _snapshots.clear()
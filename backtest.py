@@ -0,0 +1,97 @@
+# ------------------------------------------------------------------------
+# BACKTEST MENSUAL (ROLLING ORIGIN) DE TOTS ELS PRODUCTES
+# ------------------------------------------------------------------------
+# Per cada producte i cada mes de l'any (data de tall = dia 1 del mes):
+# s'entrena amb les dades anteriors al tall, es prediu el mes i es compara
+# amb les dades reals, igual que "Predir el mes seleccionat" de la pantalla.
+# Els plecs (producte, mes) es reparteixen entre processos i cadascun passa
+# pel registre de models: els ajustos ja fets (des de la pantalla, la
+# predicció en lot o un backtest anterior) es reutilitzen.
+# Resultat: una fila per plec i una matriu producte x mes de l'error.
+import os
+
+import pandas as pd
+
+from batch_forecast import HORIZON_DAYS, OUTPUT_DIR, forecast_product, product_histories, run_in_pool
+from model_registry import REGISTRY_DIR
+
+ERROR_COLUMNS = ["ProductID", "month", "cutoff", "mae", "rmse", "n_train", "n_test",
+                 "seconds", "reused", "error"]
+
+
+def monthly_cutoffs(year):
+    """Dates de tall del backtest: el dia 1 de cada mes de 'year'."""
+    return list(pd.date_range(start=f"{year}-01-01", periods=12, freq="MS"))
+
+
+def _backtest_fold(product, history, cutoff, horizon_days, registry_root):
+    """Ajusta (o reutilitza) el model del plec i en calcula l'error. S'executa en un procés fill."""
+    # Dies del mes amb dades reals (com a la comparació de la pantalla)
+    real = history[(history["ds"] >= cutoff) & (history["ds"] <= cutoff + pd.Timedelta(days=horizon_days))]
+    row = {"ProductID": product, "month": cutoff.month, "cutoff": cutoff, "mae": None, "rmse": None,
+           "n_train": int((history["ds"] < cutoff).sum()), "n_test": 0, "seconds": 0.0,
+           "reused": False, "error": None}
+    if real.empty:
+        # Sense dades reals no hi ha res a comparar: no cal ajustar el model
+        row["error"] = "Sense dades reals al mes"
+        return row
+
+    product, forecast, seconds, reused, n_train, error = forecast_product(
+        product, history, cutoff, horizon_days, registry_root
+    )
+    row.update(seconds=seconds, reused=reused, error=error)
+    if forecast is None:
+        return row
+
+    compare = real[["ds", "y"]].merge(forecast[["ds", "yhat"]], on="ds", how="inner")
+    if not compare.empty:
+        diff = compare["y"] - compare["yhat"]
+        row.update(mae=diff.abs().mean(), rmse=(diff ** 2).mean() ** 0.5, n_test=len(compare))
+    return row
+
+
+def backtest_all_products(demand, year=2025, horizon_days=HORIZON_DAYS, max_workers=None,
+                          progress=None, output_path=None, registry_root=REGISTRY_DIR):
+    """
+    Backtest de les 12 dates de tall mensuals de 'year' per a cada producte.
+    - demand: demanda diària ProductID, ds, y (ex. el cub de demand_cube.py)
+    - progress(done, total, label, seconds): es crida cada cop que acaba un plec
+    - output_path: si es dona, s'hi escriu la taula d'errors en CSV
+    Torna una fila per (producte, mes) amb les columnes d'ERROR_COLUMNS.
+    """
+    cutoffs = monthly_cutoffs(year)
+    folds = {f"{product} {cutoff:%Y-%m}": (product, history, cutoff, horizon_days, registry_root)
+             for product, history in product_histories(demand).items() for cutoff in cutoffs}
+
+    rows = []
+    results = run_in_pool(_backtest_fold, folds, len(folds), "backtest_fold",
+                          timing=lambda row: (row["seconds"], row["n_train"]), progress=progress,
+                          registry_root=registry_root, max_workers=max_workers)
+    for label, row, error in results:
+        if row is None:
+            product, _, cutoff = folds[label][:3]
+            row = {"ProductID": product, "month": cutoff.month, "cutoff": cutoff,
+                   "n_train": 0, "n_test": 0, "seconds": 0.0, "reused": False, "error": error}
+        rows.append(row)
+
+    errors = pd.DataFrame(rows, columns=ERROR_COLUMNS)
+    errors = errors.sort_values(["ProductID", "month"]).reset_index(drop=True)
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        errors.to_csv(output_path, index=False)
+    return errors
+
+
+def error_matrix(errors, metric="mae"):
+    """Matriu producte x mes ("01"-"12") de la mètrica ('mae' o 'rmse'), amb la mitjana per producte."""
+    values = errors.assign(**{metric: pd.to_numeric(errors[metric], errors="coerce")})
+    matrix = values.pivot(index="ProductID", columns="month", values=metric)
+    matrix = matrix.reindex(columns=range(1, 13))
+    matrix.columns = [f"{month:02d}" for month in matrix.columns]
+    matrix["mitjana"] = matrix.mean(axis=1)
+    return matrix
+
+
+def default_backtest_path(year):
+    """Fitxer de sortida per defecte: forecasts/backtest_AAAA.csv"""
+    return os.path.join(OUTPUT_DIR, f"backtest_{year}.csv")
@@ -0,0 +1,153 @@
+# ------------------------------------------------------------------------
+# PREDICCIÓ EN LOT DE TOTS ELS PRODUCTES
+# ------------------------------------------------------------------------
+# Ajusta un model Prophet per producte en paral·lel (un procés per nucli)
+# i torna una taula "tidy": ProductID, ds, yhat, yhat_lower, yhat_upper.
+# Cada procés fa servir el registre de models, així que els productes amb
+# les mateixes dades que una execució anterior no es tornen a ajustar.
+# run_in_pool i product_histories són compartits amb backtest.py i
+# retraining.py: les tres execucions en lot reparteixen la feina igual i
+# entrenen amb les mateixes sèries per producte.
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from demand_cube import detall_lines
+from instrumentation import record
+from model_registry import REGISTRY_DIR, registry_run
+
+HORIZON_DAYS = 30       # Dies que es prediuen a partir de la data de tall
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "forecasts")
+
+
+def daily_demand(df_detall, product_names=None):
+    """
+    Demanda diària per producte a partir de df_detall (tal com el torna fetch_table).
+    Resol el producte vinculat amb demand_cube.detall_lines, com el cub de demanda.
+    - product_names ({record_id: 'PRODxxx'}): tradueix els productes; sense, es deixa la record_id
+    Torna un DataFrame amb ProductID, ds, y.
+    """
+    lines = detall_lines(df_detall).dropna(subset=["product", "ds"])
+    if product_names:
+        lines["product"] = lines["product"].map(product_names).fillna(lines["product"])
+    grouped = lines.groupby(["product", "ds"], as_index=False)["y"].sum()
+    grouped.columns = ["ProductID", "ds", "y"]
+    return grouped
+
+
+def product_histories(demand):
+    """
+    Sèrie de cada producte a partir de la demanda diària (ProductID, ds, y), en una
+    sola passada (no un filtre per producte). Torna {producte: DataFrame ds, y ordenat per ds}.
+    """
+    return {product: group[["ds", "y"]].sort_values("ds").reset_index(drop=True)
+            for product, group in demand.groupby("ProductID", sort=True)}
+
+
+def run_in_pool(worker, tasks, n_models, metric, timing, progress=None, registry_root=REGISTRY_DIR,
+                max_workers=None):
+    """
+    Executa worker(*args) per a cada tasca en processos fills, dins de registry_run
+    (capacitat per a n_models). Torna un generador de (clau, resultat, error) a mesura
+    que acaben; si el procés fill ha fallat, resultat és None i error el missatge.
+    - tasks: {clau: args}; la clau és l'etiqueta que rep progress
+    - metric: nom de la mesura d'instrumentation.record ("forecast_product", ...)
+    - timing(resultat) -> (segons, observacions)
+    - progress(done, total, clau, seconds): es crida cada cop que acaba una tasca
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    # 'spawn' evita heretar els fils del servidor (Streamlit) en fer fork
+    context = multiprocessing.get_context("spawn")
+    with registry_run(registry_root, n_models), \
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = {executor.submit(worker, *args): key for key, args in tasks.items()}
+        for done, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            try:
+                result, error = future.result(), None
+                seconds, n_obs = timing(result)
+            except Exception as e:
+                result, error, seconds, n_obs = None, str(e), 0.0, 0
+            # Els ajustos es fan als processos fills: el temps es registra aquí
+            record("model", metric, seconds, rows=n_obs)
+            if progress:
+                progress(done, len(futures), key, seconds)
+            yield key, result, error
+
+
+def forecast_product(product, history, cutoff, horizon_days, registry_root):
+    """Ajusta (o reutilitza) el model d'un producte i en fa la predicció. S'executa en un procés fill."""
+    from prophet import Prophet
+    from model_registry import ModelRegistry
+
+    # Prophet i cmdstanpy escriuen molt a INFO: en lot només volem els avisos
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    train_df = history[history["ds"] < cutoff][["ds", "y"]]
+    if len(train_df) < 2:
+        return product, None, time.perf_counter() - start, False, len(train_df), "Menys de 2 observacions"
+
+    registry = ModelRegistry(root=registry_root, auto_evict=False)  # La neteja la fa registry_run
+    model, reused = registry.get_or_fit(product, cutoff, train_df, fit=lambda df: Prophet().fit(df))
+    future_df = pd.DataFrame({"ds": pd.date_range(start=cutoff, periods=horizon_days + 1, freq="D")})
+    forecast = model.predict(future_df)[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+    forecast.insert(0, "ProductID", product)
+    return product, forecast, time.perf_counter() - start, reused, len(train_df), None
+
+
+def forecast_all_products(df_detall, cutoff, horizon_days=HORIZON_DAYS, max_workers=None,
+                          progress=None, output_path=None, registry_root=REGISTRY_DIR, demand=None,
+                          product_names=None):
+    """
+    Prediu tots els productes de df_detall a partir de 'cutoff', un procés per producte.
+    - demand: demanda diària ja agregada (ProductID, ds, y), ex. del cub de
+      demand_cube.py; si es dona, no es torna a agrupar df_detall
+    - product_names ({record_id: 'PRODxxx'}): noms dels productes si s'agrupa
+      df_detall (vegeu daily_demand)
+    - progress(done, total, product, seconds): es crida cada cop que acaba un producte
+    - output_path: si es dona, s'hi escriu la taula de prediccions en CSV
+    Torna (forecasts, timings):
+      forecasts: ProductID, ds, yhat, yhat_lower, yhat_upper
+      timings:   ProductID, seconds, reused, n_obs, error
+    """
+    cutoff = pd.Timestamp(cutoff)
+    if demand is None:
+        demand = daily_demand(df_detall, product_names)
+    histories = product_histories(demand)
+    tasks = {product: (product, history, cutoff, horizon_days, registry_root)
+             for product, history in histories.items()}
+
+    forecasts = []
+    timings = []
+    results = run_in_pool(forecast_product, tasks, len(tasks), "forecast_product",
+                          timing=lambda result: (result[2], result[4]), progress=progress,
+                          registry_root=registry_root, max_workers=max_workers)
+    for product, result, error in results:
+        forecast, seconds, reused, n_obs = None, 0.0, False, 0
+        if result is not None:
+            _, forecast, seconds, reused, n_obs, error = result
+        if forecast is not None:
+            forecasts.append(forecast)
+        timings.append({"ProductID": product, "seconds": seconds, "reused": reused,
+                        "n_obs": n_obs, "error": error})
+
+    columns = ["ProductID", "ds", "yhat", "yhat_lower", "yhat_upper"]
+    forecasts = (pd.concat(forecasts, ignore_index=True) if forecasts else pd.DataFrame(columns=columns))
+    forecasts = forecasts.sort_values(["ProductID", "ds"]).reset_index(drop=True)
+    timings = pd.DataFrame(timings, columns=["ProductID", "seconds", "reused", "n_obs", "error"])
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        forecasts.to_csv(output_path, index=False)
+    return forecasts, timings
+
+
+def default_output_path(cutoff):
+    """Fitxer de sortida per defecte: forecasts/forecast_AAAA-MM-DD.csv"""
+    return os.path.join(OUTPUT_DIR, f"forecast_{pd.Timestamp(cutoff):%Y-%m-%d}.csv")
@@ -0,0 +1,222 @@
+# ------------------------------------------------------------------------
+# BENCHMARK DE CÀRREGA DE DADES CONTRA EL MOCK D'AIRTABLE
+# ------------------------------------------------------------------------
+# Arrenca mock_airtable.py dins el mateix procés, l'omple amb 1k/10k/100k
+# línies de Detall comanda i repeteix la lectura de dades de cada pantalla
+# d'app.py (load_tables + resolve_linked_fields / map_linked_fields).
+# Cada pantalla es mesura en tres estats:
+#   cold: sense memòria cau ni snapshots (primera lectura del procés)
+#   sync: memòria cau caducada però amb snapshot (només canvis incrementals)
+#   warm: memòria cau vigent
+# i es reporten peticions, bytes rebuts, temps i pic de memòria (tracemalloc).
+#
+# Ús:
+#     python benchmark.py                                # 1k, 10k i 100k
+#     python benchmark.py --sizes 1000 --rate 5          # ritme real d'Airtable
+#     python benchmark.py --save-baseline bench.json     # desa la referència
+#     python benchmark.py --baseline bench.json          # falla si hi ha regressions
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import time
+import tracemalloc
+
+MODES = ["cold", "sync", "warm"]
+TIME_TOLERANCE = 1.5    # Regressió si el temps supera la referència per aquest factor
+TIME_FLOOR = 0.05       # Temps (s) per sota dels quals no es comparen (soroll)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _setup_environment(port):
+    """
+    L'URL de l'API i la carpeta de snapshots es llegeixen en importar
+    airtable_config / snapshot_store, així que cal fixar-les abans d'importar res.
+    """
+    os.environ["AIRTABLE_API_URL"] = f"http://127.0.0.1:{port}/v0"
+    os.environ["SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="bench_snapshots_")
+    # Fora de 'streamlit run', st.error/st.warning avisen que no hi ha sessió
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+
+def screen_loaders():
+    """Lectura de dades de cada pantalla, igual que a screens/."""
+    from airtable_config import (
+        API_URL, BASE_ID, COMANDA_TABLE, DETALL_TABLE, INVENTARI_TABLE, CLIENT_TABLE,
+        comanda_url, detall_url, inventari_url, client_url
+    )
+    from airtable_data import load_tables, map_linked_fields, resolve_linked_fields
+
+    def comandes():
+        comandes_url = f"{API_URL}/{BASE_ID}/{COMANDA_TABLE}?view=Grid%20view"
+        tables = load_tables({
+            "comandes": comandes_url,
+            "client": (client_url, {"fields": ["CustomerID"]}),
+            "detall": (detall_url, {"fields": ["OrderID"]})
+        })
+        return resolve_linked_fields(tables["comandes"], [
+            ("CustomerID", client_url, "record_id", "CustomerID", tables["client"]),
+            ("Detall comanda", detall_url, "record_id", "OrderID", tables["detall"])
+        ])
+
+    def detall():
+        detall_url_view = f"{API_URL}/{BASE_ID}/{DETALL_TABLE}?view=Grid%20view"
+        tables = load_tables({
+            "detall": detall_url_view,
+            "comanda": (comanda_url, {"fields": ["OrderID"]}),
+            "inventari": (inventari_url, {"fields": ["ProductID"]})
+        })
+        return resolve_linked_fields(tables["detall"], [
+            ("Comanda", comanda_url, "record_id", "OrderID", tables["comanda"]),
+            ("ProductID", inventari_url, "record_id", "ProductID", tables["inventari"])
+        ])
+
+    def inventari():
+        inventari_view_url = f"{API_URL}/{BASE_ID}/{INVENTARI_TABLE}?view=Grid%20view"
+        tables = load_tables({"inventari": inventari_view_url, "detall": (detall_url, {"fields": ["OrderID"]})})
+        return map_linked_fields(tables["inventari"], "Detall comanda", detall_url, "record_id", "OrderID",
+                                 linked_df=tables["detall"])
+
+    def client():
+        client_view_url = f"{API_URL}/{BASE_ID}/{CLIENT_TABLE}?view=Grid%20view"
+        tables = load_tables({"client": client_view_url, "comanda": (comanda_url, {"fields": ["OrderID"]})})
+        return map_linked_fields(tables["client"], "Comanda", comanda_url, "record_id", "OrderID",
+                                 linked_df=tables["comanda"])
+
+    def analisi():
+        tables = load_tables({
+            "inventari": (inventari_url, {"fields": ["ProductID"]}),
+            "detall": (detall_url, {"fields": ["ProductID", "Quantity", "Data"]}),
+            "comanda": (comanda_url, {"fields": ["OrderID", "CustomerID", "Data", "Detall comanda", "Status"]})
+        })
+        return tables["detall"]
+
+    return {"Comandes": comandes, "Detall comanda": detall, "Inventari": inventari,
+            "Client": client, "Anàlisi Predictiva": analisi}
+
+
+def reset_state(mode):
+    """Deixa la memòria cau i els snapshots com correspon al mode."""
+    from airtable_cache import table_cache, lookup_cache
+    from airtable_sync import reset_snapshots
+
+    if mode in ("cold", "sync"):
+        table_cache.clear()
+        lookup_cache.clear()
+    if mode == "cold":
+        reset_snapshots()
+
+
+def measure(mock, loader, mode, memory=True):
+    """
+    Executa loader() en l'estat 'mode' i torna peticions, bytes, segons i files.
+    Si memory=True, es torna a executar des del mateix estat amb tracemalloc
+    per obtenir el pic de memòria sense alterar la mesura de temps.
+    """
+    reset_state(mode)
+    mock.reset_counts()
+    start = time.perf_counter()
+    df = loader()
+    seconds = time.perf_counter() - start
+    counts = dict(mock.counts)
+    result = {
+        "requests": sum(v for k, v in counts.items() if k != "429"),
+        "throttled": counts.get("429", 0),
+        "bytes": mock.bytes_sent,
+        "seconds": round(seconds, 4),
+        "peak_mb": None,
+        "rows": len(df),
+    }
+    if memory:
+        reset_state(mode)
+        tracemalloc.start()
+        loader()
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    return result
+
+
+def run(sizes, rate, latency, rate_429, memory=True, verbose=True):
+    """Executa el benchmark per a cada mida i torna la llista de resultats."""
+    port = _free_port()
+    _setup_environment(port)
+
+    from airtable_data import client
+    from airtable_http import RateLimiter
+    from mock_airtable import MockAirtableServer, MockBase
+
+    client.limiter = RateLimiter(rate)
+    mock = MockAirtableServer(port=port, latency=latency, rate_429=rate_429).start()
+    loaders = screen_loaders()
+    results = []
+    try:
+        for size in sizes:
+            base = MockBase()
+            base.seed(size)
+            mock.base = base
+            for screen, loader in loaders.items():
+                for mode in MODES:
+                    result = dict(size=size, screen=screen, mode=mode, **measure(mock, loader, mode, memory))
+                    results.append(result)
+                    if verbose:
+                        peak = f"{result['peak_mb']:8.1f} MB" if result["peak_mb"] is not None else ""
+                        print(f"{size:>7} {screen:<18} {mode:<5} {result['requests']:>6} req "
+                              f"{result['bytes'] / 2**20:8.2f} MB {result['seconds']:8.3f} s {peak}")
+    finally:
+        mock.stop()
+    return results
+
+
+def compare(results, baseline):
+    """Torna la llista de regressions respecte a la referència (mateixa mida/pantalla/mode)."""
+    reference = {(r["size"], r["screen"], r["mode"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        ref = reference.get((r["size"], r["screen"], r["mode"]))
+        if ref is None:
+            continue
+        label = f"{r['size']} {r['screen']} {r['mode']}"
+        if r["requests"] > ref["requests"]:
+            regressions.append(f"{label}: {ref['requests']} -> {r['requests']} peticions")
+        if r["seconds"] > TIME_FLOOR and r["seconds"] > ref["seconds"] * TIME_TOLERANCE:
+            regressions.append(f"{label}: {ref['seconds']:.3f} s -> {r['seconds']:.3f} s")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la càrrega de dades contra el mock d'Airtable")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Línies de Detall comanda de cada execució")
+    parser.add_argument("--rate", type=float, default=1000,
+                        help="Peticions/s del client (Airtable real: 5)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Segons afegits a cada resposta del mock")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probabilitat de 429 del mock")
+    parser.add_argument("--no-memory", action="store_true", help="No mesurar memòria (tracemalloc alenteix)")
+    parser.add_argument("--save-baseline", help="Desa els resultats en aquest fitxer JSON")
+    parser.add_argument("--baseline", help="Compara amb aquest fitxer JSON i falla si hi ha regressions")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.rate, args.latency, args.rate_429, memory=not args.no_memory)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Referència desada a {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("Sense regressions respecte a la referència.")
@@ -0,0 +1,352 @@
+# ------------------------------------------------------------------------
+# IMPORTACIÓ I EXPORTACIÓ MASSIVA (CSV / JSONL)
+# ------------------------------------------------------------------------
+# Importació: el fitxer es llegeix a trossos de CHUNK_SIZE files; cada tros
+# es valida (tipus, obligatoris, duplicats, estats) i els camps vinculats es
+# resolen a record_id amb un índex en memòria (CustomerID, ProductID,
+# OrderID -> recXXX), i es crea en lots de 10 repartits entre fils
+# (bulk_seed.bulk_create, amb el límit de 5 peticions/s del client compartit).
+# Exportació: es recorren les pàgines d'Airtable i s'escriu cada pàgina al
+# fitxer a mesura que arriba; només es guarden en memòria els índexs dels
+# camps vinculats (record_id -> CustomerID / ProductID / OrderID).
+#
+# OrderID de Comanda és autonumèric: en importar comandes, la columna OrderID
+# (si hi és) només serveix de referència perquè les línies importades a la
+# mateixa execució s'hi puguin vincular. Les línies la busquen primer entre
+# aquestes referències i després entre els OrderID que ja hi ha a Airtable.
+#
+# Ús:
+#     python bulk_io.py import client=clients.csv inventari=productes.csv
+#     python bulk_io.py import comanda=comandes.csv detall=linies.jsonl --decrement-stock
+#     python bulk_io.py export detall linies.csv
+import argparse
+import csv
+import json
+import os
+import sys
+
+import pandas as pd
+
+CHUNK_SIZE = 1000       # Files del fitxer que es validen i s'envien alhora
+STATUSES = {"", "Pending", "Valid", "Invalid", "Duplicate"}
+
+# Columnes del fitxer de cada taula: tipus o ("link", taula vinculada, camp d'Airtable)
+SPECS = {
+    "client": {
+        "key": "CustomerID", "required": ["CustomerID"],
+        "columns": {"CustomerID": "text", "Name": "text", "Email": "text", "Phone": "text",
+                    "Address": "text", "Registration Date": "date"},
+    },
+    "inventari": {
+        "key": "ProductID", "required": ["ProductID"],
+        "columns": {"ProductID": "text", "ProductName": "text", "Stock": "int",
+                    "ReorderLevel": "int", "Reposition": "int"},
+    },
+    "comanda": {
+        "key": "OrderID", "required": ["CustomerID"],
+        "columns": {"OrderID": "ref", "CustomerID": ("link", "client", "CustomerID"),
+                    "Data": "date", "Status": "status"},
+    },
+    "detall": {
+        "key": None, "required": ["OrderID", "ProductID", "Quantity"],
+        "columns": {"OrderID": ("link", "comanda", "Comanda"), "ProductID": ("link", "inventari", "ProductID"),
+                    "Quantity": "int", "Data": "date"},
+    },
+}
+
+
+def table_url(kind):
+    """URL base (sense vista) de la taula."""
+    from airtable_config import client_url, comanda_url, detall_url, inventari_url
+    return {"client": client_url, "inventari": inventari_url, "comanda": comanda_url, "detall": detall_url}[kind]
+
+
+def key_text(value):
+    """Clau com a text ('134', no '134.0'); None si és buida."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def read_chunks(source, fmt=None, chunk_size=CHUNK_SIZE):
+    """
+    Genera DataFrames de chunk_size files (tot com a text) d'un fitxer CSV o JSONL.
+    source és una ruta o un fitxer obert; fmt ("csv"/"jsonl") es dedueix de l'extensió.
+    """
+    if fmt is None:
+        name = source if isinstance(source, str) else getattr(source, "name", "")
+        fmt = "jsonl" if name.lower().endswith((".jsonl", ".json", ".ndjson")) else "csv"
+    if fmt == "csv":
+        reader = pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    else:
+        reader = pd.read_json(source, lines=True, dtype=False, chunksize=chunk_size)
+    for chunk in reader:
+        yield chunk.apply(lambda column: column.map(key_text)).astype(object)
+
+
+class Importer:
+    """Importa fitxers a Airtable. Els índexs i les referències es comparteixen entre fitxers."""
+
+    def __init__(self, client=None, workers=None):
+        from airtable_data import client as shared_client
+        from bulk_seed import WORKERS
+
+        self.client = client or shared_client
+        self.workers = workers or WORKERS
+        self.indexes = {}   # {taula: {clau: recXXX}} dels registres que ja hi ha a Airtable
+        self.refs = {}      # {taula: {referència del fitxer: recXXX}} creats en aquesta execució
+
+    def index(self, kind):
+        """Índex clau -> record_id de la taula (es llegeix un sol cop, només el camp clau)."""
+        if kind not in self.indexes:
+            from airtable_data import fetch_table
+
+            key = SPECS[kind]["key"]
+            df, error = fetch_table(table_url(kind), fields=[key])
+            if error:
+                raise RuntimeError(error)
+            keys = df[key].map(key_text)
+            self.indexes[kind] = dict(zip(keys[keys.notna()], df["record_id"][keys.notna()]))
+        return self.indexes[kind]
+
+    def resolve(self, kind, values):
+        """Series de claus -> Series de record_id (None si no es troba)."""
+        refs = self.refs.get(kind, {})
+        index = self.index(kind)
+        return values.map(lambda v: refs.get(v) or index.get(v) if v is not None else None)
+
+    def validate(self, kind, chunk, first_row):
+        """
+        Converteix un tros del fitxer als camps d'Airtable.
+        Torna (records, errors): records és [(fila, referència, camps)] de les files
+        vàlides i errors [(fila, missatge)]. 'fila' és el número de fila del fitxer (1 = primera).
+        """
+        spec = SPECS[kind]
+        rows = pd.RangeIndex(first_row, first_row + len(chunk))
+        chunk = chunk.reindex(columns=list(spec["columns"])).set_axis(rows).astype(object)
+        chunk = chunk.where(chunk.notna(), None)    # Les columnes que falten al fitxer, a None
+        problems = pd.Series("", index=rows)
+
+        def flag(mask, message):
+            problems[mask & (problems == "")] = message
+
+        for column in spec["required"]:
+            flag(chunk[column].isna(), f"falta {column}")
+
+        fields = pd.DataFrame(index=rows)
+        for column, kind_of in spec["columns"].items():
+            values = chunk[column]
+            present = values.notna()
+            if kind_of == "text":
+                fields[column] = values
+            elif kind_of == "int":
+                numbers = pd.to_numeric(values, errors="coerce")
+                ok = numbers.notna() & (numbers >= 0) & (numbers % 1 == 0)
+                flag(present & ~ok, f"{column} ha de ser un enter >= 0")
+                fields[column] = numbers.where(ok).astype("Int64").astype(object).where(ok, None)
+            elif kind_of == "date":
+                dates = pd.to_datetime(values, errors="coerce")
+                flag(present & dates.isna(), f"{column} no és una data")
+                fields[column] = dates.dt.strftime("%Y-%m-%d").where(dates.notna(), None)
+            elif kind_of == "status":
+                flag(present & ~values.isin(STATUSES), f"Status ha de ser un de {sorted(STATUSES - {''})}")
+                fields[column] = values
+            elif kind_of == "ref":
+                continue  # Només referència per a altres fitxers: OrderID és autonumèric
+            else:
+                _, target, airtable_field = kind_of
+                record_ids = self.resolve(target, values)
+                flag(present & record_ids.isna(), f"{column} desconegut")
+                fields[airtable_field] = record_ids.map(lambda rec_id: [rec_id] if rec_id else None)
+
+        # Claus repetides (al fitxer o ja existents a Airtable)
+        key = spec["key"]
+        if spec["columns"].get(key) == "text":
+            keys = chunk[key]
+            flag(keys.isin(self.index(kind).keys()) | keys.isin(self.refs.get(kind, {}).keys()),
+                 f"{key} ja existeix")
+            flag(keys.notna() & keys.duplicated(), f"{key} repetit al fitxer")
+        references = chunk[key] if key else pd.Series(None, index=rows)
+
+        valid = problems == ""
+        fields = fields.astype(object)
+        fields = fields.where(fields.notna(), None)
+        records = [
+            (row, references[row], {k: v for k, v in values.items() if v is not None})
+            for row, values in zip(rows[valid], fields[valid].to_dict("records"))
+        ]
+        errors = list(problems[~valid].items())
+        return records, errors
+
+    def import_file(self, kind, source, fmt=None, chunk_size=CHUNK_SIZE, progress=None, dry_run=False):
+        """
+        Importa un fitxer CSV/JSONL a la taula 'kind' (client, inventari, comanda, detall).
+        - progress(rows, created, errors): es crida després de cada tros
+        - dry_run: només valida, no escriu res
+        Torna {"rows", "created", "errors": [(fila, missatge)], "record_ids": [...]}.
+        """
+        from airtable_data import invalidate_table_cache
+        from bulk_seed import bulk_create
+
+        url = table_url(kind)
+        key = SPECS[kind]["key"]
+        summary = {"rows": 0, "created": 0, "errors": [], "record_ids": []}
+        for chunk in read_chunks(source, fmt, chunk_size):
+            records, errors = self.validate(kind, chunk, summary["rows"] + 1)
+            summary["rows"] += len(chunk)
+            summary["errors"].extend(errors)
+            if records and not dry_run:
+                ids, failures = bulk_create(self.client, url, [fields for _, _, fields in records],
+                                            workers=self.workers)
+                for (row, reference, fields), rec_id in zip(records, ids):
+                    if not rec_id:
+                        continue
+                    summary["record_ids"].append(rec_id)
+                    # Els registres nous es poden vincular des dels trossos i fitxers següents
+                    if reference is not None:
+                        self.refs.setdefault(kind, {})[reference] = rec_id
+                summary["created"] += sum(1 for rec_id in ids if rec_id)
+                summary["errors"].extend((records[f["index"]][0], f"HTTP {f['status']}: {f['error']}")
+                                         for f in failures)
+            if progress:
+                progress(summary["rows"], summary["created"], len(summary["errors"]))
+
+        if summary["created"]:
+            invalidate_table_cache(url)
+            if key and kind in self.indexes:
+                # L'índex es tornarà a llegir amb les claus noves quan calgui
+                del self.indexes[kind]
+        return summary
+
+
+def export_table(kind, target, fmt=None, progress=None, client=None):
+    """
+    Exporta la taula 'kind' a target (ruta o fitxer de text obert) en CSV o JSONL,
+    pàgina a pàgina. Els camps vinculats s'escriuen amb la clau llegible
+    (CustomerID, ProductID, OrderID), igual que els fitxers d'importació.
+    - progress(rows): es crida després de cada pàgina
+    Torna el nombre de registres escrits. Si falla una lectura, llença RuntimeError
+    (el fitxer queda a mitges).
+    """
+    from airtable_data import client as shared_client, fetch_table
+    from airtable_sync import AirtableSyncError, fetch_records
+
+    client = client or shared_client
+    spec = SPECS[kind]
+    if fmt is None:
+        name = target if isinstance(target, str) else getattr(target, "name", "")
+        fmt = "jsonl" if name.lower().endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+    # Índexs inversos record_id -> clau llegible dels camps vinculats
+    columns = list(spec["columns"])
+    airtable_fields = {}
+    reverse = {}
+    for column, kind_of in spec["columns"].items():
+        if isinstance(kind_of, tuple):
+            _, linked, airtable_field = kind_of
+            linked_key = SPECS[linked]["key"]
+            df, error = fetch_table(table_url(linked), fields=[linked_key])
+            if error:
+                raise RuntimeError(error)
+            reverse[column] = dict(zip(df["record_id"], df[linked_key].map(key_text)))
+            airtable_fields[column] = airtable_field
+        else:
+            airtable_fields[column] = column
+
+    def row_of(record):
+        fields = record.get("fields", {})
+        row = {}
+        for column in columns:
+            value = fields.get(airtable_fields[column])
+            if column in reverse:
+                value = reverse[column].get(value[0]) if isinstance(value, list) and value else None
+            row[column] = value
+        return row
+
+    own_file = isinstance(target, str)
+    out = open(target, "w", encoding="utf-8", newline="") if own_file else target
+    try:
+        writer = csv.DictWriter(out, fieldnames=columns) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        params = {"fields[]": list(dict.fromkeys(airtable_fields.values())), "pageSize": 100}
+        written = 0
+        for record in fetch_records(table_url(kind), client, params):
+            row = row_of(record)
+            if writer:
+                writer.writerow(row)
+            else:
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            written += 1
+            if progress and written % 100 == 0:
+                progress(written)
+        if progress:
+            progress(written)
+        return written
+    except AirtableSyncError as e:
+        raise RuntimeError(f"Error al exportar ({e}). El fitxer està incomplet.") from e
+    finally:
+        if own_file:
+            out.close()
+
+
+if __name__ == "__main__":
+    import logging
+
+    parser = argparse.ArgumentParser(description="Importa i exporta taules d'Airtable en CSV/JSONL")
+    commands = parser.add_subparsers(dest="command", required=True)
+    imp = commands.add_parser("import", help="Importa fitxers (en l'ordre donat)")
+    imp.add_argument("files", nargs="+", metavar="TAULA=FITXER",
+                     help=f"Taula ({', '.join(SPECS)}) i fitxer CSV/JSONL")
+    imp.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    imp.add_argument("--workers", type=int, default=None, help="Fils que envien lots alhora")
+    imp.add_argument("--dry-run", action="store_true", help="Només validar")
+    imp.add_argument("--decrement-stock", action="store_true",
+                     help="Descomptar de l'estoc les línies de detall importades")
+    exp = commands.add_parser("export", help="Exporta una taula")
+    exp.add_argument("table", choices=list(SPECS))
+    exp.add_argument("file", help="Fitxer de sortida (.csv o .jsonl)")
+    args = parser.parse_args()
+
+    # Fora de 'streamlit run', airtable_data avisa que no hi ha sessió
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    if args.command == "export":
+        try:
+            total = export_table(args.table, args.file,
+                                 progress=lambda rows: print(f"\r{rows} registres", end="", flush=True))
+        except RuntimeError as e:
+            sys.exit(f"\n{e}")
+        print(f"\n{total} registres exportats a {args.file}")
+        sys.exit(0)
+
+    importer = Importer(workers=args.workers)
+    failed = False
+    for item in args.files:
+        kind, _, path = item.partition("=")
+        if kind not in SPECS or not os.path.exists(path):
+            parser.error(f"'{item}' ha de ser TAULA=FITXER amb una taula de {list(SPECS)} i un fitxer existent")
+        print(f"{kind} <- {path}")
+        summary = importer.import_file(
+            kind, path, chunk_size=args.chunk_size, dry_run=args.dry_run,
+            progress=lambda rows, created, errors: print(f"\r  {rows} files · {created} creats · {errors} errors",
+                                                         end="", flush=True)
+        )
+        print()
+        for row, message in summary["errors"][:20]:
+            print(f"  fila {row}: {message}")
+        if len(summary["errors"]) > 20:
+            print(f"  ... i {len(summary['errors']) - 20} errors més")
+        failed = failed or bool(summary["errors"])
+
+        if kind == "detall" and args.decrement_stock and summary["record_ids"]:
+            from airtable_data import fetch_table
+            from stock_pipeline import apply_stock_decrements
+
+            lines, _ = fetch_table(table_url("detall"), use_cache=False, fields=["ProductID", "Quantity"])
+            result = apply_stock_decrements(lines[lines["record_id"].isin(summary["record_ids"])])
+            print(f"  Stock actualitzat a {int(result['updated'].sum())} productes")
+    sys.exit(1 if failed else 0)
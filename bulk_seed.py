@@ -0,0 +1,120 @@
+# ------------------------------------------------------------------------
+# CÀRREGA MASSIVA DE REGISTRES AMB DIARI (REPRENIBLE)
+# ------------------------------------------------------------------------
+# Motor que fan servir generate_test_data i generate_test_orders:
+#   - crea registres en lots de 10 repartits en un grup fix de fils
+#     (el client compartit manté el límit de 5 peticions/s entre tots)
+#   - apunta cada lot creat en un diari JSONL local abans de seguir
+#   - si el procés s'atura, la nova execució llegeix el diari i només
+#     crea els registres que faltaven
+# Perquè la represa funcioni, els registres s'han de generar igual a cada
+# execució: la llavor aleatòria i les dades d'entrada (clients, productes
+# existents...) es guarden al diari amb remember().
+# Airtable no té claus d'idempotència: si el procés mor just després que un
+# lot s'hagi creat però abans d'apuntar-lo, aquell lot (com a màxim un per
+# fil) es tornarà a crear en reprendre.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from airtable_http import BATCH_SIZE
+from jsonl_journal import append_entry, read_journal
+
+WORKERS = 4     # Fils que envien lots alhora
+
+
+class SeedJournal:
+    """
+    Diari d'una càrrega. Cada línia és un objecte JSON:
+      {"meta": clau, "value": valor}            dades fixades amb remember()
+      {"step": pas, "ids": {"índex": "recXXX"}} registres creats d'un lot
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = {}
+        self.created = {}       # {pas: {índex: recXXX}}
+        self._lock = threading.Lock()
+        for entry in read_journal(path):
+            if "meta" in entry:
+                self.meta[entry["meta"]] = entry["value"]
+            else:
+                ids = {int(i): rec_id for i, rec_id in entry["ids"].items()}
+                self.created.setdefault(entry["step"], {}).update(ids)
+
+    @property
+    def resumed(self):
+        return bool(self.meta or self.created)
+
+    def _append(self, entry):
+        with self._lock:
+            append_entry(self.path, entry)
+
+    def remember(self, key, compute):
+        """Torna el valor guardat per 'key' o calcula'l amb compute() i guarda'l."""
+        if key not in self.meta:
+            self.meta[key] = compute()
+            self._append({"meta": key, "value": self.meta[key]})
+        return self.meta[key]
+
+    def done(self, step):
+        """Registres ja creats del pas: {índex: recXXX}."""
+        with self._lock:
+            return dict(self.created.get(step, {}))
+
+    def record(self, step, ids):
+        """Apunta els registres creats d'un lot ({índex: recXXX})."""
+        if not ids:
+            return
+        with self._lock:
+            self.created.setdefault(step, {}).update(ids)
+        self._append({"step": step, "ids": {str(i): rec_id for i, rec_id in ids.items()}})
+
+    def finish(self):
+        """Marca la càrrega com a acabada (el diari es conserva amb extensió .done)."""
+        if os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.done")
+
+
+def bulk_create(client, url, fields_list, journal=None, step=None, workers=WORKERS, progress=None):
+    """
+    Crea fields_list a la taula 'url' en lots de 10 amb 'workers' fils.
+    Si es passa journal, se salten els índexs que ja hi consten i cada lot
+    creat s'hi apunta en acabar.
+    - progress(done, total): es crida cada cop que acaba un lot
+    Torna (ids, failures): ids alineada amb fields_list (record_id o None) i
+    failures amb l'índex, els camps i l'error de cada registre no creat.
+    """
+    ids = [None] * len(fields_list)
+    done = journal.done(step) if journal is not None else {}
+    for i, rec_id in done.items():
+        if i < len(ids):
+            ids[i] = rec_id
+
+    pending = [i for i in range(len(fields_list)) if ids[i] is None]
+    batches = [pending[s:s + BATCH_SIZE] for s in range(0, len(pending), BATCH_SIZE)]
+    failures = []
+    created = len(fields_list) - len(pending)
+
+    def send(batch):
+        batch_ids, batch_failures = client.batch_create(url, [fields_list[i] for i in batch])
+        new_ids = {batch[j]: rec_id for j, rec_id in enumerate(batch_ids) if rec_id}
+        if journal is not None:
+            journal.record(step, new_ids)
+        for f in batch_failures:
+            f["index"] = batch[f["index"]]
+        return new_ids, batch_failures
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(send, batch) for batch in batches]
+        for future in as_completed(futures):
+            new_ids, batch_failures = future.result()
+            for i, rec_id in new_ids.items():
+                ids[i] = rec_id
+            failures.extend(batch_failures)
+            created += len(new_ids)
+            if progress:
+                progress(created, len(fields_list))
+
+    failures.sort(key=lambda f: f["index"])
+    return ids, failures
@@ -0,0 +1,213 @@
+# ------------------------------------------------------------------------
+# PROCÉS EN SEGON PLA: CLASSIFICACIÓ AUTOMÀTICA DE COMANDES PENDENTS
+# ------------------------------------------------------------------------
+# Procés independent de Streamlit que, cada 'interval' segons:
+#   1. sincronitza Comanda i Detall comanda (només els canvis des de l'última
+#      lectura, com fan les pantalles)
+#   2. classifica les comandes Pending amb l'última versió del classificador
+#      desada des de la pantalla (order_classifier.py); no n'entrena cap
+#   3. escriu els estats a Airtable en lots de 10
+# Les mètriques (comandes/s, retard des que es veu una comanda pendent fins
+# que s'escriu el seu estat, pendents, errors) es registren a cada cicle i,
+# amb --metrics-port, es poden consultar en JSON a http://host:port/metrics.
+# A /metrics/prometheus hi ha els totals d'instrumentation.py (peticions HTTP,
+# pàgines, transformacions i prediccions del procés) en format Prometheus.
+#
+# Ús:
+#     python classify_worker.py                       # cada 30 s
+#     python classify_worker.py --interval 10 --metrics-port 9101
+#     python classify_worker.py --once                # un sol cicle (cron)
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INTERVAL = 30           # Segons entre cicles
+LAG_HISTORY = 1000      # Comandes de les quals es guarda el retard
+COMANDA_FIELDS = ["OrderID", "CustomerID", "Data", "Detall comanda", "Status"]
+DETALL_FIELDS = ["Quantity"]
+
+logger = logging.getLogger("classify_worker")
+
+
+class WorkerMetrics:
+    """Comptadors i retards del procés, segurs entre fils."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.cycles = 0
+        self.errors = 0
+        self.classified_total = 0
+        self.failed_total = 0
+        self.pending = 0
+        self.model_version = None
+        self.last_cycle_seconds = None
+        self.last_cycle_rate = None     # Comandes escrites/s de l'últim cicle amb feina
+        self.last_success = None        # time.time() de l'últim cicle sense errors
+        self.lags = deque(maxlen=LAG_HISTORY)
+        self._lock = threading.Lock()
+
+    def record_cycle(self, seconds, pending, classified, failed, lags, version, write_seconds):
+        with self._lock:
+            self.cycles += 1
+            self.pending = pending
+            self.classified_total += classified
+            self.failed_total += failed
+            self.model_version = version
+            self.last_cycle_seconds = seconds
+            if classified and write_seconds:
+                self.last_cycle_rate = classified / write_seconds
+            self.lags.extend(lags)
+            self.last_success = time.time()
+
+    def record_error(self):
+        with self._lock:
+            self.cycles += 1
+            self.errors += 1
+
+    def snapshot(self):
+        """Mètriques actuals com a diccionari (el que es mostra a /metrics)."""
+        with self._lock:
+            now = time.time()
+            lags = sorted(self.lags)
+            uptime = now - self.started
+            return {
+                "uptime_seconds": round(uptime, 1),
+                "cycles": self.cycles,
+                "errors": self.errors,
+                "pending": self.pending,
+                "classified_total": self.classified_total,
+                "failed_total": self.failed_total,
+                "model_version": self.model_version,
+                "throughput_per_second": round(self.classified_total / uptime, 3) if uptime else 0.0,
+                "last_cycle_rate": round(self.last_cycle_rate, 2) if self.last_cycle_rate else None,
+                "last_cycle_seconds": round(self.last_cycle_seconds, 3) if self.last_cycle_seconds else None,
+                "seconds_since_success": round(now - self.last_success, 1) if self.last_success else None,
+                "lag_p50_seconds": round(lags[len(lags) // 2], 2) if lags else None,
+                "lag_max_seconds": round(lags[-1], 2) if lags else None,
+            }
+
+
+class ClassifyWorker:
+    """Un cicle = sincronitzar, classificar les pendents i escriure'n l'estat."""
+
+    def __init__(self, metrics=None, store=None):
+        from order_classifier import get_classifier_store
+
+        self.metrics = metrics or WorkerMetrics()
+        self.store = store or get_classifier_store()
+        self.first_seen = {}    # {record_id: time.time() en què es va veure pendent per primer cop}
+
+    def run_once(self):
+        """Executa un cicle i torna el nombre de comandes escrites."""
+        from airtable_config import comanda_url, detall_url
+        from airtable_data import fetch_table, update_airtable_records
+        from order_classifier import build_order_features, pending_orders, predict_pending
+
+        start = time.time()
+        # Sense memòria cau: cada cicle demana els canvis des de l'anterior
+        df_comanda, error = fetch_table(comanda_url, use_cache=False, fields=COMANDA_FIELDS)
+        if error is None:
+            df_detall, error = fetch_table(detall_url, use_cache=False, fields=DETALL_FIELDS)
+        if error:
+            raise RuntimeError(error)
+
+        df_features = build_order_features(df_comanda, df_detall)
+        pending_ids = set(pending_orders(df_features)["record_id"])
+        # Només recordem les que continuen pendents
+        self.first_seen = {rec_id: self.first_seen.get(rec_id, start) for rec_id in pending_ids}
+
+        artifact = self.store.load()
+        if artifact is None:
+            logger.warning("No hi ha cap classificador desat: entrena'n un des de la pantalla d'Anàlisi Predictiva.")
+            self.metrics.record_cycle(time.time() - start, len(pending_ids), 0, 0, [], None, None)
+            return 0
+
+        predictions = predict_pending(artifact, df_features)
+        updated, failures = [], []
+        write_start = time.time()
+        if not predictions.empty:
+            updates = [(rec_id, {"Status": status})
+                       for rec_id, status in zip(predictions["record_id"], predictions["Status"])]
+            updated, failures = update_airtable_records(comanda_url, updates)
+        done = time.time()
+
+        lags = [done - self.first_seen.pop(rec_id) for rec_id in updated if rec_id in self.first_seen]
+        for f in failures:
+            logger.error("Error %s a la comanda %s: %s", f["status"], f["record_id"], f["error"])
+        self.metrics.record_cycle(done - start, len(pending_ids) - len(updated), len(updated), len(failures),
+                                  lags, artifact["version"], done - write_start)
+        return len(updated)
+
+    def run_forever(self, interval=INTERVAL, stop=None):
+        """Repeteix run_once() cada 'interval' segons fins que s'activa 'stop' (threading.Event)."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            cycle_start = time.time()
+            try:
+                written = self.run_once()
+                logger.info("Cicle: %d comandes classificades · %s", written, json.dumps(self.metrics.snapshot()))
+            except Exception as e:
+                self.metrics.record_error()
+                logger.error("Cicle fallit: %s", e)
+            stop.wait(max(0.0, interval - (time.time() - cycle_start)))
+
+
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    """
+    Serveix des d'un fil metrics.snapshot() en JSON a /metrics i els totals
+    d'instrumentació en format Prometheus a /metrics/prometheus. Torna el servidor.
+    """
+    from instrumentation import recorder
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            if path == "/metrics":
+                body, content_type = json.dumps(metrics.snapshot()).encode("utf-8"), "application/json"
+            elif path == "/metrics/prometheus":
+                body, content_type = recorder.prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classifica en segon pla les comandes pendents")
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="Segons entre cicles")
+    parser.add_argument("--once", action="store_true", help="Executa un sol cicle i surt")
+    parser.add_argument("--metrics-port", type=int, help="Port per consultar les mètriques (JSON a /metrics)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    # Fora de 'streamlit run', airtable_data avisa que no hi ha sessió
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    worker = ClassifyWorker()
+    if args.metrics_port:
+        serve_metrics(worker.metrics, args.metrics_port)
+        logger.info("Mètriques a http://127.0.0.1:%d/metrics", args.metrics_port)
+
+    if args.once:
+        print(f"{worker.run_once()} comandes classificades")
+        print(json.dumps(worker.metrics.snapshot(), indent=2))
+    else:
+        try:
+            worker.run_forever(args.interval)
+        except KeyboardInterrupt:
+            pass
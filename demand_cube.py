@@ -0,0 +1,150 @@
+# ------------------------------------------------------------------------
+# CUB DE DEMANDA DIÀRIA (PRODUCTE x DIA -> QUANTITAT)
+# ------------------------------------------------------------------------
+# Taula agregada que es manté en memòria per tot el procés. Es construeix
+# la primera vegada a partir de Detall comanda i, a cada nova lectura, només
+# s'hi sumen/resten les línies noves, modificades o esborrades, en lloc de
+# tornar a agrupar tota la taula. Les pantalles fan servir sync(): les línies
+# a revisar surten directament dels deltes de la sincronització incremental
+# (airtable_sync), sense comparar totes les línies; update() compara
+# qualsevol lectura (df_detall) amb l'anterior per record_id.
+# La predicció, la comparació amb dades reals i la predicció en lot la
+# llegeixen directament (columnes ProductID, ds, y com batch_forecast).
+import threading
+
+import pandas as pd
+
+LINE_COLUMNS = ["product", "ds", "y"]
+DEMAND_FIELDS = ["ProductID", "Quantity", "Data"]     # Projecció de Detall comanda que llegeix el cub
+
+
+def detall_lines(df_detall):
+    """
+    Una fila per línia de Detall comanda, indexada per record_id:
+      product: record_id del primer producte vinculat
+      ds: dia (datetime normalitzat)
+      y: quantitat (0 si no és numèrica)
+    """
+    if df_detall.empty or "record_id" not in df_detall.columns:
+        return pd.DataFrame(columns=LINE_COLUMNS, index=pd.Index([], name="record_id"))
+    # Primer element de cada llista de productes vinculats, sense bucles fila a fila
+    products = df_detall["ProductID"].reset_index(drop=True).explode()
+    products = products[~products.index.duplicated(keep="first")]
+    # Dies sense zona horària, per comparar-los amb les dates de tall
+    days = pd.to_datetime(df_detall["Data"], errors="coerce")
+    if days.dt.tz is not None:
+        days = days.dt.tz_localize(None)
+    lines = pd.DataFrame({
+        "product": products.values,
+        "ds": days.dt.normalize().values,
+        "y": pd.to_numeric(df_detall["Quantity"], errors="coerce").fillna(0).values,
+    }, index=pd.Index(df_detall["record_id"].values, name="record_id"))
+    return lines[~lines.index.duplicated(keep="last")]
+
+
+class DemandCube:
+    """Demanda diària per producte, mantinguda de forma incremental."""
+
+    def __init__(self):
+        self.lines = detall_lines(pd.DataFrame())
+        # {(product, ds): y, n}. n = línies que hi contribueixen (per saber quan treure una cel·la)
+        self.cells = pd.DataFrame(columns=["y", "n"],
+                                  index=pd.MultiIndex.from_arrays([[], []], names=["product", "ds"]))
+        self.source = None      # Snapshot d'airtable_sync que segueix sync() (None després d'update)
+        self.version = 0        # Versió del snapshot ja aplicada
+        self.lock = threading.Lock()
+
+    def update(self, df_detall):
+        """
+        Aplica al cub les diferències entre la lectura anterior i df_detall
+        (comparant totes les línies). Torna el nombre de línies que han canviat
+        (noves + modificades + esborrades).
+        """
+        new = detall_lines(df_detall)
+        with self.lock:
+            self.source = None
+            return self._replace(new)
+
+    def sync(self, snapshot):
+        """
+        Aplica al cub només les línies que han canviat al snapshot de Detall comanda
+        (airtable_sync.get_snapshot amb DEMAND_FIELDS) des de l'última crida: les que
+        han portat els deltes i les que la reconciliació ha esborrat, sense tornar a
+        recórrer la taula. Si el snapshot és un altre o s'ha tornat a carregar sencer,
+        es compara tot com a update(). Torna el nombre de línies aplicades.
+        """
+        with self.lock:
+            with snapshot.lock:
+                changes = snapshot.changes_since(self.version) if snapshot is self.source else None
+                version = snapshot.version
+                df = snapshot.to_dataframe(None if changes is None else changes[0])
+            # Airtable omet els camps buits: pot faltar alguna columna
+            new = detall_lines(df.reindex(columns=DEMAND_FIELDS + ["record_id"]))
+            self.source, self.version = snapshot, version
+            if changes is None:
+                return self._replace(new)
+
+            changed, removed = changes
+            old = self.lines
+            gone = old.index.intersection(list(changed | removed))
+            self._apply(old.loc[gone], new)
+            self.lines = pd.concat([old.drop(gone), new]) if len(new) else old.drop(gone)
+            return len(changed | removed)
+
+    def _replace(self, new):
+        """Substitueix totes les línies per new aplicant només les diferències (amb self.lock)."""
+        old = self.lines
+        common = new.index.intersection(old.index)
+        a, b = old.loc[common, LINE_COLUMNS], new.loc[common, LINE_COLUMNS]
+        # Amb tipus nul·lables (airtable_parser), NA != valor dona NA: compta com a canvi
+        differs = (a != b).fillna(True).astype(bool) & ~(a.isna() & b.isna())
+        changed = common[differs.any(axis=1).values]
+
+        removed = old.index.difference(new.index).union(changed)
+        added = new.index.difference(old.index).union(changed)
+        self._apply(old.loc[removed], new.loc[added])
+        self.lines = new
+        return len(removed.union(added))
+
+    def _apply(self, minus, plus):
+        """Resta les línies de minus i suma les de plus a les cel·les (amb self.lock)."""
+        if minus.empty and plus.empty:
+            return
+        minus = minus.assign(n=-1)
+        minus["y"] = -minus["y"]
+        delta = (
+            pd.concat([plus.assign(n=1), minus])
+            .dropna(subset=["product", "ds"])
+            .groupby(["product", "ds"])[["y", "n"]]
+            .sum()
+        )
+        cells = self.cells.add(delta, fill_value=0)
+        self.cells = cells[cells["n"] > 0]
+
+    def to_frame(self, product_names=None):
+        """
+        Demanda diària com a DataFrame ProductID, ds, y (ordenat).
+        product_names ({record_id: 'PRODxxx'}) tradueix els productes; els que no
+        hi són es deixen amb la record_id.
+        """
+        with self.lock:
+            cells = self.cells["y"].reset_index()
+        if product_names:
+            cells["product"] = cells["product"].map(product_names).fillna(cells["product"])
+        demand = cells.groupby(["product", "ds"], as_index=False)["y"].sum()
+        demand.columns = ["ProductID", "ds", "y"]
+        return demand.sort_values(["ProductID", "ds"]).reset_index(drop=True)
+
+
+# Cub compartit per tot el procés
+_cube = None
+_cube_lock = threading.Lock()
+
+
+def get_demand_cube():
+    """Torna el cub de demanda compartit (es crea la primera vegada)."""
+    global _cube
+    with _cube_lock:
+        if _cube is None:
+            _cube = DemandCube()
+        return _cube
@@ -0,0 +1,185 @@
+# ------------------------------------------------------------------------
+# INSTRUMENTACIÓ DELS CAMINS CALENTS (PER PANTALLA)
+# ------------------------------------------------------------------------
+# Cada operació cara (petició HTTP, pàgina d'Airtable, transformació de
+# DataFrame, ajust/predicció de models, escriptura) registra un esdeveniment
+# amb categoria, nom, segons, bytes i files. Els esdeveniments van:
+#   - al render de pantalla en curs (begin_render/end_render a app.py), per
+#     veure en què ha passat el temps l'última vegada que s'ha dibuixat
+#   - als totals del procés, que s'exporten en format Prometheus
+# El render en curs es guarda en una ContextVar: asyncio.to_thread (load_tables)
+# la copia als fils, però els ThreadPoolExecutor i els processos fills no; el
+# que s'hi registra compta als totals amb pantalla "background".
+# Al final de cada render s'escriu una línia JSON al logger "instrumentation"
+# i, si hi ha INSTRUMENTATION_LOG, també en aquest fitxer (JSONL).
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from airtable_config import CLIENT_TABLE, COMANDA_TABLE, DETALL_TABLE, INVENTARI_TABLE
+
+INSTRUMENTATION_LOG = os.environ.get("INSTRUMENTATION_LOG")
+BACKGROUND = "background"       # Pantalla dels esdeveniments fora d'un render
+TABLE_NAMES = {COMANDA_TABLE: "Comanda", DETALL_TABLE: "Detall comanda",
+               INVENTARI_TABLE: "Inventari", CLIENT_TABLE: "Client"}
+
+logger = logging.getLogger("instrumentation")
+_current_render = contextvars.ContextVar("instrumentation_render", default=None)
+
+
+class RenderStats:
+    """Esdeveniments d'un render de pantalla: {(categoria, nom): [vegades, segons, bytes, files]}."""
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.started = time.time()
+        self.seconds = None
+        self.events = {}
+        self.token = None       # Per restaurar la ContextVar en acabar
+        self.lock = threading.Lock()
+
+    def add(self, category, name, seconds, nbytes, rows):
+        with self.lock:
+            totals = self.events.setdefault((category, name), [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += nbytes
+            totals[3] += rows
+
+    def rows(self):
+        """Una fila per (categoria, nom), de més a menys temps."""
+        with self.lock:
+            rows = [{"category": category, "name": name, "count": count, "seconds": round(seconds, 4),
+                     "bytes": nbytes, "rows": rows}
+                    for (category, name), (count, seconds, nbytes, rows) in self.events.items()]
+        return sorted(rows, key=lambda r: r["seconds"], reverse=True)
+
+    def summary(self):
+        """Resum del render com a diccionari (el que s'escriu al log)."""
+        rows = self.rows()
+        http = [r for r in rows if r["category"] == "http"]
+        return {
+            "screen": self.screen,
+            "started": round(self.started, 3),
+            "seconds": round(self.seconds, 4) if self.seconds is not None else None,
+            "http_requests": sum(r["count"] for r in http),
+            "http_bytes": sum(r["bytes"] for r in http),
+            "events": rows,
+        }
+
+
+class Recorder:
+    """Totals del procés per (pantalla, categoria, nom), segurs entre fils."""
+
+    def __init__(self):
+        self.totals = {}        # {(pantalla, categoria, nom): [vegades, segons, bytes, files]}
+        self.renders = {}       # {pantalla: [renders, segons]}
+        self.lock = threading.Lock()
+
+    def record(self, category, name, seconds=0.0, nbytes=0, rows=0):
+        """Registra un esdeveniment al render en curs (si n'hi ha) i als totals."""
+        render = _current_render.get()
+        if render is not None:
+            render.add(category, name, seconds, nbytes, rows)
+        key = (render.screen if render is not None else BACKGROUND, category, name)
+        with self.lock:
+            totals = self.totals.setdefault(key, [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += nbytes
+            totals[3] += rows
+
+    def begin_render(self, screen):
+        """Comença un render de pantalla; els esdeveniments d'aquest fil (i dels seus to_thread) hi van."""
+        render = RenderStats(screen)
+        render.token = _current_render.set(render)
+        return render
+
+    def end_render(self, render):
+        """Tanca el render, l'afegeix als totals i n'escriu el resum (logger i INSTRUMENTATION_LOG)."""
+        render.seconds = time.time() - render.started
+        _current_render.reset(render.token)
+        with self.lock:
+            totals = self.renders.setdefault(render.screen, [0, 0.0])
+            totals[0] += 1
+            totals[1] += render.seconds
+        line = json.dumps(render.summary(), ensure_ascii=False)
+        logger.info(line)
+        if INSTRUMENTATION_LOG:
+            try:
+                with open(INSTRUMENTATION_LOG, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logger.warning("No s'ha pogut escriure a %s: %s", INSTRUMENTATION_LOG, e)
+        return render
+
+    def prometheus(self):
+        """Totals del procés en format de text de Prometheus."""
+
+        def label(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+        with self.lock:
+            totals = sorted(self.totals.items())
+            renders = sorted(self.renders.items())
+        lines = []
+        metrics = [("app_events_total", "Esdeveniments registrats", 0),
+                   ("app_event_seconds_total", "Segons acumulats", 1),
+                   ("app_event_bytes_total", "Bytes rebuts o processats", 2),
+                   ("app_event_rows_total", "Files (registres) processades", 3)]
+        for metric, help_text, i in metrics:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (screen, category, name), values in totals:
+                value = round(values[i], 6) if i == 1 else values[i]
+                lines.append(f'{metric}{{screen="{label(screen)}",category="{label(category)}",'
+                             f'name="{label(name)}"}} {value}')
+        lines += ["# HELP app_renders_total Renders de cada pantalla", "# TYPE app_renders_total counter"]
+        lines += [f'app_renders_total{{screen="{label(screen)}"}} {count}' for screen, (count, _) in renders]
+        lines += ["# HELP app_render_seconds_total Segons dibuixant cada pantalla",
+                  "# TYPE app_render_seconds_total counter"]
+        lines += [f'app_render_seconds_total{{screen="{label(screen)}"}} {round(seconds, 6)}'
+                  for screen, (_, seconds) in renders]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.totals.clear()
+            self.renders.clear()
+
+
+def table_label(url):
+    """Nom de la taula d'una URL d'Airtable ("Comanda", ...), sense vista ni record_id."""
+    parts = urlsplit(url).path.rstrip("/").split("/")
+    table = parts[-2] if parts[-1].startswith("rec") and len(parts) > 1 else parts[-1]
+    return TABLE_NAMES.get(table, table)
+
+
+# Registre compartit per tot el procés
+recorder = Recorder()
+
+
+def record(category, name, seconds=0.0, nbytes=0, rows=0):
+    """Registra un esdeveniment (vegeu Recorder.record)."""
+    recorder.record(category, name, seconds, nbytes, rows)
+
+
+@contextmanager
+def timed(category, name, rows=0, nbytes=0):
+    """
+    Mesura el bloc i el registra en sortir (també si hi ha una excepció).
+    Torna un diccionari on el bloc pot posar "rows" i "bytes" si no es coneixen abans:
+        with timed("transform", "detall_lines") as event:
+            lines = ...
+            event["rows"] = len(lines)
+    """
+    event = {"rows": rows, "bytes": nbytes}
+    start = time.perf_counter()
+    try:
+        yield event
+    finally:
+        recorder.record(category, name, time.perf_counter() - start, event["bytes"], event["rows"])
@@ -0,0 +1,39 @@
+# ------------------------------------------------------------------------
+# DIARIS JSONL (UNA ENTRADA JSON PER LÍNIA, NOMÉS S'AFEGEIX)
+# ------------------------------------------------------------------------
+# Base dels diaris de bulk_seed.py (càrregues reprenibles) i de
+# stock_pipeline.py (descomptes d'estoc). Cada entrada s'escriu sencera i es
+# força a disc (fsync) abans de continuar. Si el procés s'atura escrivint,
+# l'última línia queda a mitges: en llegir el diari se salta i es tanca
+# amb un salt de línia perquè la següent entrada no s'hi enganxi.
+import json
+import os
+
+
+def read_journal(path):
+    """Torna les entrades del diari en ordre ([] si no existeix), sense la línia a mitges."""
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # Última línia a mitges (el procés es va aturar escrivint)
+    # La línia a mitges es tanca perquè la següent entrada no s'hi enganxi
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    return entries
+
+
+def append_entry(path, entry):
+    """Afegeix una entrada al diari i no torna fins que és a disc."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
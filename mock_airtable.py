@@ -0,0 +1,461 @@
+# ------------------------------------------------------------------------
+# SERVIDOR LOCAL QUE IMITA L'API REST D'AIRTABLE
+# ------------------------------------------------------------------------
+# Serveix per mesurar l'app sense tocar la base real. Cobreix:
+#   GET   /v0/{base}/{taula}            llistat amb offset, pageSize, maxRecords,
+#                                        view, fields[], sort[] i filterByFormula
+#   POST  /v0/{base}/{taula}            creació en lots (màx. 10 registres)
+#   PATCH /v0/{base}/{taula}            actualització en lots (màx. 10 registres)
+#   PATCH /v0/{base}/{taula}/{recXXX}   actualització d'un registre
+# Es pot afegir latència i respostes 429 aleatòries.
+#
+# Ús des de la línia d'ordres:
+#     python mock_airtable.py --port 8765 --rows 10000 --latency 0.05 --rate-429 0.02
+# i llavors arrencar l'app apuntant-hi:
+#     AIRTABLE_API_URL=http://127.0.0.1:8765/v0 streamlit run app.py
+import argparse
+import datetime
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from airtable_config import COMANDA_TABLE, DETALL_TABLE, INVENTARI_TABLE, CLIENT_TABLE
+
+PAGE_SIZE = 100     # pageSize màxim d'Airtable
+BATCH_LIMIT = 10    # Registres màxims per POST/PATCH
+
+
+# ------------------------------------------------------------------------
+# 1 FÓRMULES (subconjunt de filterByFormula)
+# ------------------------------------------------------------------------
+_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<num>\d+(?:\.\d+)?) |
+    (?P<str>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*") |
+    (?P<field>\{[^}]*\}) |
+    (?P<name>[A-Za-z_][A-Za-z0-9_]*) |
+    (?P<op><=|>=|!=|=|<|>|&|\(|\)|,)
+)""", re.VERBOSE)
+
+
+def _tokenize(formula):
+    pos, tokens = 0, []
+    formula = formula.strip()
+    while pos < len(formula):
+        m = _TOKEN_RE.match(formula, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"Fórmula no vàlida prop de: {formula[pos:pos + 20]!r}")
+        kind = m.lastgroup
+        tokens.append((kind, m.group(kind)))
+        pos = m.end()
+    return tokens
+
+
+def _as_text(value):
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def _sort_value(value):
+    # Els números abans que el text i els buits al final, com a Airtable
+    if value is None:
+        return (2, 0, "")
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    return (1, 0, _as_text(value))
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    text = _as_text(value).replace("Z", "+00:00")
+    dt = datetime.datetime.fromisoformat(text)
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+
+
+FUNCTIONS = {
+    "AND": lambda ctx, *a: all(a),
+    "OR": lambda ctx, *a: any(a),
+    "NOT": lambda ctx, a: not a,
+    "TRUE": lambda ctx: True,
+    "FALSE": lambda ctx: False,
+    "BLANK": lambda ctx: None,
+    "IF": lambda ctx, c, a, b=None: a if c else b,
+    "RECORD_ID": lambda ctx: ctx["id"],
+    "LAST_MODIFIED_TIME": lambda ctx, *a: ctx["modified"],
+    "CREATED_TIME": lambda ctx: ctx["created"],
+    "DATETIME_PARSE": lambda ctx, v, *a: _parse_datetime(v),
+    "IS_AFTER": lambda ctx, a, b: _parse_datetime(a) > _parse_datetime(b),
+    "IS_BEFORE": lambda ctx, a, b: _parse_datetime(a) < _parse_datetime(b),
+    "LOWER": lambda ctx, v: _as_text(v).lower(),
+    "UPPER": lambda ctx, v: _as_text(v).upper(),
+    "LEN": lambda ctx, v: len(_as_text(v)),
+    "ARRAYJOIN": lambda ctx, v, sep=", ": sep.join(str(x) for x in v) if isinstance(v, list) else _as_text(v),
+    # Airtable torna la posició (1..n) o 0 si no hi és
+    "SEARCH": lambda ctx, needle, hay, *a: _as_text(hay).lower().find(_as_text(needle).lower()) + 1,
+    "FIND": lambda ctx, needle, hay, *a: _as_text(hay).find(_as_text(needle)) + 1,
+}
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        tok = self.peek()
+        if value is not None and tok[1] != value:
+            raise ValueError(f"S'esperava {value!r} i hi ha {tok[1]!r}")
+        self.i += 1
+        return tok
+
+    def parse(self):
+        node = self.comparison()
+        if self.i != len(self.tokens):
+            raise ValueError(f"Sobra a la fórmula: {self.peek()[1]!r}")
+        return node
+
+    def comparison(self):
+        left = self.concat()
+        while self.peek()[1] in ("=", "!=", "<", ">", "<=", ">="):
+            op = self.take()[1]
+            right = self.concat()
+            left = ("cmp", op, left, right)
+        return left
+
+    def concat(self):
+        left = self.atom()
+        while self.peek()[1] == "&":
+            self.take()
+            left = ("concat", left, self.atom())
+        return left
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == "num":
+            return ("lit", float(value) if "." in value else int(value))
+        if kind == "str":
+            return ("lit", value[1:-1].replace("\\'", "'").replace('\\"', '"'))
+        if kind == "field":
+            return ("field", value[1:-1])
+        if kind == "name":
+            name = value.upper()
+            if name not in FUNCTIONS:
+                raise ValueError(f"Funció no suportada: {value}")
+            self.take("(")
+            args = []
+            if self.peek()[1] != ")":
+                args.append(self.comparison())
+                while self.peek()[1] == ",":
+                    self.take()
+                    args.append(self.comparison())
+            self.take(")")
+            return ("call", name, args)
+        if value == "(":
+            node = self.comparison()
+            self.take(")")
+            return node
+        raise ValueError(f"Token inesperat: {value!r}")
+
+
+def _compare(op, a, b):
+    if isinstance(a, list):
+        a = _as_text(a)
+    if isinstance(b, list):
+        b = _as_text(b)
+    if isinstance(a, (int, float)) and isinstance(b, str):
+        b = float(b) if re.fullmatch(r"-?\d+(\.\d+)?", b) else b
+    if isinstance(b, (int, float)) and isinstance(a, str):
+        a = float(a) if re.fullmatch(r"-?\d+(\.\d+)?", a) else a
+    if a is None or b is None:
+        a, b = _as_text(a), _as_text(b)
+    try:
+        return {"=": a == b, "!=": a != b, "<": a < b, ">": a > b, "<=": a <= b, ">=": a >= b}[op]
+    except TypeError:
+        return False
+
+
+def _evaluate(node, ctx):
+    kind = node[0]
+    if kind == "lit":
+        return node[1]
+    if kind == "field":
+        return ctx["fields"].get(node[1])
+    if kind == "concat":
+        return _as_text(_evaluate(node[1], ctx)) + _as_text(_evaluate(node[2], ctx))
+    if kind == "cmp":
+        return _compare(node[1], _evaluate(node[2], ctx), _evaluate(node[3], ctx))
+    if kind == "call":
+        return FUNCTIONS[node[1]](ctx, *[_evaluate(a, ctx) for a in node[2]])
+    raise ValueError(kind)
+
+
+def compile_formula(formula):
+    """Torna una funció record -> bool per a la fórmula donada."""
+    tree = _Parser(_tokenize(formula)).parse()
+    return lambda record: bool(_evaluate(tree, record))
+
+
+# ------------------------------------------------------------------------
+# 2 DADES EN MEMÒRIA
+# ------------------------------------------------------------------------
+class MockBase:
+    """Taules en memòria: {taula: {recXXX: {"id", "fields", "created", "modified"}}}."""
+
+    def __init__(self):
+        self.tables = {}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def new_id(self):
+        return f"rec{next(self._ids):014d}"
+
+    def table(self, table_id):
+        return self.tables.setdefault(table_id, {})
+
+    def insert(self, table_id, fields, record_id=None, at=None):
+        now = at or datetime.datetime.now(datetime.timezone.utc)
+        rec_id = record_id or self.new_id()
+        self.table(table_id)[rec_id] = {"id": rec_id, "fields": fields, "created": now, "modified": now}
+        return rec_id
+
+    def update(self, table_id, rec_id, fields):
+        record = self.table(table_id)[rec_id]
+        record["fields"].update(fields)
+        record["modified"] = datetime.datetime.now(datetime.timezone.utc)
+        return record
+
+    def seed(self, detall_rows=1000, seed=42):
+        """
+        Omple les quatre taules amb dades coherents (vincles en els dos sentits):
+        detall_rows línies, la meitat de comandes, 1 producte cada 100 línies
+        (mínim 6) i 1 client cada 50 comandes (mínim 5).
+        Els registres es marquen com a modificats fa un dia, perquè la primera
+        sincronització incremental no els torni a demanar tots.
+        """
+        rng = random.Random(seed)
+        at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)
+        n_orders = max(1, detall_rows // 2)
+        n_products = max(6, detall_rows // 100)
+        n_clients = max(5, n_orders // 50)
+
+        clients = [self.insert(CLIENT_TABLE, {
+            "CustomerID": f"CUST{i:03d}", "Name": f"Client {i}", "Email": f"client{i}@example.com",
+            "Registration Date": "2024-01-01", "Comanda": []
+        }, at=at) for i in range(1, n_clients + 1)]
+        products = [self.insert(INVENTARI_TABLE, {
+            "ProductID": f"PROD{i:03d}", "ProductName": f"Producte {i}", "Stock": rng.randint(0, 50),
+            "ReorderLevel": rng.randint(5, 15), "Detall comanda": []
+        }, at=at) for i in range(1, n_products + 1)]
+
+        start = datetime.date(2024, 1, 1)
+        orders = []
+        for i in range(1, n_orders + 1):
+            client_id = rng.choice(clients)
+            date_str = (start + datetime.timedelta(days=rng.randint(0, 729))).isoformat()
+            status = rng.choice(["Valid", "Valid", "Invalid", "Duplicate", "Pending"])
+            rec_id = self.insert(COMANDA_TABLE, {
+                "OrderID": i, "CustomerID": [client_id], "Status": status, "Data": date_str, "Detall comanda": []
+            }, at=at)
+            self.table(CLIENT_TABLE)[client_id]["fields"]["Comanda"].append(rec_id)
+            orders.append((rec_id, i, date_str))
+
+        for n in range(detall_rows):
+            order_rec, order_id, date_str = orders[n % n_orders]
+            product_id = rng.choice(products)
+            rec_id = self.insert(DETALL_TABLE, {
+                "OrderID": [order_id], "Comanda": [order_rec], "ProductID": [product_id],
+                "Quantity": rng.randint(1, 10), "Data": date_str
+            }, at=at)
+            self.table(COMANDA_TABLE)[order_rec]["fields"]["Detall comanda"].append(rec_id)
+            self.table(INVENTARI_TABLE)[product_id]["fields"]["Detall comanda"].append(rec_id)
+
+
+# ------------------------------------------------------------------------
+# 3 SERVIDOR HTTP
+# ------------------------------------------------------------------------
+class MockAirtableServer:
+    """
+    Servidor HTTP en un fil. latency: segons afegits a cada resposta;
+    rate_429: probabilitat de respondre 429; retry_after: capçalera opcional.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, rate_429=0.0, retry_after=None, base=None):
+        self.base = base or MockBase()
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.counts = {}            # {"GET": n, "POST": n, "PATCH": n, "429": n}
+        self.bytes_sent = 0
+        self._counts_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v0"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_counts(self):
+        with self._counts_lock:
+            self.counts = {}
+            self.bytes_sent = 0
+
+    def _count(self, key, nbytes=0):
+        with self._counts_lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.bytes_sent += nbytes
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # Capçaleres i cos van en escriptures separades
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, extra_headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (extra_headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+                server._count(self.command, len(data))
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _route(self):
+                parts = urlsplit(self.path).path.strip("/").split("/")
+                if len(parts) < 3 or parts[0] != "v0":
+                    return None, None
+                return parts[2], (parts[3] if len(parts) > 3 else None)
+
+            def _throttled(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.rate_429 and random.random() < server.rate_429:
+                    headers = {"Retry-After": str(server.retry_after)} if server.retry_after else None
+                    server._count("429")
+                    self._send(429, {"errors": [{"error": "RATE_LIMIT_REACHED"}]}, headers)
+                    return True
+                return False
+
+            def do_GET(self):
+                if self._throttled():
+                    return
+                table_id, _ = self._route()
+                if table_id is None:
+                    return self._send(404, {"error": "NOT_FOUND"})
+                query = parse_qs(urlsplit(self.path).query)
+                try:
+                    body = server.list_records(table_id, query)
+                except ValueError as e:
+                    return self._send(422, {"error": {"type": "INVALID_FILTER_BY_FORMULA", "message": str(e)}})
+                self._send(200, body)
+
+            def do_POST(self):
+                if self._throttled():
+                    return
+                table_id, _ = self._route()
+                records = self._body().get("records", [])
+                if table_id is None or not records or len(records) > BATCH_LIMIT:
+                    return self._send(422, {"error": {"type": "INVALID_RECORDS"}})
+                with server.base.lock:
+                    created = [server.base.insert(table_id, dict(r.get("fields", {}))) for r in records]
+                    out = [{"id": rid, "fields": server.base.table(table_id)[rid]["fields"]} for rid in created]
+                self._send(200, {"records": out})
+
+            def do_PATCH(self):
+                if self._throttled():
+                    return
+                table_id, rec_id = self._route()
+                body = self._body()
+                updates = [{"id": rec_id, "fields": body.get("fields", {})}] if rec_id else body.get("records", [])
+                if table_id is None or not updates or len(updates) > BATCH_LIMIT:
+                    return self._send(422, {"error": {"type": "INVALID_RECORDS"}})
+                with server.base.lock:
+                    if any(u["id"] not in server.base.table(table_id) for u in updates):
+                        return self._send(404, {"error": "NOT_FOUND"})
+                    out = [{"id": u["id"], "fields": server.base.update(table_id, u["id"], u.get("fields", {}))["fields"]}
+                           for u in updates]
+                self._send(200, out[0] if rec_id else {"records": out})
+
+        return Handler
+
+    def list_records(self, table_id, query):
+        """Implementa la paginació i els paràmetres de llistat d'Airtable."""
+        page_size = min(int(query.get("pageSize", [PAGE_SIZE])[0]), PAGE_SIZE)
+        offset = int(query.get("offset", ["0"])[0])
+        max_records = int(query["maxRecords"][0]) if "maxRecords" in query else None
+        fields = query.get("fields[]")
+
+        with self.base.lock:
+            records = list(self.base.table(table_id).values())
+        if "filterByFormula" in query:
+            predicate = compile_formula(query["filterByFormula"][0])
+            records = [r for r in records if predicate(r)]
+
+        # sort[0][field]=X & sort[0][direction]=desc
+        sorts = sorted(k for k in query if k.startswith("sort[") and k.endswith("[field]"))
+        for key in reversed(sorts):
+            field = query[key][0]
+            desc = query.get(key.replace("[field]", "[direction]"), ["asc"])[0] == "desc"
+            records.sort(key=lambda r: _sort_value(r["fields"].get(field)), reverse=desc)
+
+        if max_records is not None:
+            records = records[:max_records]
+        page = records[offset:offset + page_size]
+        out = []
+        for r in page:
+            f = r["fields"]
+            if fields:
+                f = {k: v for k, v in f.items() if k in fields}
+            out.append({"id": r["id"], "createdTime": r["created"].isoformat(), "fields": f})
+        body = {"records": out}
+        if offset + page_size < len(records):
+            body["offset"] = str(offset + page_size)
+        return body
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que imita l'API d'Airtable")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=1000, help="Línies de Detall comanda a generar")
+    parser.add_argument("--latency", type=float, default=0.0, help="Segons afegits a cada resposta")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probabilitat de respondre 429")
+    parser.add_argument("--retry-after", type=float, default=None, help="Valor de la capçalera Retry-After")
+    args = parser.parse_args()
+
+    mock = MockAirtableServer(port=args.port, latency=args.latency, rate_429=args.rate_429,
+                              retry_after=args.retry_after)
+    mock.base.seed(args.rows)
+    print(f"Mock d'Airtable a {mock.url} amb {args.rows} línies de Detall comanda")
+    try:
+        mock.httpd.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,205 @@
+# ------------------------------------------------------------------------
+# REGISTRE DE MODELS PROPHET A DISC
+# ------------------------------------------------------------------------
+# Cada model entrenat es guarda serialitzat (prophet.serialize) amb una clau
+# formada per: producte + data de tall + tipus ("base" o "retrained") + hash
+# de les dades d'entrenament. Si tornem a predir amb les mateixes dades, es
+# reutilitza el model en lloc de tornar a ajustar Stan.
+# Els models antics s'eliminen per edat i per LRU (data d'últim ús del fitxer).
+# Les execucions en lot (predicció, backtest, reentrenament) amplien la capacitat
+# fins als models que necessiten mentre duren i no netegen fins al final
+# (registry_run), sense esborrar cap model fet servir durant l'execució.
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+REGISTRY_DIR = os.environ.get(
+    "MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+)
+MAX_MODELS = 200        # Models màxims a disc (com a mínim; les execucions en lot la poden ampliar)
+MAX_AGE_DAYS = 30       # Dies sense fer servir un model abans d'esborrar-lo
+MEMORY_MODELS = 16      # Models deserialitzats que es mantenen en memòria
+EVICT_INTERVAL = 60     # Segons mínims entre neteges automàtiques en desar
+
+# Capacitat reservada per les execucions en lot en curs d'aquest procés: {registre: [models]}.
+# Només en memòria: en acabar (o fallar) l'execució, el registre torna a max_models.
+_reserved = {}
+_reserved_lock = threading.Lock()
+
+
+def training_hash(train_df):
+    """Hash curt de les columnes ds/y de les dades d'entrenament."""
+    hashed = pd.util.hash_pandas_object(train_df[["ds", "y"]].reset_index(drop=True), index=False)
+    return hashlib.sha256(hashed.values.tobytes()).hexdigest()[:16]
+
+
+def model_key(product, cutoff, data_hash, kind="base"):
+    """Nom de fitxer (sense extensió) del model."""
+    safe_product = re.sub(r"[^A-Za-z0-9_-]", "_", str(product))
+    return f"{safe_product}__{pd.Timestamp(cutoff):%Y-%m-%d}__{kind}__{data_hash}"
+
+
+class ModelRegistry:
+    """Registre de models Prophet serialitzats, amb memòria local i neteja LRU/edat."""
+
+    def __init__(self, root=REGISTRY_DIR, max_models=MAX_MODELS, max_age_days=MAX_AGE_DAYS, auto_evict=True):
+        self.root = root
+        self.max_models = max_models
+        self.max_age_days = max_age_days
+        self.auto_evict = auto_evict    # Netejar en desar (com a molt cada EVICT_INTERVAL segons)
+        self._last_evict = None
+        self._memory = OrderedDict()    # {clau: model}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def load(self, product, cutoff, train_df, kind="base"):
+        """Torna el model guardat per aquestes dades o None si no n'hi ha."""
+        key = model_key(product, cutoff, training_hash(train_df), kind)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                model = self._memory[key]
+            else:
+                model = None
+        if model is not None:
+            if os.path.exists(self._path(key)):
+                os.utime(self._path(key))  # Marquem l'ús per a l'LRU
+            return model
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        from prophet.serialize import model_from_json
+        with open(path, "r", encoding="utf-8") as f:
+            model = model_from_json(f.read())
+        os.utime(path)  # Marquem l'ús per a l'LRU
+        self._remember(key, model)
+        return model
+
+    def save(self, product, cutoff, train_df, model, kind="base"):
+        """Guarda el model (escriptura atòmica) i, si toca, aplica la neteja."""
+        from prophet.serialize import model_to_json
+        key = model_key(product, cutoff, training_hash(train_df), kind)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(model_to_json(model))
+        os.replace(tmp_path, path)
+        self._remember(key, model)
+        if self.auto_evict and (self._last_evict is None or time.monotonic() - self._last_evict >= EVICT_INTERVAL):
+            self.evict()
+        return key
+
+    def get_or_fit(self, product, cutoff, train_df, fit, kind="base"):
+        """
+        Torna (model, reused). Si hi ha un model per aquestes dades es reutilitza;
+        si no, es crida fit(train_df), es guarda i es torna.
+        """
+        model = self.load(product, cutoff, train_df, kind)
+        if model is not None:
+            return model, True
+        model = fit(train_df)
+        self.save(product, cutoff, train_df, model, kind)
+        return model, False
+
+    def _remember(self, key, model):
+        with self._lock:
+            self._memory[key] = model
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_MODELS:
+                self._memory.popitem(last=False)
+
+    def capacity(self):
+        """Models màxims a disc: max_models o el total reservat per les execucions en curs, el més gran."""
+        with _reserved_lock:
+            reserved = sum(_reserved.get(os.path.abspath(self.root), []))
+        return max(self.max_models, reserved)
+
+    def reserve(self, n_models):
+        """Amplia la capacitat perquè hi càpiguen els n_models d'una execució en lot (fins a release)."""
+        with _reserved_lock:
+            _reserved.setdefault(os.path.abspath(self.root), []).append(n_models)
+
+    def release(self, n_models):
+        """Retorna la capacitat reservada amb reserve."""
+        with _reserved_lock:
+            reservations = _reserved.get(os.path.abspath(self.root), [])
+            if n_models in reservations:
+                reservations.remove(n_models)
+
+    def evict(self, protect_since=None):
+        """
+        Esborra models més antics que max_age_days i, si en sobren, els menys usats.
+        - protect_since: els models usats o desats des d'aquest instant (time.time()) no s'esborren
+        """
+        self._last_evict = time.monotonic()
+        now = time.time()
+        files = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                files.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue  # Un altre procés l'ha esborrat
+
+        files.sort()  # Els menys usats primer
+        max_age = self.max_age_days * 86400
+        excess = max(0, len(files) - self.capacity())
+        removed = 0
+        for mtime, path in files:
+            if protect_since is not None and mtime >= protect_since:
+                continue
+            if excess <= 0 and now - mtime <= max_age:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            excess -= 1
+            with self._lock:
+                self._memory.pop(os.path.basename(path)[:-len(".json")], None)
+        return removed
+
+
+@contextmanager
+def registry_run(root, n_models, max_models=MAX_MODELS):
+    """
+    Execució en lot sobre el registre: reserva capacitat per a n_models (producte x plecs)
+    mentre dura i, en acabar (també si falla), la retorna i fa una sola neteja que no
+    toca cap model usat durant l'execució.
+    Els processos fills han d'obrir el registre amb auto_evict=False.
+    """
+    registry = ModelRegistry(root=root, max_models=max_models)
+    registry.reserve(n_models)
+    started = int(time.time())  # Segons sencers: alguns sistemes de fitxers arrodoneixen el mtime
+    try:
+        yield registry
+    finally:
+        registry.release(n_models)
+        registry.evict(protect_since=started)
+
+
+# Registre compartit per tot el procés
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Torna el registre de models compartit (es crea la primera vegada)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
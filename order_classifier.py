@@ -0,0 +1,226 @@
+# ------------------------------------------------------------------------
+# CLASSIFICADOR DE L'ESTAT DE LES COMANDES (MODEL PERSISTIT I VERSIONAT)
+# ------------------------------------------------------------------------
+# El RandomForest es desa a disc (joblib) juntament amb la codificació dels
+# clients, de manera que l'entrenament i la inferència fan servir exactament
+# els mateixos codis. Cada entrenament és una versió nova (classifier_v0001,
+# v0002...) i guarda el hash de les comandes etiquetades: si les dades no han
+# canviat, es reutilitza l'última versió en lloc de tornar a entrenar.
+# La predicció en lot (predict_pending) no depèn de Streamlit, així la poden
+# fer servir tant la pantalla com processos en segon pla.
+import hashlib
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+from instrumentation import timed
+from model_registry import REGISTRY_DIR
+
+CLASSIFIER_DIR = os.environ.get("CLASSIFIER_DIR", os.path.join(REGISTRY_DIR, "classifier"))
+FEATURES = ["CustomerID_num", "DayOfWeek", "TotalQuantity"]
+LABELS = ["Valid", "Invalid", "Duplicate"]
+PENDING_STATUSES = [None, "", "Pending"]
+UNKNOWN_CUSTOMER = -1   # Codi dels clients que no eren a les dades d'entrenament
+
+
+# Funció per construir les variables del classificador de comandes
+def build_order_features(df_comanda, df_detall):
+    """
+    Afegeix a una còpia de df_comanda les variables que fa servir el classificador
+    (entrenament i inferència comparteixen aquesta única funció):
+      - CustomerID_first: primer client vinculat
+      - DayOfWeek: dia de la setmana de 'Data' (0 si no hi ha data)
+      - TotalQuantity: suma de 'Quantity' dels Detall comanda vinculats, calculada
+        amb explode + merge per record_id + groupby-sum (sense cerques fila a fila)
+    """
+    df = df_comanda.copy()
+    df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
+    # Primer client de cada llista (explode, com a demand_cube.detall_lines); "nan" si no n'hi ha
+    first = df["CustomerID"].reset_index(drop=True).explode()
+    first = first[~first.index.duplicated(keep="first")]
+    df["CustomerID_first"] = first.astype(object).where(first.notna(), "nan").astype(str).values
+    df["DayOfWeek"] = df["Data"].dt.dayofweek.fillna(0)
+
+    if df_detall.empty or "record_id" not in df_detall.columns or "Quantity" not in df_detall.columns:
+        df["TotalQuantity"] = 0
+        return df
+
+    # Una fila per cada (comanda, detall vinculat)
+    links = (
+        df["Detall comanda"]
+        .explode()
+        .dropna()
+        .rename("record_id")
+        .rename_axis("_order_row")
+        .reset_index()
+    )
+    lines = pd.DataFrame({
+        "record_id": df_detall["record_id"],
+        "Quantity": pd.to_numeric(df_detall["Quantity"], errors="coerce")
+    })
+    totals = links.merge(lines, on="record_id", how="inner").groupby("_order_row")["Quantity"].sum()
+    df["TotalQuantity"] = totals.reindex(df.index, fill_value=0)
+    return df
+
+
+def labeled_orders(df_features):
+    """Comandes amb Status Valid/Invalid/Duplicate (les que serveixen per entrenar)."""
+    return df_features[df_features["Status"].isin(LABELS)]
+
+
+def pending_orders(df_features):
+    """Comandes sense classificar (Status buit o Pending)."""
+    return df_features[df_features["Status"].isin(PENDING_STATUSES) | df_features["Status"].isna()]
+
+
+def labeled_hash(df_labeled):
+    """Hash curt de les comandes etiquetades (variables + Status), independent de l'ordre de les files."""
+    columns = ["record_id", "CustomerID_first", "DayOfWeek", "TotalQuantity", "Status"]
+    data = df_labeled[columns].astype(str).sort_values("record_id").reset_index(drop=True)
+    hashed = pd.util.hash_pandas_object(data, index=False)
+    return hashlib.sha256(hashed.values.tobytes()).hexdigest()[:16]
+
+
+def encode(artifact, df_features):
+    """Matriu X de les variables, amb la codificació de clients guardada a l'artefacte."""
+    X = pd.DataFrame(index=df_features.index)
+    X["CustomerID_num"] = df_features["CustomerID_first"].map(artifact["customer_codes"]).fillna(UNKNOWN_CUSTOMER)
+    X["DayOfWeek"] = df_features["DayOfWeek"]
+    X["TotalQuantity"] = df_features["TotalQuantity"]
+    return X[FEATURES].fillna(0)
+
+
+def train_classifier(df_features):
+    """
+    Entrena el classificador amb les comandes etiquetades de df_features
+    (sortida de build_order_features). Torna l'artefacte (diccionari) amb el
+    model, la codificació de clients, l'informe de test i el hash de les dades.
+    """
+    import sklearn
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import train_test_split
+
+    df_labeled = labeled_orders(df_features)
+    customers = sorted(df_labeled["CustomerID_first"].astype(str).unique().tolist())
+    artifact = {"customer_codes": {customer: code for code, customer in enumerate(customers)}}
+
+    X = encode(artifact, df_labeled)
+    y = df_labeled["Status"]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    clf = RandomForestClassifier(n_estimators=50, random_state=42)
+    with timed("model", "classifier_fit", rows=len(X_train)):
+        clf.fit(X_train, y_train)
+
+    artifact.update(
+        model=clf,
+        features=FEATURES,
+        classes=clf.classes_.tolist(),
+        report=classification_report(y_test, clf.predict(X_test), output_dict=True),
+        data_hash=labeled_hash(df_labeled),
+        n_train=len(X_train),
+        trained_at=time.strftime("%Y-%m-%d %H:%M:%S"),
+        sklearn_version=sklearn.__version__,
+    )
+    return artifact
+
+
+def predict_pending(artifact, df_features):
+    """
+    Classifica en lot les comandes pendents de df_features.
+    Torna un DataFrame record_id, OrderID, Status (predit).
+    """
+    df_new = pending_orders(df_features)
+    if df_new.empty:
+        return pd.DataFrame(columns=["record_id", "OrderID", "Status"])
+    with timed("model", "classifier_predict", rows=len(df_new)):
+        predicted = artifact["model"].predict(encode(artifact, df_new))
+    order_ids = df_new["OrderID"] if "OrderID" in df_new.columns else df_new["record_id"]
+    return pd.DataFrame({"record_id": df_new["record_id"].values, "OrderID": order_ids.values,
+                         "Status": predicted})
+
+
+class ClassifierStore:
+    """Versions del classificador a disc (classifier_vNNNN.joblib), amb l'última en memòria."""
+
+    def __init__(self, root=CLASSIFIER_DIR):
+        self.root = root
+        self._loaded = {}       # {versió: artefacte}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, version):
+        return os.path.join(self.root, f"classifier_v{version:04d}.joblib")
+
+    def versions(self):
+        """Versions guardades, de la més antiga a la més nova."""
+        found = []
+        for name in os.listdir(self.root):
+            match = re.fullmatch(r"classifier_v(\d+)\.joblib", name)
+            if match:
+                found.append(int(match.group(1)))
+        return sorted(found)
+
+    def load(self, version=None):
+        """Torna l'artefacte de la versió (per defecte l'última) o None si no n'hi ha cap."""
+        import joblib
+
+        if version is None:
+            versions = self.versions()
+            if not versions:
+                return None
+            version = versions[-1]
+        with self._lock:
+            if version in self._loaded:
+                return self._loaded[version]
+        path = self._path(version)
+        if not os.path.exists(path):
+            return None
+        artifact = joblib.load(path)
+        with self._lock:
+            self._loaded = {version: artifact}  # Només cal tenir en memòria la versió en ús
+        return artifact
+
+    def save(self, artifact):
+        """Guarda l'artefacte com a versió nova (escriptura atòmica) i torna el número de versió."""
+        import joblib
+
+        with self._lock:
+            versions = self.versions()
+            version = (versions[-1] if versions else 0) + 1
+            artifact["version"] = version
+            path = self._path(version)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            joblib.dump(artifact, tmp_path)
+            os.replace(tmp_path, path)
+            self._loaded = {version: artifact}
+        return version
+
+    def get_or_train(self, df_features, force=False):
+        """
+        Torna (artefacte, trained). Només s'entrena una versió nova si les
+        comandes etiquetades han canviat des de l'última (o si force=True).
+        """
+        latest = self.load()
+        if latest is not None and not force and latest["data_hash"] == labeled_hash(labeled_orders(df_features)):
+            return latest, False
+        artifact = train_classifier(df_features)
+        self.save(artifact)
+        return artifact, True
+
+
+# Magatzem compartit per tot el procés
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_classifier_store():
+    """Torna el magatzem de classificadors compartit (es crea la primera vegada)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ClassifierStore()
+        return _store
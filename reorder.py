@@ -0,0 +1,132 @@
+# ------------------------------------------------------------------------
+# REPOSICIÓ D'ESTOC (PUNT DE COMANDA I QUANTITAT SUGGERIDA)
+# ------------------------------------------------------------------------
+# Per a tot l'inventari alhora (operacions de columna, sense bucles per producte):
+#   demanda durant el termini = suma de la predicció (yhat >= 0) dels propers
+#       LEAD_TIME_DAYS dies, o, si el producte no té predicció, la mitjana
+#       diària dels últims HISTORY_DAYS dies de dades reals x termini
+#   punt de comanda = demanda durant el termini + ReorderLevel (estoc de seguretat)
+#   si Stock <= punt de comanda:
+#       Reposition = punt de comanda + demanda de REVIEW_DAYS dies - Stock
+#   si no: Reposition = 0
+# La predicció és la desada més recent (per la data de tall del nom del fitxer)
+# que cobreix el termini a partir d'avui; si cap no el cobreix, es fa servir l'històric.
+# Només s'escriuen a Airtable els productes amb un Reposition diferent de l'actual.
+import datetime
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from batch_forecast import OUTPUT_DIR
+
+LEAD_TIME_DAYS = 7      # Dies que triga a arribar una reposició
+REVIEW_DAYS = 7         # Dies de demanda que ha de cobrir cada comanda, a més del termini
+HISTORY_DAYS = 90       # Dies d'històric per a la mitjana dels productes sense predicció
+FORECAST_FILE = re.compile(r"forecast_(\d{4}-\d{2}-\d{2})\.csv$")
+PLAN_COLUMNS = ["record_id", "ProductID", "Stock", "ReorderLevel", "daily_demand", "demand_source",
+                "lead_time_demand", "reorder_point", "Reposition", "current_reposition"]
+
+
+def forecast_files(output_dir=OUTPUT_DIR):
+    """Prediccions en lot desades (forecasts/forecast_AAAA-MM-DD.csv): [(data de tall, camí)], de més nova a més antiga."""
+    files = []
+    for path in glob.glob(os.path.join(output_dir, "forecast_*.csv")):
+        match = FORECAST_FILE.search(os.path.basename(path))
+        if match:
+            files.append((pd.Timestamp(match.group(1)), path))
+    return sorted(files, reverse=True)
+
+
+def latest_forecast(output_dir=OUTPUT_DIR, today=None, lead_time_days=LEAD_TIME_DAYS):
+    """
+    Predicció en lot més recent (per data de tall) que cobreix els lead_time_days
+    dies a partir de 'today' (per defecte, avui), retallada a partir de 'today'.
+    Torna (forecasts, cutoff), o (None, None) si cap predicció desada no cobreix el termini.
+    """
+    today = pd.Timestamp(today or datetime.date.today()).normalize()
+    last_day = today + pd.Timedelta(days=lead_time_days - 1)
+    for cutoff, path in forecast_files(output_dir):
+        if cutoff > today:
+            continue
+        forecasts = pd.read_csv(path, parse_dates=["ds"])
+        if forecasts.empty or forecasts["ds"].min() > today or forecasts["ds"].max() < last_day:
+            continue
+        return forecasts[forecasts["ds"] >= today].reset_index(drop=True), cutoff
+    return None, None
+
+
+def forecast_rate(forecasts, lead_time_days=LEAD_TIME_DAYS):
+    """Demanda diària prevista per producte: mitjana de yhat (>= 0) dels primers lead_time_days dies."""
+    if forecasts is None or forecasts.empty:
+        return pd.Series(dtype=float)
+    start = forecasts.groupby("ProductID")["ds"].transform("min")
+    window = forecasts[forecasts["ds"] < start + pd.Timedelta(days=lead_time_days)]
+    return window["yhat"].clip(lower=0).groupby(window["ProductID"]).mean()
+
+
+def history_rate(demand, history_days=HISTORY_DAYS, until=None):
+    """
+    Demanda diària mitjana per producte (demanda: ProductID, ds, y) en una finestra
+    de history_days dies que acaba:
+      - sense until: a l'última venda de cada producte (un producte aturat no es
+        dilueix amb els dies en què s'han venut els altres)
+      - amb until: en aquesta data per a tots (ex. la data de tall del qui crida)
+    Un producte més nou que la finestra es divideix pels dies des de la primera venda.
+    """
+    if demand is None or demand.empty:
+        return pd.Series(dtype=float)
+    if until is not None:
+        demand = demand[demand["ds"] <= pd.Timestamp(until)]
+        if demand.empty:
+            return pd.Series(dtype=float)
+    products = demand.groupby("ProductID")["ds"]
+    end = products.transform("max") if until is None else pd.Timestamp(until)
+    recent = demand[demand["ds"] > end - pd.Timedelta(days=history_days)]
+
+    # Dies de la finestra amb el producte ja a la venda
+    last = products.max() if until is None else pd.Timestamp(until)
+    days = ((last - products.min()).dt.days + 1).clip(upper=history_days)
+    return recent.groupby("ProductID")["y"].sum() / days
+
+
+def reorder_plan(inventari_df, forecasts=None, demand=None, lead_time_days=LEAD_TIME_DAYS,
+                 review_days=REVIEW_DAYS, history_days=HISTORY_DAYS, history_until=None):
+    """
+    Calcula el punt de comanda i la quantitat a reposar de tot l'inventari.
+    - inventari_df: record_id, ProductID, Stock, ReorderLevel (i Reposition si ja n'hi ha)
+    - forecasts: predicció en lot (ProductID, ds, yhat); té prioritat sobre l'històric
+    - demand: demanda diària real (ProductID, ds, y), per als productes sense predicció
+    - history_until: final de la finestra de l'històric (vegeu history_rate); sense, l'última venda de cada producte
+    Torna un DataFrame amb PLAN_COLUMNS, una fila per producte.
+    """
+    # Airtable omet els camps buits: les columnes que falten queden a NaN
+    numbers = inventari_df.reindex(columns=["Stock", "ReorderLevel", "Reposition"]).apply(pd.to_numeric, errors="coerce")
+    plan = pd.DataFrame({
+        "record_id": inventari_df["record_id"].values,
+        "ProductID": inventari_df["ProductID"].values,
+        "Stock": numbers["Stock"].fillna(0).values,
+        "ReorderLevel": numbers["ReorderLevel"].fillna(0).values,
+        "current_reposition": numbers["Reposition"].values,
+    })
+
+    predicted = plan["ProductID"].map(forecast_rate(forecasts, lead_time_days))
+    observed = plan["ProductID"].map(history_rate(demand, history_days, history_until))
+    plan["daily_demand"] = predicted.fillna(observed).fillna(0.0)
+    plan["demand_source"] = np.where(predicted.notna(), "predicció",
+                                     np.where(observed.notna(), "històric", "sense dades"))
+
+    plan["lead_time_demand"] = plan["daily_demand"] * lead_time_days
+    plan["reorder_point"] = np.ceil(plan["lead_time_demand"] + plan["ReorderLevel"])
+    order_up_to = plan["reorder_point"] + np.ceil(plan["daily_demand"] * review_days)
+    plan["Reposition"] = np.where(plan["Stock"] <= plan["reorder_point"],
+                                  np.maximum(order_up_to - plan["Stock"], 0), 0).astype(int)
+    return plan[PLAN_COLUMNS]
+
+
+def reposition_updates(plan):
+    """Parelles (record_id, {"Reposition": n}) dels productes on el valor ha canviat."""
+    changed = plan[plan["Reposition"] != plan["current_reposition"].fillna(-1)]
+    return [(rec_id, {"Reposition": int(qty)}) for rec_id, qty in zip(changed["record_id"], changed["Reposition"])]
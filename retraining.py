@@ -0,0 +1,136 @@
+# ------------------------------------------------------------------------
+# REENTRENAMENT AMB WARM START
+# ------------------------------------------------------------------------
+# Reentrenar un producte amb les dades reals d'un mes afegeix només aquelles
+# observacions a les dades d'entrenament del model anterior, i l'optimitzador
+# de Stan arrenca des dels paràmetres ja ajustats (k, m, delta, beta,
+# sigma_obs) en lloc de fer-ho des de zero.
+# L'ajust continua veient tota la sèrie (la funció objectiu de Prophet no es
+# pot partir), però partint d'un punt proper a l'òptim calen menys iteracions.
+# Opcionalment es fa també un ajust des de zero per comparar-ne el temps i la
+# deriva dels paràmetres.
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_forecast import HORIZON_DAYS, product_histories, run_in_pool
+from instrumentation import record
+from model_registry import REGISTRY_DIR
+
+SCALAR_PARAMS = ["k", "m", "sigma_obs"]
+VECTOR_PARAMS = ["delta", "beta"]
+REPORT_COLUMNS = ["ProductID", "n_train", "n_new", "warm_seconds", "cold_seconds", "speedup",
+                  "drift_k", "drift_m", "drift_sigma_obs", "drift_delta", "drift_beta", "error"]
+
+
+def warm_start_params(model):
+    """Paràmetres ajustats d'un model Prophet en el format 'init' de Stan."""
+    params = {}
+    for name in SCALAR_PARAMS:
+        params[name] = float(np.mean(model.params[name]))
+    for name in VECTOR_PARAMS:
+        params[name] = np.mean(model.params[name], axis=0)
+    return params
+
+
+def retraining_data(train_df, new_obs):
+    """Dades d'entrenament del model anterior + observacions noves (les noves manen si es repeteix un dia)."""
+    new_train = pd.concat([train_df[["ds", "y"]], new_obs[["ds", "y"]]], ignore_index=True)
+    return new_train.drop_duplicates(subset=["ds"], keep="last").reset_index(drop=True)
+
+
+def fit_prophet(train_df, previous=None):
+    """
+    Ajusta un Prophet nou amb train_df. Si es dona 'previous', s'arrenca des
+    dels seus paràmetres (warm start). Torna (model, segons).
+    """
+    from prophet import Prophet
+
+    start = time.perf_counter()
+    model = Prophet()
+    if previous is not None:
+        # Si el nombre de punts de canvi no coincideix, Prophet ignora aquell paràmetre
+        model.fit(train_df, init=warm_start_params(previous))
+    else:
+        model.fit(train_df)
+    seconds = time.perf_counter() - start
+    record("model", "prophet_fit_warm" if previous is not None else "prophet_fit", seconds, rows=len(train_df))
+    return model, seconds
+
+
+def param_drift(model, reference):
+    """Diferència absoluta màxima de cada paràmetre entre dos models (escala interna de Prophet)."""
+    drift = {}
+    for name in SCALAR_PARAMS + VECTOR_PARAMS:
+        a = np.mean(model.params[name], axis=0)
+        b = np.mean(reference.params[name], axis=0)
+        drift[f"drift_{name}"] = float(np.max(np.abs(a - b))) if np.shape(a) == np.shape(b) else None
+    return drift
+
+
+def retrain_product(product, train_df, new_obs, previous, compare=False):
+    """
+    Reentrena un producte amb warm start des de 'previous'.
+    Torna (model, new_train, report): report segueix REPORT_COLUMNS; si
+    compare=True s'hi afegeix el temps i la deriva respecte un ajust des de zero.
+    """
+    new_train = retraining_data(train_df, new_obs)
+    model, warm_seconds = fit_prophet(new_train, previous)
+    report = {"ProductID": product, "n_train": len(new_train), "n_new": len(new_obs),
+              "warm_seconds": warm_seconds, "error": None}
+    if compare:
+        cold, cold_seconds = fit_prophet(new_train)
+        report.update(cold_seconds=cold_seconds, speedup=cold_seconds / warm_seconds if warm_seconds else None)
+        report.update(param_drift(model, cold))
+    return model, new_train, report
+
+
+def _retrain_worker(product, history, cutoff, horizon_days, compare, registry_root):
+    """Reentrena (warm start) el model d'un producte i el desa al registre. S'executa en un procés fill."""
+    from prophet import Prophet
+    from model_registry import ModelRegistry
+
+    # Prophet i cmdstanpy escriuen molt a INFO: en lot només volem els avisos
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+
+    train_df = history[history["ds"] < cutoff][["ds", "y"]]
+    new_obs = history[(history["ds"] >= cutoff) &
+                      (history["ds"] <= cutoff + pd.Timedelta(days=horizon_days))][["ds", "y"]]
+    if len(train_df) < 2 or new_obs.empty:
+        return {"ProductID": product, "n_train": len(train_df), "n_new": len(new_obs),
+                "error": "Menys de 2 observacions o sense dades reals al mes"}
+
+    # Model anterior: el del registre per a aquesta data de tall (o s'ajusta ara)
+    registry = ModelRegistry(root=registry_root, auto_evict=False)  # La neteja la fa registry_run
+    previous, _ = registry.get_or_fit(product, cutoff, train_df, fit=lambda df: Prophet().fit(df))
+    model, new_train, report = retrain_product(product, train_df, new_obs, previous, compare)
+    registry.save(product, cutoff, new_train, model, kind="retrained")
+    return report
+
+
+def retrain_all_products(demand, cutoff, horizon_days=HORIZON_DAYS, compare=False, max_workers=None,
+                         progress=None, registry_root=REGISTRY_DIR):
+    """
+    Reentrena tots els productes de 'demand' (ProductID, ds, y) amb les dades
+    reals del mes que comença a 'cutoff', un procés per producte. Els models
+    es desen al registre com a "retrained", igual que des de la pantalla.
+    - progress(done, total, product, seconds): es crida cada cop que acaba un producte
+    Torna un DataFrame amb REPORT_COLUMNS.
+    """
+    cutoff = pd.Timestamp(cutoff)
+    tasks = {product: (product, history, cutoff, horizon_days, compare, registry_root)
+             for product, history in product_histories(demand).items()}
+
+    rows = []
+    # Dos models per producte: el de la data de tall i el reentrenat
+    results = run_in_pool(_retrain_worker, tasks, 2 * len(tasks), "retrain_product",
+                          timing=lambda row: (row.get("warm_seconds") or 0.0, row.get("n_train") or 0),
+                          progress=progress, registry_root=registry_root, max_workers=max_workers)
+    for product, row, error in results:
+        rows.append(row if row is not None else {"ProductID": product, "error": error})
+
+    report = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    return report.sort_values("ProductID").reset_index(drop=True)
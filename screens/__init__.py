@@ -0,0 +1,23 @@
+# ------------------------------------------------------------------------
+# PANTALLES DE L'APP
+# ------------------------------------------------------------------------
+# Cada pantalla és un mòdul amb una funció render(). El mòdul només
+# s'importa la primera vegada que s'obre la pantalla, així les llibreries
+# pesades (prophet, scikit-learn) no es carreguen per a Inici o Client.
+import importlib
+
+# Opció del menú -> mòdul de la pantalla
+SCREENS = {
+    "Inici": "inici",
+    "Comandes": "comandes",
+    "Detall comanda": "detall_comanda",
+    "Inventari": "inventari",
+    "Client": "client",
+    "Anàlisi Predictiva": "analisi_predictiva",
+    "Importar / Exportar": "import_export",
+}
+
+
+def render(menu):
+    """Importa (si cal) i dibuixa la pantalla de l'opció del menú."""
+    importlib.import_module(f"{__name__}.{SCREENS[menu]}").render()
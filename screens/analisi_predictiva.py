@@ -0,0 +1,351 @@
+# ------------------------------------------------------------------------
+# PANTALLA: ANÀLISI PREDICTIVA
+# ------------------------------------------------------------------------
+# Prophet i scikit-learn només es carreguen quan s'obre aquesta pantalla
+# (app.py importa cada pantalla quan cal), no en arrencar l'app.
+import datetime
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+try:
+    from prophet import Prophet
+except ImportError:
+    Prophet = None
+
+from airtable_config import API_URL, BASE_ID, COMANDA_TABLE, comanda_url, detall_url, inventari_url
+from airtable_data import load_tables, update_airtable_records
+from airtable_sync import get_snapshot
+from backtest import backtest_all_products, default_backtest_path, error_matrix
+from batch_forecast import forecast_all_products, default_output_path
+from demand_cube import DEMAND_FIELDS, get_demand_cube
+from instrumentation import timed
+from model_registry import get_registry
+from order_classifier import build_order_features, get_classifier_store, labeled_orders, predict_pending
+from retraining import retrain_all_products, retrain_product, retraining_data
+
+
+def render():
+    if Prophet is None:
+        st.error("No s'ha instal·lat 'prophet'. Executa a cmd: pip install prophet")
+        st.stop()
+
+    st.header("Anàlisi Predictiva")
+    st.write("### Prediccions de demanda amb Prophet (mensual, amb reentrenament).")
+
+    # -------------------------------------------------------------
+    # 1) Carguem INVENTARI (para mapear record_id -> ProductID)
+    # -------------------------------------------------------------
+    # Les tres taules de l'anàlisi es carreguen en paral·lel i només amb els camps
+    # que fan servir la predicció i el classificador. No es filtra per producte:
+    # el mateix Detall comanda alimenta el selector, la predicció en lot i el classificador.
+    tables = load_tables({
+        "inventari": (inventari_url, {"fields": ["ProductID"]}),
+        "detall": (detall_url, {"fields": DEMAND_FIELDS}),
+        "comanda": (comanda_url, {"fields": ["OrderID", "CustomerID", "Data", "Detall comanda", "Status"]})
+    })
+    inventari_df = tables["inventari"]
+    recordid_to_name = {}
+    if not inventari_df.empty and "record_id" in inventari_df.columns and "ProductID" in inventari_df.columns:
+        recordid_to_name = dict(zip(inventari_df["record_id"], inventari_df["ProductID"]))
+    else:
+        st.warning("No trobo 'record_id' i/o 'ProductID' a INVENTARI. Potser no es podran mapear productes correctament.")
+
+    # -------------------------------------------------------------
+    # 2) Carguem la taula DETALL COMANDA amb dades reals
+    # -------------------------------------------------------------
+    df_detall = tables["detall"]
+    if df_detall.empty:
+        st.warning("No hi ha dades a 'Detall comanda'.")
+        st.stop()
+
+    needed_cols = {"ProductID", "Quantity", "Data"}
+    if not needed_cols.issubset(df_detall.columns):
+        st.warning(f"Falten columnes {needed_cols} a df_detall.")
+        st.stop()
+
+    # Convertir 'Data' a datetime
+    try:
+        df_detall["Data"] = pd.to_datetime(df_detall["Data"], errors="coerce")
+    except:
+        st.warning("No s'ha pogut convertir la columna 'Data' a datetime. Revisa el format.")
+
+    # Demanda diària per producte (record_id -> 'PRODxxx'). El cub només aplica
+    # les línies que la sincronització de Detall comanda ha portat des de l'última lectura.
+    cube = get_demand_cube()
+    with timed("transform", "demand_cube", rows=len(df_detall)):
+        cube.sync(get_snapshot(detall_url, DEMAND_FIELDS))
+        demand = cube.to_frame(recordid_to_name)
+
+    # -------------------------------------------------------------
+    # 3) Selector de producte
+    # -------------------------------------------------------------
+    product_list = sorted(demand["ProductID"].dropna().unique().tolist())
+    selected_prod = st.selectbox("Selecciona el ProductID a analitzar:", product_list)
+
+    # Demanda diària del producte (ds, y)
+    df_prod_grouped = demand[demand["ProductID"] == selected_prod][["ds", "y"]].reset_index(drop=True)
+
+    st.write(f"#### Dades reals diàries del producte **{selected_prod}**:")
+    st.dataframe(df_prod_grouped)
+
+    st.write("---")
+
+    # -------------------------------------------------------------
+    # 4) Seleccionar mes de 2025 a predir
+    # -------------------------------------------------------------
+    st.write("### Predicció mensual amb reentrenament")
+
+    meses_2025 = {
+        "Gener (Enero)": 1,
+        "Febrer (Febrero)": 2,
+        "Març (Marzo)": 3,
+        "Abril": 4,
+        "Maig": 5,
+        "Juny": 6,
+        "Juliol": 7,
+        "Agost": 8,
+        "Setembre": 9,
+        "Octubre": 10,
+        "Novembre": 11,
+        "Desembre": 12
+    }
+    mes_select = st.selectbox("Mes de 2025 per predir:", list(meses_2025.keys()))
+    mes_num = meses_2025[mes_select]
+
+    # Checkbox per fer servir model d'entrenament
+    use_retrained = st.checkbox("Usar el model reentrenat (si existe) en lloc d'entrenar amb dades fins la data", value=False)
+
+    # Registre de models a disc (producte + data de tall + hash de les dades)
+    registry = get_registry()
+
+    # Determinem la data del més a predir
+    start_of_month = datetime.date(2025, mes_num, 1)
+    cutoff = pd.to_datetime(start_of_month)
+    days_in_month = 30
+
+    # Dades d'entrenament (ds < cutoff) i dades reals del mes
+    train_df = df_prod_grouped[df_prod_grouped["ds"] < cutoff].copy()
+    real_mes = df_prod_grouped[
+        (df_prod_grouped["ds"] >= cutoff) &
+        (df_prod_grouped["ds"] <= cutoff + datetime.timedelta(days=days_in_month))
+    ].copy()
+
+    # Botó per predir
+    if st.button("Predir el mes seleccionat"):
+        # A) Triar: model reentrenat del registre o model fins a la data
+        model = None
+        if use_retrained:
+            # El model reentrenat es va ajustar amb train_df + real_mes
+            new_train = retraining_data(train_df, real_mes)
+            model = registry.load(selected_prod, cutoff, new_train, kind="retrained")
+            if model is not None:
+                st.write("**S'utilitza el model reentrenat** (registre de models).")
+            else:
+                st.info("No hi ha cap model reentrenat per aquest producte i mes. Es fa servir el model fins a la data.")
+
+        if model is None:
+            if train_df.empty:
+                st.warning("No hi ha dades anteriors al mes seleccionat.")
+                st.stop()
+
+            with timed("model", "prophet_get_or_fit", rows=len(train_df)):
+                model, reused = registry.get_or_fit(selected_prod, cutoff, train_df,
+                                                    fit=lambda df: Prophet().fit(df))
+            if reused:
+                st.write("**Model reutilitzat del registre** (mateixes dades fins a la data).")
+            else:
+                st.write("**Model entrenat des de zero** (fins a la data).")
+
+        # B) Fer forecast ~30 dies del mes
+        future_start = cutoff
+        future_end = cutoff + datetime.timedelta(days=days_in_month)
+        future_dates = pd.date_range(start=future_start, end=future_end, freq="D")
+        future_df = pd.DataFrame({"ds": future_dates})
+
+        with timed("model", "prophet_predict", rows=len(future_df)):
+            forecast = model.predict(future_df)
+
+        st.write(f"## Predicció per al mes de {mes_select} de 2025")
+        st.dataframe(forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]])
+
+        # Comparar amb dades reals
+        compare = pd.merge(
+            real_mes[["ds","y"]],
+            forecast[["ds","yhat"]],
+            on="ds", how="inner"
+        )
+        if compare.empty:
+            st.info("No hi ha dades reals per aquest mes (o no coincideixen dates).")
+        else:
+            compare["error"] = compare["y"] - compare["yhat"]
+            compare["abs_error"] = compare["error"].abs()
+            mae = compare["abs_error"].mean()
+            rmse = (compare["error"]**2).mean()**0.5
+
+            st.write("### Comparació amb dades reals d'aquest mes:")
+            st.dataframe(compare)
+            st.write(f"**MAE**: {mae:.2f}  |  **RMSE**: {rmse:.2f}")
+
+    # ----------------------------------------------------------------
+    # Reentrenar amb les dades reals del mes (warm start)
+    # ----------------------------------------------------------------
+    # Fora del botó "Predir": un botó dins d'un altre desapareix en el rerun que
+    # provoca el seu propi clic i el reentrenament no s'executava mai.
+    st.write("---")
+    st.write("### Reentrenar el model amb les dades reals d'aquest mes")
+    st.write("Es parteix dels paràmetres del model fins a la data i només s'hi afegeixen les dades del mes.")
+    compare_cold = st.checkbox("Comparar amb un ajust des de zero (temps i deriva dels paràmetres)", value=False)
+
+    if st.button("Reentrenar amb dades reals del mes actual"):
+        if train_df.empty or real_mes.empty:
+            st.warning("Cal tenir dades anteriors al mes i dades reals del mes per reentrenar.")
+        else:
+            # Model fins a la data (el del registre o s'ajusta ara) com a punt de partida
+            previous, _ = registry.get_or_fit(selected_prod, cutoff, train_df, fit=lambda df: Prophet().fit(df))
+            model2, new_train, report = retrain_product(selected_prod, train_df, real_mes, previous,
+                                                        compare=compare_cold)
+
+            # Guardem al registre de models (persisteix entre sessions i productes)
+            registry.save(selected_prod, cutoff, new_train, model2, kind="retrained")
+
+            st.success(f"S'ha reentrenat el model amb les dades reals d'aquest mes en {report['warm_seconds']:.2f} s!")
+            if compare_cold:
+                st.write(f"Ajust des de zero: {report['cold_seconds']:.2f} s "
+                         f"({report['speedup']:.1f}x). Deriva dels paràmetres (escala interna de Prophet):")
+                st.dataframe(pd.DataFrame([report]))
+            st.info("En la propera predicció, marca la casella 'Usar el model reentrenat' i es farà servir aquest.")
+
+    if st.button("Reentrenar tots els productes amb el mes seleccionat"):
+        progress_bar = st.progress(0.0)
+        progress_text = st.empty()
+
+        def show_retrain_progress(done, total, product, seconds):
+            progress_bar.progress(done / total)
+            progress_text.write(f"{done}/{total} productes · {product} en {seconds:.1f} s")
+
+        retrain_start = time.perf_counter()
+        retrain_report = retrain_all_products(demand, cutoff, compare=compare_cold, progress=show_retrain_progress)
+        st.success(f"{retrain_report['error'].isna().sum()} productes reentrenats en "
+                   f"{time.perf_counter() - retrain_start:.1f} s.")
+        st.dataframe(retrain_report)
+
+    # ----------------------------------------------------------------
+    # Predicció en lot de TOTS els productes (un procés per nucli)
+    # ----------------------------------------------------------------
+    st.write("---")
+    st.write("### Predicció de tots els productes")
+    st.write(f"Es prediu el mes seleccionat ({mes_select} de 2025) per a cada ProductID.")
+
+    if st.button("Predir tots els productes"):
+        cutoff_all = pd.to_datetime(datetime.date(2025, mes_num, 1))
+        progress_bar = st.progress(0.0)
+        progress_text = st.empty()
+
+        def show_progress(done, total, product, seconds):
+            progress_bar.progress(done / total)
+            progress_text.write(f"{done}/{total} productes · {product} en {seconds:.1f} s")
+
+        batch_start = time.perf_counter()
+        output_path = default_output_path(cutoff_all)
+        forecasts_all, timings_all = forecast_all_products(
+            df_detall, cutoff_all, progress=show_progress, output_path=output_path, demand=demand
+        )
+        st.success(f"{timings_all['error'].isna().sum()} productes predits en "
+                   f"{time.perf_counter() - batch_start:.1f} s. Taula desada a {output_path}.")
+        st.dataframe(forecasts_all)
+        st.write("#### Temps per producte")
+        st.dataframe(timings_all)
+        st.download_button("Descarregar prediccions (CSV)", forecasts_all.to_csv(index=False),
+                           file_name=os.path.basename(output_path), mime="text/csv")
+
+    # ----------------------------------------------------------------
+    # Backtest dels 12 mesos de 2025 per a tots els productes
+    # ----------------------------------------------------------------
+    st.write("---")
+    st.write("### Backtest mensual de 2025")
+    st.write("Per cada producte i mes, s'entrena fins al dia 1 del mes i es compara la predicció amb les dades reals.")
+
+    metric = st.selectbox("Error a mostrar:", ["mae", "rmse"], key="backtest_metric")
+    if st.button("Executar backtest de tots els productes"):
+        progress_bar = st.progress(0.0)
+        progress_text = st.empty()
+
+        def show_backtest_progress(done, total, label, seconds):
+            progress_bar.progress(done / total)
+            progress_text.write(f"{done}/{total} plecs · {label} en {seconds:.1f} s")
+
+        backtest_start = time.perf_counter()
+        backtest_path = default_backtest_path(2025)
+        errors = backtest_all_products(demand, 2025, progress=show_backtest_progress, output_path=backtest_path)
+        st.session_state["backtest_errors"] = errors
+        st.success(f"{len(errors)} plecs en {time.perf_counter() - backtest_start:.1f} s "
+                   f"({int(errors['reused'].sum())} models reutilitzats). Taula desada a {backtest_path}.")
+
+    # El resultat es guarda a la sessió per poder canviar de mètrica sense tornar-lo a executar
+    if "backtest_errors" in st.session_state:
+        errors = st.session_state["backtest_errors"]
+        st.write(f"#### {metric.upper()} per producte i mes")
+        st.dataframe(error_matrix(errors, metric))
+        st.write("#### Detall per plec")
+        st.dataframe(errors)
+
+    # ----------------------------------------------------------------
+    # Bloc de CLASSIFICACIÓ automàtica de l’estat de les Comandes
+    # ----------------------------------------------------------------
+    st.write("---")
+    st.write("### Classificació automàtica de l'estat de les Comandes")
+
+    COMANDA_URL_BASE = f"{API_URL}/{BASE_ID}/{COMANDA_TABLE}"
+    df_comanda = tables["comanda"]
+
+    needed_classif = {"CustomerID", "Data", "Detall comanda", "Status", "record_id"}
+    if not df_comanda.empty and needed_classif.issubset(df_comanda.columns):
+
+        # Variables compartides per l'entrenament i la inferència
+        with timed("transform", "build_order_features", rows=len(df_comanda)):
+            df_comanda = build_order_features(df_comanda, df_detall)
+
+        # Model persistit: només es reentrena si les comandes etiquetades han canviat
+        store = get_classifier_store()
+        current = store.load()
+        if current is not None:
+            st.write(f"Model actual: versió {current['version']} ({current['trained_at']}, "
+                     f"{current['n_train']} comandes d'entrenament).")
+
+        if labeled_orders(df_comanda).empty:
+            st.warning("No hi ha comandes amb Status = Valid/Invalid/Duplicate per entrenar el model.")
+        else:
+            force_retrain = st.checkbox("Reentrenar encara que les dades etiquetades no hagin canviat", value=False)
+
+            if st.button("Entrenar, classificar i actualitzar Comandes noves"):
+                artifact, trained = store.get_or_train(df_comanda, force=force_retrain)
+                if trained:
+                    st.write(f"**Model entrenat** (versió {artifact['version']}).")
+                else:
+                    st.write(f"**Model reutilitzat** (versió {artifact['version']}, les dades etiquetades no han canviat).")
+
+                report = artifact["report"]
+                st.write("#### Resultats en test:")
+                st.json(report)
+                st.write("Accuracy:", report["accuracy"])
+
+                result_df = predict_pending(artifact, df_comanda)
+                if not result_df.empty:
+                    # Actualitzem tots els estats en lots de 10 (un PATCH per lot)
+                    updates = [
+                        (rec_id, {"Status": pred_label})
+                        for rec_id, pred_label in zip(result_df["record_id"], result_df["Status"])
+                    ]
+                    updated, failures = update_airtable_records(COMANDA_URL_BASE, updates)
+
+                    st.write("Comandes noves classificades com:")
+                    st.dataframe(result_df[["OrderID", "Status"]])
+                    st.success(f"{len(updated)} comandes actualitzades.")
+                    for f in failures:
+                        st.error(f"Error {f['status']} a la comanda {f['record_id']}: {f['error']}")
+                else:
+                    st.info("No hi ha comandes noves en estat Pending.")
+    else:
+        st.warning(f"No hi ha dades a la taula Comanda o falten columnes {needed_classif}.")
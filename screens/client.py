@@ -0,0 +1,67 @@
+# ------------------------------------------------------------------------
+# PANTALLA: CLIENT
+# ------------------------------------------------------------------------
+import streamlit as st
+
+from airtable_config import API_URL, BASE_ID, CLIENT_TABLE, comanda_url
+from airtable_data import load_tables, map_linked_fields, create_airtable_record
+from table_views import paged_dataframe
+
+
+def render():
+    st.header("Gestió de Clients")
+
+    #  OBTENIR CLIENTS (FILES EN ORDRE DE LA VISTA "Grid view")
+    client_view_url = f"{API_URL}/{BASE_ID}/{CLIENT_TABLE}?view=Grid%20view"
+    tables = load_tables({"client": client_view_url, "comanda": (comanda_url, {"fields": ["OrderID"]})})
+    clients_df = tables["client"]
+
+    # Reordenar columnes
+    desired_order = ["CustomerID", "Name", "Email", "Phone", "Address", "Registration Date", "Comanda"]
+    cols_present = [c for c in desired_order if c in clients_df.columns]
+    clients_df = clients_df.reindex(columns=cols_present)
+    
+    if not clients_df.empty:
+        # Canviem el ID intern de comanda, i producte pel ID que es mostra
+        # (només a la pàgina visible del llistat)
+        def resolve_page(page_df):
+            return map_linked_fields(page_df, "Comanda", comanda_url, "record_id", "OrderID",
+                                     linked_df=tables["comanda"])
+
+        st.subheader("Llistat de Clients")
+        paged_dataframe(clients_df, "clients", ["CustomerID", "Name", "Email", "Phone", "Address"],
+                        resolve=resolve_page)
+    else:
+        st.info("No hi ha dades de Client o s'ha produït un error en obtenir-les.")
+
+    # -----------------------------------------
+    # 1) CREAR NOU CLIENT
+    # -----------------------------------------
+    st.write("### Afegir un Nou Client")
+    new_cust_id = st.text_input("CustomerID:", "")
+    new_name = st.text_input("Name:", "")
+    new_email = st.text_input("Email:", "")
+    new_phone = st.text_input("Phone:", "")
+    new_address = st.text_input("Address:", "")
+    new_regdate = st.text_input("Registration Date:", "2025-12-25")  
+
+    # 4) Botó de creació
+    if st.button("Crear Client"):
+        # Montem el diccionari de camps
+        fields = {
+            "CustomerID": new_cust_id,
+            "Name": new_name,
+            "Email": new_email,
+            "Phone": new_phone,
+            "Address": new_address,              
+            "Registration Date": new_regdate     
+        }
+
+        # Fer sevir la URL base SENSE ?view=... per POST
+        client_base_url = f"{API_URL}/{BASE_ID}/{CLIENT_TABLE}"
+        r = create_airtable_record(client_base_url, fields)
+
+        if r.status_code in (200, 201):
+            st.success(f"Client {new_cust_id} creat correctament!")
+        else:
+            st.error(f"Error al crear el client: {r.status_code} | {r.text}")
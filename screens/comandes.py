@@ -0,0 +1,111 @@
+# ------------------------------------------------------------------------
+# PANTALLA: COMANDES
+# ------------------------------------------------------------------------
+import streamlit as st
+
+from airtable_config import API_URL, BASE_ID, COMANDA_TABLE, client_url, detall_url
+from airtable_data import load_tables, resolve_linked_fields, create_airtable_record, update_airtable_record
+from table_views import paged_dataframe, search_picker
+
+
+def render():
+    st.header("Gestió de Comandes")
+
+    
+    # OBTENIR COMANDES (FILES EN ORDRE DE LA VISTA "Grid view")
+    comandes_url = f"{API_URL}/{BASE_ID}/{COMANDA_TABLE}?view=Grid%20view"
+
+    # Carreguem en paral·lel totes les taules que necessita la pantalla
+    # De les taules vinculades només cal la ID llegible de cada registre
+    tables = load_tables({
+        "comandes": comandes_url,
+        "client": (client_url, {"fields": ["CustomerID"]}),
+        "detall": (detall_url, {"fields": ["OrderID"]})
+    })
+    comandes_df = tables["comandes"]
+
+    # Reordenar columnes 
+    desired_order = ["OrderID", "CustomerID", "Status", "Data", "Detall comanda", "record_id"]
+    cols_present = [c for c in desired_order if c in comandes_df.columns]
+    comandes_df = comandes_df.reindex(columns=cols_present)
+
+    if not comandes_df.empty:
+        
+        # Canviem el ID intern del client, i detall comanda pel ID que es mostra
+        # (només a la pàgina visible del llistat)
+        def resolve_page(page_df):
+            return resolve_linked_fields(page_df, [
+                ("CustomerID", client_url, "record_id", "CustomerID", tables["client"]),
+                ("Detall comanda", detall_url, "record_id", "OrderID", tables["detall"])
+            ])
+
+        st.subheader("Llistat de Comandes Existents")
+        paged_dataframe(comandes_df, "comandes", ["OrderID", "Status", "Data"], resolve=resolve_page)
+
+        # -------------------------------------------------------------------
+        # 1) ACTUALIZAR "STATUS" DE UNA COMANDA EXISTENT
+        # -------------------------------------------------------------------
+        if "OrderID" in comandes_df.columns and "record_id" in comandes_df.columns:
+            st.write("### Actualitzar l'estat d'una Comanda")
+
+            selected_order = search_picker(
+                "Selecciona una comanda:",
+                comandes_df["OrderID"],
+                key="comandes_status_order"
+            )
+            new_status = st.selectbox("Nou estat:", ["Valid", "Invalid", "Duplicate", "Pending"])
+
+            if st.button("Actualitza Estat") and selected_order is not None:
+                # Obtenim el 'record_id' de la fila que coincideix amb la comanda triada
+                record_id = comandes_df.loc[
+                    comandes_df["OrderID"] == selected_order, "record_id"
+                ].values[0]
+
+                # Cridar PATCH
+                resp = update_airtable_record(
+                    comandes_url.replace("?view=Grid%20view", ""),  # Treu la vista (Grid view)
+                    record_id,
+                    {"Status": new_status}
+                )
+                if resp.status_code == 200:
+                    st.success(f"Comanda {selected_order} actualitzada a {new_status}.")
+                else:
+                    st.error(f"Error al actualizar: {resp.status_code} | {resp.text}")
+        else:
+            st.warning("No trobo 'OrderID' o 'record_id' a comandes_df.")
+    else:
+        st.warning("No hi ha comandes o s'ha produït un error en obtenir-les.")
+
+    # -------------------------------------------------------------------
+    # 2) CREAR UNA COMANDA NOVA
+    # -------------------------------------------------------------------
+    st.write("### Crear una Nova Comanda")
+
+    # a) LLEGIR LA TAULA DE CLIENTS PEL SELECTBOX
+    client_df = tables["client"]  # Ja carregada amb la resta de taules
+    if not client_df.empty and "CustomerID" in client_df.columns and "record_id" in client_df.columns:
+        # Construim diccionari: { "CUST001": "recXXXXXXXX", ... }
+        client_dict = dict(zip(client_df["CustomerID"], client_df["record_id"]))
+        # Selectbox perqué l'usuari vegi "CUSTxxx" 
+        selected_customer_id = search_picker("CustomerID:", list(client_dict.keys()), key="comandes_new_customer")
+        # Internament: la record_id real del client 
+        selected_customer_record = client_dict.get(selected_customer_id)
+    else:
+        st.warning("No trobo dades de 'CustomerID' en la taula Client. Usaré un valor vacío.")
+        selected_customer_record = None
+
+    # b) Status inicial
+    new_status_val = st.selectbox("Status inicial:", ["Valid", "Invalid", "Duplicate", "Pending"])
+
+    if st.button("Crear Comanda"):
+        # Si "CustomerID" es un 'Link to another record' a Airtable, 
+        # has de passar un array amb la record ID real del client:
+        fields = { 
+            "CustomerID": [selected_customer_record] if selected_customer_record else [],
+            "Status": new_status_val
+        }
+        resp = create_airtable_record(comandes_url.replace("?view=Grid%20view", ""), fields)
+        if resp.status_code in (200, 201):
+            st.success("Comanda creada correctament!")
+        else:
+            st.error(f"Error al crear la comanda: {resp.status_code} | {resp.text}")
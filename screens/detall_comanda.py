@@ -0,0 +1,126 @@
+# ------------------------------------------------------------------------
+# PANTALLA: DETALL COMANDA
+# ------------------------------------------------------------------------
+import pandas as pd
+import streamlit as st
+
+from airtable_config import API_URL, BASE_ID, DETALL_TABLE, comanda_url, inventari_url
+from airtable_data import load_tables, resolve_linked_fields, create_airtable_record
+from stock_pipeline import apply_stock_decrements
+from table_views import paged_dataframe, search_picker
+
+
+def render():
+    st.header("Gestió del Detall de les Comandes")
+
+     # OBTENIR DETALL (FILES EN ORDRE DE LA VISTA "Grid view")
+    detall_url_view = f"{API_URL}/{BASE_ID}/{DETALL_TABLE}?view=Grid%20view"
+
+    # Carreguem en paral·lel totes les taules que necessita la pantalla.
+    # Comanda i Inventari es llegeixen un sol cop: serveixen per mapejar
+    # els camps vinculats i per omplir els selectbox (que s'ordenen igualment).
+    # Comanda i Inventari només fan falta per OrderID/ProductID <-> record_id
+    tables = load_tables({
+        "detall": detall_url_view,
+        "comanda": (comanda_url, {"fields": ["OrderID"]}),
+        "inventari": (inventari_url, {"fields": ["ProductID"]})
+    })
+    detall_df = tables["detall"]
+
+    # Reordenar columnes 
+    desired_order = ["OrderID", "Comanda", "ProductID", "Quantity", "record_id"]
+    cols_present = [c for c in desired_order if c in detall_df.columns]
+    detall_df = detall_df.reindex(columns=cols_present)
+
+    if not detall_df.empty:
+        # Canviem el ID intern de comanda, i producte pel ID que es mostra
+        # (només a la pàgina visible del llistat)
+        def resolve_page(page_df):
+            return resolve_linked_fields(page_df, [
+                ("Comanda", comanda_url, "record_id", "OrderID", tables["comanda"]),
+                ("ProductID", inventari_url, "record_id", "ProductID", tables["inventari"])
+            ])
+
+        st.subheader("Llistat de Detall comanda")
+        paged_dataframe(detall_df, "detall", ["OrderID", "Quantity"], resolve=resolve_page)
+    else:
+        st.info("No hi ha detalls o s'ha produït un error en obtenir-los.")
+
+    st.write("### Afegir un nou Detall de Comanda")
+
+    # -----------------------------------------------------------------------
+    # OBTENIR LLISTA DE COMANDES (PER ENLLAÇAR) DESDE LA TAULA “Comanda”
+    # -----------------------------------------------------------------------
+    comanda_df = tables["comanda"]
+
+    # Construim diccionari: (134: "recAbCdEf", 82: "recXyZ123"...)
+    comanda_dict = {}
+    if not comanda_df.empty and "OrderID" in comanda_df.columns and "record_id" in comanda_df.columns:
+        comanda_dict = dict(zip(comanda_df["OrderID"], comanda_df["record_id"]))
+    else:
+        st.warning("No trobo 'OrderID' i/o 'record_id' a la taula Comanda. No es podrà enllaçar la comanda.")
+
+    # El user escull l'"OrderID" (ej. 134), peró internament fem servir el seu 'record_id'
+    list_of_orderids = sorted(list(comanda_dict.keys()))
+    selected_orderid = search_picker("Comanda (OrderID) vinculat:", list_of_orderids, key="detall_order")
+    selected_comanda_recid = comanda_dict[selected_orderid] if selected_orderid in comanda_dict else None
+
+    # -----------------------------------------------------------------------
+    #  OBTENIR LLISTA DE PRODUCTES (PER “ProductID”) DESDE “Inventari”
+    # -----------------------------------------------------------------------
+    # Construim diccionari
+    inventari_df = tables["inventari"]
+
+    product_dict = {}
+    if not inventari_df.empty and "ProductID" in inventari_df.columns and "record_id" in inventari_df.columns:
+        # Construim diccionari: {"PROD001": "recProdA1B2C3", "PROD002": "recProdD4E5F6", ...}
+        product_dict = dict(zip(inventari_df["ProductID"], inventari_df["record_id"]))
+    else:
+        st.warning("No trobo 'ProductID' i/o 'record_id' a la taula Inventari.")
+
+    # El user escull l'"ProductID" (ej. 134), peró internament fem servir el seu 'record_id'
+    product_ids_sorted = sorted(list(product_dict.keys()))
+    selected_productid = search_picker("ProductID:", product_ids_sorted, key="detall_product")
+    selected_product_recid = product_dict[selected_productid] if selected_productid in product_dict else None
+
+    # -----------------------------------------------------------------------
+    # QUANTITY
+    # -----------------------------------------------------------------------
+    new_quantity = st.number_input("Quantity:", min_value=0, step=1)
+
+    # -----------------------------------------------------------------------
+    # 1) CREAR EL NOU DETALL
+    # -----------------------------------------------------------------------
+    if st.button("Afegir Detall"):
+        # “Comanda” és link -> array amb la record_id
+        # “ProductID” també es link -> array amb la record_id
+        # “OrderID” és un camp calculat => NO l'enviem
+        # "Quantity" és un número => s'introdueix manualment
+        if selected_comanda_recid and selected_product_recid:
+            fields = {
+                "Comanda": [selected_comanda_recid],
+                "ProductID": [selected_product_recid],
+                "Quantity": new_quantity
+            }
+            # Insertar a la taula base (sin ?view=)
+            detall_base_url = f"{API_URL}/{BASE_ID}/{DETALL_TABLE}"
+            resp = create_airtable_record(detall_base_url, fields)
+            if resp.status_code in (200, 201):
+                st.success("Detall creat correctament!")
+                # Descomptem la quantitat del Stock del producte (un sol cop per línia)
+                new_line = {"record_id": resp.json()["records"][0]["id"],
+                            "ProductID": [selected_product_recid], "Quantity": new_quantity}
+                try:
+                    result = apply_stock_decrements(pd.DataFrame([new_line]))
+                except RuntimeError as e:
+                    st.warning(f"No s'ha pogut descomptar l'estoc ara ({e}). Es farà en la propera sincronització.")
+                else:
+                    for row in result.itertuples():
+                        if row.updated:
+                            st.info(f"Stock de {selected_productid}: {row.stock_before:g} -> {row.stock_after:g}")
+                        else:
+                            st.warning(f"No s'ha pogut actualitzar el Stock de {selected_productid}. Es reintentarà.")
+            else:
+                st.error(f"Error al crear el detall: {resp.status_code} | {resp.text}")
+        else:
+            st.warning("No s'ha pogut obtenir la record_id de la Comanda o del Producte.")
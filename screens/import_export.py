@@ -0,0 +1,117 @@
+# ------------------------------------------------------------------------
+# PANTALLA: IMPORTACIÓ I EXPORTACIÓ MASSIVA
+# ------------------------------------------------------------------------
+import os
+import tempfile
+
+import streamlit as st
+
+from bulk_io import CHUNK_SIZE, SPECS, Importer, export_table
+
+# download_button carrega el fitxer sencer en memòria per servir-lo: per sobre
+# d'aquesta mida l'exportació s'ha de fer des de la línia d'ordres (bulk_io.py)
+EXPORT_MAX_BYTES = 50 * 1024 * 1024
+
+# Opció del desplegable -> taula de bulk_io.SPECS
+TABLES = {
+    "Clients": "client",
+    "Productes (Inventari)": "inventari",
+    "Comandes": "comanda",
+    "Línies (Detall comanda)": "detall",
+}
+
+
+def render():
+    st.header("Importació i exportació massiva")
+
+    # -----------------------------------------------------------------------
+    # 1) IMPORTAR
+    # -----------------------------------------------------------------------
+    st.write("### Importar un fitxer CSV o JSONL")
+    st.caption("Ordre recomanat: clients, productes, comandes i línies. Les línies es poden vincular "
+               "a les comandes importades en aquesta sessió amb la columna OrderID del fitxer de comandes.")
+    label = st.selectbox("Taula:", list(TABLES), key="import_table")
+    kind = TABLES[label]
+    st.write("Columnes: " + ", ".join(f"**{c}**" if c in SPECS[kind]["required"] else c
+                                       for c in SPECS[kind]["columns"]))
+    uploaded = st.file_uploader("Fitxer:", type=["csv", "jsonl", "json", "ndjson"], key="import_file")
+    dry_run = st.checkbox("Només validar (no escriure a Airtable)", key="import_dry_run")
+    decrement_stock = False
+    if kind == "detall":
+        decrement_stock = st.checkbox("Descomptar de l'estoc les línies importades", key="import_stock")
+
+    # L'importador guarda els índexs i les referències de la sessió entre fitxers
+    if "bulk_importer" not in st.session_state:
+        st.session_state["bulk_importer"] = Importer()
+    importer = st.session_state["bulk_importer"]
+
+    if uploaded is not None and st.button("Importar"):
+        progress_text = st.empty()
+
+        def show_progress(rows, created, errors):
+            progress_text.write(f"{rows} files llegides · {created} creades · {errors} amb errors")
+
+        try:
+            summary = importer.import_file(kind, uploaded, chunk_size=CHUNK_SIZE,
+                                           progress=show_progress, dry_run=dry_run)
+        except (RuntimeError, ValueError) as e:
+            st.error(f"No s'ha pogut importar el fitxer: {e}")
+        else:
+            valid = summary["rows"] - len(summary["errors"])
+            if dry_run:
+                st.info(f"{valid} de {summary['rows']} files són vàlides.")
+            else:
+                st.success(f"{summary['created']} de {summary['rows']} registres creats.")
+            if summary["errors"]:
+                st.warning(f"{len(summary['errors'])} files amb errors (no s'han creat):")
+                st.dataframe([{"fila": row, "error": message} for row, message in summary["errors"]])
+
+            if decrement_stock and summary["record_ids"]:
+                from airtable_config import detall_url
+                from airtable_data import fetch_table
+                from stock_pipeline import apply_stock_decrements
+
+                try:
+                    lines, error = fetch_table(detall_url, use_cache=False, fields=["ProductID", "Quantity"])
+                    if error:
+                        raise RuntimeError(error)
+                    result = apply_stock_decrements(lines[lines["record_id"].isin(summary["record_ids"])])
+                except RuntimeError as e:
+                    st.warning(f"No s'ha pogut descomptar l'estoc ara ({e}). Es farà en la propera sincronització.")
+                else:
+                    st.info(f"Stock actualitzat a {int(result['updated'].sum())} productes.")
+
+    if st.button("Nova sessió d'importació"):
+        st.session_state["bulk_importer"] = Importer()
+
+    # -----------------------------------------------------------------------
+    # 2) EXPORTAR
+    # -----------------------------------------------------------------------
+    st.write("### Exportar una taula")
+    st.caption(f"Des d'aquí es poden descarregar fitxers de fins a {EXPORT_MAX_BYTES // 1024 ** 2} MB. "
+               "Per a taules més grans: `python bulk_io.py export TAULA FITXER`.")
+    export_label = st.selectbox("Taula:", list(TABLES), key="export_table")
+    export_format = st.radio("Format:", ["csv", "jsonl"], horizontal=True, key="export_format")
+    if st.button("Exportar"):
+        export_kind = TABLES[export_label]
+        progress_text = st.empty()
+        file_name = f"{export_kind}.{export_format}"
+        # Les pàgines s'escriuen a un fitxer temporal a mesura que arriben, no en memòria
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, file_name)
+            try:
+                total = export_table(export_kind, path, fmt=export_format,
+                                     progress=lambda rows: progress_text.write(f"{rows} registres llegits"))
+            except RuntimeError as e:
+                st.error(f"No s'ha pogut exportar la taula: {e}")
+                return
+            progress_text.write(f"{total} registres exportats.")
+            size = os.path.getsize(path)
+            if size > EXPORT_MAX_BYTES:
+                st.warning(f"El fitxer fa {size / 1024 ** 2:.0f} MB (el màxim des d'aquí és "
+                           f"{EXPORT_MAX_BYTES / 1024 ** 2:.0f} MB). Exporteu-lo des de la línia d'ordres: "
+                           f"`python bulk_io.py export {export_kind} {file_name}`")
+                return
+            with open(path, "rb") as f:
+                st.download_button(f"Descarregar {file_name}", f, file_name=file_name,
+                                   mime="text/csv" if export_format == "csv" else "application/x-ndjson")
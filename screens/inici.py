@@ -0,0 +1,9 @@
+# ------------------------------------------------------------------------
+# PANTALLA: INICI
+# ------------------------------------------------------------------------
+import streamlit as st
+
+
+def render():
+    st.title("Benvingut a la Gestió de Comandes")
+    st.write("Aquesta aplicació t'ajuda a gestionar les teves comandes i l'estoc de forma eficient.")
@@ -0,0 +1,143 @@
+# ------------------------------------------------------------------------
+# PANTALLA: INVENTARI
+# ------------------------------------------------------------------------
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+from airtable_config import API_URL, BASE_ID, INVENTARI_TABLE, detall_url
+from airtable_data import load_tables, map_linked_fields, create_airtable_record, update_airtable_record, update_airtable_records
+from airtable_sync import get_snapshot
+from demand_cube import DEMAND_FIELDS, get_demand_cube
+from reorder import LEAD_TIME_DAYS, forecast_files, latest_forecast, reorder_plan, reposition_updates
+from table_views import paged_dataframe, search_picker
+
+
+def render():
+    st.header("Gestió d'Estoc / Inventari")
+
+    # OBTENIR INVENTARI (FILES EN ORDRE DE LA VISTA "Grid view")
+    inventari_view_url = f"{API_URL}/{BASE_ID}/{INVENTARI_TABLE}?view=Grid%20view"
+    tables = load_tables({"inventari": inventari_view_url, "detall": (detall_url, {"fields": ["OrderID"]})})
+    inventari_df = tables["inventari"]
+
+    # Reordenar columnes 
+    desired_order = ["ProductID", "ProductName", "Stock", "ReorderLevel", "Reposition", "Detall comanda", "record_id"]
+    cols_present = [c for c in desired_order if c in inventari_df.columns]
+    inventari_df = inventari_df.reindex(columns=cols_present)
+
+    if not inventari_df.empty:
+        # Canviem el ID intern de comanda, i producte pel ID que es mostra
+        # (només a la pàgina visible del llistat)
+        def resolve_page(page_df):
+            return map_linked_fields(page_df, "Detall comanda", detall_url, "record_id", "OrderID",
+                                     linked_df=tables["detall"])
+
+        st.subheader("Inventari Actual")
+        paged_dataframe(inventari_df, "inventari", ["ProductID", "ProductName"], resolve=resolve_page)
+        # -----------------------------------------
+        # 1) ACTUALITZAR STOCK DE UN PRODUCTE EXISTENTE
+        # -----------------------------------------
+        if "ProductID" in inventari_df.columns and "record_id" in inventari_df.columns:
+            st.write("### Actualitzar Stock d'un producte")
+
+            product_selected = search_picker("Producte:", inventari_df["ProductID"], key="inventari_product")
+            new_stock_val = st.number_input("Nou Stock:", min_value=0, step=1)
+
+            if st.button("Actualitza Stock") and product_selected is not None:
+                # Localitzem la record_id que coincideix amb el producte triat
+                record_id = inventari_df.loc[
+                    inventari_df["ProductID"] == product_selected,
+                    "record_id"
+                ].values[0]
+
+                # IMPORTANT: URL base sense parámetres de vista
+                inventari_base_url = f"{API_URL}/{BASE_ID}/{INVENTARI_TABLE}"
+
+                # Enviem sol el camp 'Stock'
+                resp = update_airtable_record(inventari_base_url, record_id, {"Stock": new_stock_val})
+
+                if resp.status_code == 200:
+                    st.success(f"S'ha actualitzat el stock de {product_selected} a {new_stock_val}.")
+                else:
+                    st.error(f"Error {resp.status_code}: {resp.text}")
+        else:
+            st.warning("No trobo 'ProductID' o 'record_id' en inventari.")
+
+        # -----------------------------------------
+        # 2) REPOSICIÓ DE TOT L'INVENTARI
+        # -----------------------------------------
+        if {"ProductID", "record_id"}.issubset(inventari_df.columns):
+            st.write("### Reposició")
+            st.write("Punt de comanda = demanda prevista durant el termini + ReorderLevel. "
+                     "Es fa servir l'última predicció en lot que cobreix el termini i, per als productes "
+                     "sense predicció, l'històric recent.")
+            lead_time = st.number_input("Termini de reposició (dies):", min_value=1, value=LEAD_TIME_DAYS, step=1)
+
+            if st.button("Calcular reposició"):
+                # Sincronitza Detall comanda; el cub només aplica les línies del delta
+                load_tables({"detall": (detall_url, {"fields": DEMAND_FIELDS})})
+                cube = get_demand_cube()
+                cube.sync(get_snapshot(detall_url, DEMAND_FIELDS))
+                demand = cube.to_frame(dict(zip(inventari_df["record_id"], inventari_df["ProductID"])))
+                forecasts, cutoff = latest_forecast(lead_time_days=lead_time)
+                st.session_state["reorder_plan"] = reorder_plan(inventari_df, forecasts, demand,
+                                                                lead_time_days=lead_time)
+                st.session_state["reorder_forecast"] = (cutoff, forecast_files()[:1])
+
+            if "reorder_plan" in st.session_state:
+                plan = st.session_state["reorder_plan"]
+                cutoff, newest = st.session_state.get("reorder_forecast", (None, []))
+                today = pd.Timestamp(datetime.date.today())
+                if cutoff is not None:
+                    st.caption(f"Predicció amb data de tall {cutoff:%Y-%m-%d} (fa {(today - cutoff).days} dies).")
+                elif newest:
+                    newest_cutoff = newest[0][0]
+                    st.warning(f"L'última predicció desada (data de tall {newest_cutoff:%Y-%m-%d}, fa "
+                               f"{(today - newest_cutoff).days} dies) no cobreix els propers {lead_time} dies: "
+                               "es fa servir l'històric.")
+                else:
+                    st.caption("No hi ha cap predicció en lot desada: es fa servir l'històric.")
+                updates = reposition_updates(plan)
+                st.write(f"{int((plan['Reposition'] > 0).sum())} productes per reposar · "
+                         f"{len(updates)} valors de Reposition canviats.")
+                paged_dataframe(plan[plan["Reposition"] > 0], "reorder", ["ProductID"])
+
+                if st.button("Escriure Reposition") and updates:
+                    inventari_base_url = f"{API_URL}/{BASE_ID}/{INVENTARI_TABLE}"
+                    updated, failures = update_airtable_records(inventari_base_url, updates)
+                    del st.session_state["reorder_plan"]
+                    st.success(f"{len(updated)} productes actualitzats.")
+                    for f in failures:
+                        st.error(f"Error {f['status']} al producte {f['record_id']}: {f['error']}")
+
+        # -----------------------------------------
+        # 3) CREAR NOU PRODUCTE
+        # -----------------------------------------
+        st.write("### Afegir un Nou Producte")
+        new_prod_id = st.text_input("Nou ProductID:", "")
+        new_prod_name = st.text_input("Nom del Producte:", "")
+        new_prod_stock = st.number_input("Stock inicial:", min_value=0, step=1)
+        new_prod_reorder = st.number_input("ReorderLevel:", min_value=0, step=1)
+
+        # 4) Botó de creació
+        if st.button("Crear Producte"):
+            # Montem el diccionari de camps
+            fields = {
+                "ProductID": new_prod_id,
+                "ProductName": new_prod_name,
+                "Stock": new_prod_stock,
+                "ReorderLevel": new_prod_reorder
+            }
+
+            # Fer servir la mateixa inventari_base_url sense ?view
+            inventari_base_url = f"{API_URL}/{BASE_ID}/{INVENTARI_TABLE}"
+            r = create_airtable_record(inventari_base_url, fields)
+
+            if r.status_code in (200, 201):
+                st.success(f"Producte {new_prod_id} creat correctament!")
+            else:
+                st.error(f"Error al crear el producte: {r.status_code} | {r.text}")
+    else:
+        st.warning("No hi ha dades d'inventari o error al carregar-les.")
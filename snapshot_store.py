@@ -0,0 +1,184 @@
+# ------------------------------------------------------------------------
+# MAGATZEM LOCAL DE SNAPSHOTS EN COLUMNES (PARQUET / ARROW)
+# ------------------------------------------------------------------------
+# Guarda Comanda, Detall comanda, Inventari i Client en fitxers Parquet amb
+# tipus: camps vinculats com a list<string>, 'Data' com a timestamp i
+# quantitats com a enters. L'app els llegeix amb memory-map en arrencar i
+# després només demana a Airtable els canvis des de la data del snapshot.
+#
+# Refrescar els fitxers des de la línia d'ordres:
+#     python snapshot_store.py refresh            # les quatre taules
+#     python snapshot_store.py refresh detall     # només una
+#     python snapshot_store.py info
+import datetime
+import os
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from airtable_cache import cache_key
+from airtable_config import (
+    COMANDA_TABLE, DETALL_TABLE, INVENTARI_TABLE, CLIENT_TABLE,
+    comanda_url, detall_url, inventari_url, client_url, headers
+)
+
+SNAPSHOT_DIR = os.environ.get(
+    "SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+)
+
+# Tipus de cada columna coneguda. La resta de columnes es deixen inferir a Arrow.
+# airtable_parser.py fa servir els mateixos tipus per als DataFrames en memòria.
+SCHEMAS = {
+    "comanda": {
+        "table": COMANDA_TABLE, "url": comanda_url,
+        "links": ["CustomerID", "Detall comanda"], "dates": ["Data"], "ints": ["OrderID"]
+    },
+    "detall": {
+        "table": DETALL_TABLE, "url": detall_url,
+        "links": ["Comanda", "ProductID"], "dates": ["Data"], "ints": ["Quantity"]
+    },
+    "inventari": {
+        "table": INVENTARI_TABLE, "url": inventari_url,
+        "links": ["Detall comanda"], "dates": [], "ints": ["Stock", "ReorderLevel", "Reposition"]
+    },
+    "client": {
+        "table": CLIENT_TABLE, "url": client_url,
+        "links": ["Comanda"], "dates": ["Registration Date"], "ints": []
+    },
+}
+
+
+def snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.parquet")
+
+
+def _to_arrow_column(values, name, column):
+    """Converteix una columna del DataFrame al tipus Arrow que li correspon."""
+    spec = SCHEMAS[name]
+    if column in spec["links"]:
+        return pa.array(
+            [[str(x) for x in v] if isinstance(v, list) else None for v in values],
+            type=pa.list_(pa.string())
+        )
+    if column in spec["dates"]:
+        return pa.array(pd.to_datetime(values, errors="coerce"))
+    if column in spec["ints"]:
+        numeric = pd.to_numeric(values, errors="coerce")
+        try:
+            return pa.array(numeric.astype("Int64"))
+        except TypeError:
+            return pa.array(numeric)  # Hi ha decimals: es queda en float64
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Tipus barrejats: es guarda com a text
+        return pa.array([None if v is None or (not isinstance(v, list) and pd.isna(v)) else str(v)
+                         for v in values], type=pa.string())
+
+
+def to_arrow_table(df, name, refreshed_at):
+    """DataFrame (format get_airtable_data) -> pyarrow.Table amb tipus i metadades."""
+    arrays = [_to_arrow_column(df[c], name, c) for c in df.columns]
+    table = pa.Table.from_arrays(arrays, names=list(df.columns))
+    return table.replace_schema_metadata({
+        "table": SCHEMAS[name]["table"],
+        "refreshed_at": refreshed_at.isoformat(),
+    })
+
+
+def save_snapshot(name, df, refreshed_at):
+    """Escriu el snapshot d'una taula (escriptura atòmica)."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = snapshot_path(name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(to_arrow_table(df, name, refreshed_at), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(name, columns=None):
+    """
+    Llegeix el snapshot (memory-map) i torna (DataFrame, refreshed_at) o (None, None)
+    si no existeix. El DataFrame té els mateixos tipus que airtable_parser.parse_records
+    (vinculats com a list<string> d'Arrow, enters Int32, dates datetime64) i es
+    construeix columna a columna des d'Arrow.
+    columns: només aquestes columnes (+ 'record_id'); si en falta alguna al fitxer,
+    torna (None, None), perquè els registres sense canvis la tindrien buida.
+    """
+    from airtable_parser import arrow_to_frame
+
+    path = snapshot_path(name)
+    if not os.path.exists(path):
+        return None, None
+    if columns is not None:
+        columns = list(dict.fromkeys(["record_id", *columns]))
+        if not set(columns) <= set(pq.read_schema(path).names):
+            return None, None
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    metadata = table.schema.metadata or {}
+    refreshed_at = datetime.datetime.fromisoformat(metadata[b"refreshed_at"].decode())
+    return arrow_to_frame(table, SCHEMAS[name]["table"]), refreshed_at
+
+
+def seed_sync_snapshot(url, fields=None):
+    """
+    Si la sincronització incremental de la URL (amb fields, la de la projecció)
+    encara no té dades, l'omple des del fitxer local amb aquestes columnes.
+    Torna True si s'ha fet servir el fitxer.
+    Les vistes també: el fitxer té la taula sencera, però el snapshot sembrat es
+    reconcilia a la primera sincronització, que deixa només els registres de la
+    vista i en el seu ordre.
+    """
+    from airtable_sync import get_snapshot, seed_snapshot
+
+    table_id, _ = cache_key(url)
+    name = next((n for n, spec in SCHEMAS.items() if spec["table"] == table_id), None)
+    if name is None or get_snapshot(url, fields).last_sync is not None:
+        return False
+    df, refreshed_at = load_snapshot(name, fields)
+    if df is None:
+        return False
+    return seed_snapshot(url, df, refreshed_at, fields)
+
+
+def refresh_snapshots(names=None, verbose=True):
+    """Descarrega les taules indicades (totes per defecte) i en reescriu els snapshots."""
+    from airtable_http import get_client
+    from airtable_sync import fetch_records
+
+    client = get_client(headers)
+    for name in names or SCHEMAS:
+        start = time.perf_counter()
+        refreshed_at = datetime.datetime.now(datetime.timezone.utc)
+        rows = [dict(r.get("fields", {}), record_id=r["id"]) for r in fetch_records(SCHEMAS[name]["url"], client)]
+        path = save_snapshot(name, pd.DataFrame(rows), refreshed_at)
+        if verbose:
+            print(f"{name}: {len(rows)} registres -> {path} ({time.perf_counter() - start:.1f} s)")
+
+
+def snapshot_info():
+    """Files, mida i data de cada snapshot existent."""
+    info = []
+    for name in SCHEMAS:
+        path = snapshot_path(name)
+        if os.path.exists(path):
+            meta = pq.read_metadata(path)
+            info.append({
+                "snapshot": name,
+                "rows": meta.num_rows,
+                "bytes": os.path.getsize(path),
+                "refreshed_at": meta.metadata[b"refreshed_at"].decode(),
+            })
+    return pd.DataFrame(info)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "refresh":
+        refresh_snapshots(sys.argv[2:] or None)
+    elif len(sys.argv) >= 2 and sys.argv[1] == "info":
+        print(snapshot_info().to_string(index=False))
+    else:
+        print("Ús: python snapshot_store.py refresh [comanda|detall|inventari|client ...] | info")
@@ -0,0 +1,260 @@
+# ------------------------------------------------------------------------
+# DESCOMPTE D'ESTOC PER LES LÍNIES DE DETALL COMANDA
+# ------------------------------------------------------------------------
+# Cada lot de línies noves s'agrupa per producte i es fa una sola
+# actualització de Stock per producte (PATCH en lots de 10).
+# La clau d'idempotència és la record_id de cada línia: un diari local
+# (JSONL, jsonl_journal.py, com el de bulk_seed.py) guarda quines línies ja
+# s'han descomptat.
+# Airtable no té transaccions, així que cada lot segueix aquest ordre:
+#   1. "intent": per producte, les línies i el Stock que hi ha d'haver després
+#   2. PATCH dels productes
+#   3. "commit": els productes que Airtable ha confirmat
+# Si el procés s'atura entre 1 i 3 (o un PATCH no es confirma), en la
+# següent execució es compara el Stock actual amb l'esperat: si coincideix,
+# el descompte ja s'havia aplicat i només es marca; si no, es torna a aplicar.
+# Limitació: si algú altre modifica el Stock d'aquell producte entremig, la
+# comparació no pot distingir-ho i el descompte es tornaria a aplicar.
+#
+# La primera execució de sync_stock() marca com a descomptades totes les
+# línies que ja existeixen (l'estoc actual ja les té en compte), excepte les
+# que l'app ja havia intentat descomptar abans: queden apuntades com a
+# pendents ("owed") encara que el descompte fallés abans d'arribar a l'intent.
+#
+# Ús (després d'una importació massiva o des d'un cron):
+#     python stock_pipeline.py
+import os
+import threading
+import uuid
+
+import pandas as pd
+
+from jsonl_journal import append_entry, read_journal
+
+STOCK_LEDGER = os.environ.get(
+    "STOCK_LEDGER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "stock_ledger.jsonl")
+)
+_apply_lock = threading.Lock()
+
+
+class StockLedger:
+    """
+    Diari dels descomptes. Cada línia és un objecte JSON:
+      {"baseline": [línies]}                         línies anteriors al diari (no es descompten)
+      {"owed": [línies]}                             línies a descomptar abans de tenir línia base
+      {"intent": lot, "products": {producte: {"expected": n, "lines": [...]}}}
+      {"commit": lot, "products": [productes confirmats]}
+      {"resolved": lot, "products": {producte: true/false}}   resultat de la recuperació
+    """
+
+    def __init__(self, path=STOCK_LEDGER):
+        self.path = path
+        self.applied = set()    # Línies ja descomptades (o de la línia base)
+        self.open = {}          # {lot: {producte: {"expected": n, "lines": [...]}}} sense confirmar
+        self.owed = set()       # Línies que la línia base no pot incloure
+        self.has_baseline = False
+        self.lock = threading.Lock()
+        for entry in read_journal(path):
+            self._apply(entry)
+
+    def _apply(self, entry):
+        if "baseline" in entry:
+            self.applied.update(entry["baseline"])
+            self.has_baseline = True
+        elif "owed" in entry:
+            self.owed.update(entry["owed"])
+        elif "intent" in entry:
+            self.open[entry["intent"]] = entry["products"]
+        elif "commit" in entry or "resolved" in entry:
+            batch = entry.get("commit") or entry.get("resolved")
+            products = self.open.get(batch, {})
+            confirmed = entry["products"]
+            if "commit" in entry:
+                confirmed = {product: True for product in confirmed}
+            for product, applied in confirmed.items():
+                intent = products.pop(product, None)
+                if intent is not None and applied:
+                    self.applied.update(intent["lines"])
+            # Els productes no confirmats d'un commit queden oberts fins a la recuperació
+            if not products:
+                self.open.pop(batch, None)
+
+    def _append(self, entry):
+        append_entry(self.path, entry)
+        self._apply(entry)
+
+    def baseline(self, line_ids):
+        """Marca les línies com a ja comptades a l'estoc actual (primera execució)."""
+        with self.lock:
+            self._append({"baseline": sorted(set(line_ids) - self.applied)})
+
+    def owe(self, line_ids):
+        """Apunta línies que s'han de descomptar encara que encara no hi hagi línia base."""
+        with self.lock:
+            owed = sorted(set(line_ids) - self.applied - self.owed)
+            if owed:
+                self._append({"owed": owed})
+
+    def intend(self, products):
+        """Apunta un lot abans d'enviar-lo. Torna la clau del lot."""
+        batch = uuid.uuid4().hex[:12]
+        with self.lock:
+            self._append({"intent": batch, "products": products})
+        return batch
+
+    def commit(self, batch, products):
+        """Apunta els productes del lot que Airtable ha confirmat."""
+        with self.lock:
+            self._append({"commit": batch, "products": list(products)})
+
+    def resolve(self, batch, results):
+        """Tanca els productes oberts d'un lot: {producte: True si el descompte ja s'havia aplicat}."""
+        with self.lock:
+            self._append({"resolved": batch, "products": results})
+
+    def open_products(self):
+        """{producte: [(lot, intent)]} dels descomptes enviats sense confirmar."""
+        with self.lock:
+            pending = {}
+            for batch, products in self.open.items():
+                for product, intent in products.items():
+                    pending.setdefault(product, []).append((batch, intent))
+            return pending
+
+
+def line_decrements(lines):
+    """
+    Una fila per línia: record_id, product (record_id del primer producte vinculat), quantity.
+    lines ha de tenir record_id, ProductID (llista de record_id o record_id) i Quantity.
+    """
+    products = lines["ProductID"].reset_index(drop=True).explode()
+    products = products[~products.index.duplicated(keep="first")]
+    return pd.DataFrame({
+        "record_id": lines["record_id"].values,
+        "product": products.values,
+        "quantity": pd.to_numeric(lines["Quantity"], errors="coerce").fillna(0).values,
+    }).dropna(subset=["product"])
+
+
+def _current_stock():
+    """Stock actual per record_id de producte (sincronització incremental, sense memòria cau)."""
+    from airtable_config import inventari_url
+    from airtable_data import fetch_table
+
+    inventari, error = fetch_table(inventari_url, use_cache=False, fields=["Stock"])
+    if error:
+        raise RuntimeError(error)
+    # En float64: Stock arriba com a Int32 i els valors han de ser escalars Python (diari en JSON)
+    stock = pd.to_numeric(inventari["Stock"], errors="coerce").astype("float64").fillna(0)
+    return dict(zip(inventari["record_id"], stock))
+
+
+def recover(ledger, stock=None):
+    """
+    Resol els lots enviats sense confirmar comparant el Stock actual amb l'esperat.
+    Torna el nombre de productes on el descompte ja s'havia aplicat.
+    """
+    pending = ledger.open_products()
+    if not pending:
+        return 0
+    stock = stock if stock is not None else _current_stock()
+    results = {}
+    for product, intents in pending.items():
+        for batch, intent in intents:
+            results.setdefault(batch, {})[product] = stock.get(product) == intent["expected"]
+    for batch, products in results.items():
+        ledger.resolve(batch, products)
+    return sum(applied for products in results.values() for applied in products.values())
+
+
+def apply_stock_decrements(lines, ledger=None):
+    """
+    Descompta del Stock les quantitats de les línies que encara no consten al diari.
+    Torna un DataFrame per producte: product, lines, quantity, stock_before,
+    stock_after, updated (False si el PATCH ha fallat; es reintentarà).
+    """
+    from airtable_config import API_URL, BASE_ID, INVENTARI_TABLE
+    from airtable_data import update_airtable_records
+
+    ledger = ledger or get_stock_ledger()
+    # Un sol lot alhora per procés: dos lots amb les mateixes línies les descomptarien dos cops
+    with _apply_lock:
+        if not ledger.has_baseline:
+            # La línia base de sync_stock inclourà totes les línies existents: aquestes
+            # s'hi han d'excloure encara que el descompte falli més avall
+            ledger.owe(lines["record_id"])
+        stock = _current_stock()
+        recover(ledger, stock)
+
+        decrements = line_decrements(lines)
+        # Les línies de productes que no són a Inventari es queden pendents (un id
+        # desconegut faria fallar tot el lot de 10 a Airtable)
+        decrements = decrements[~decrements["record_id"].isin(ledger.applied) & decrements["product"].isin(stock)]
+        columns = ["product", "lines", "quantity", "stock_before", "stock_after", "updated"]
+        if decrements.empty:
+            return pd.DataFrame(columns=columns)
+
+        per_product = decrements.groupby("product").agg(lines=("record_id", list), quantity=("quantity", "sum"))
+        per_product["stock_before"] = per_product.index.map(stock)
+        per_product["stock_after"] = per_product["stock_before"] - per_product["quantity"]
+
+        batch = ledger.intend({
+            product: {"expected": float(row.stock_after), "lines": row.lines}
+            for product, row in per_product.iterrows()
+        })
+        inventari_base_url = f"{API_URL}/{BASE_ID}/{INVENTARI_TABLE}"
+        updates = [(product, {"Stock": int(after) if float(after).is_integer() else float(after)})
+                   for product, after in per_product["stock_after"].items()]
+        updated, failures = update_airtable_records(inventari_base_url, updates)
+        ledger.commit(batch, updated)
+
+    per_product["updated"] = per_product.index.isin(updated)
+    return per_product.rename_axis("product").reset_index()[columns]
+
+
+def sync_stock(ledger=None):
+    """
+    Llegeix totes les línies de Detall comanda i descompta les que encara no
+    consten al diari. La primera vegada només crea la línia base.
+    Torna el resultat d'apply_stock_decrements (buit si només s'ha creat la línia base).
+    """
+    from airtable_config import detall_url
+    from airtable_data import fetch_table
+
+    ledger = ledger or get_stock_ledger()
+    lines, error = fetch_table(detall_url, use_cache=False, fields=["ProductID", "Quantity"])
+    if error:
+        raise RuntimeError(error)
+    if not ledger.has_baseline:
+        # Les línies enviades sense confirmar es resolen amb recover(), i les que l'app
+        # no va poder descomptar es descompten ara: cap de les dues va a la línia base
+        sent = {line for intents in ledger.open_products().values() for _, intent in intents
+                for line in intent["lines"]}
+        ledger.baseline(set(lines["record_id"]) - sent - ledger.owed)
+    return apply_stock_decrements(lines, ledger)
+
+
+# Diari compartit per tot el procés
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_stock_ledger():
+    """Torna el diari de descomptes compartit (es crea la primera vegada)."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = StockLedger()
+        return _ledger
+
+
+if __name__ == "__main__":
+    import logging
+
+    # Fora de 'streamlit run', airtable_data avisa que no hi ha sessió
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    result = sync_stock()
+    print(f"{int(result['updated'].sum())} productes actualitzats, "
+          f"{int((~result['updated'].astype(bool)).sum())} pendents de reintentar.")
+    if not result.empty:
+        print(result.to_string(index=False))
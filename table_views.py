@@ -0,0 +1,77 @@
+# ------------------------------------------------------------------------
+# LLISTATS PAGINATS I SELECTORS AMB CERCADOR
+# ------------------------------------------------------------------------
+# Les taules ja són a memòria (sincronització incremental), el que creix amb
+# la taula és el que s'envia al navegador. Aquí només es dibuixa la pàgina
+# visible del llistat i les primeres coincidències de cada selector; la cerca
+# i la paginació es fan a Python, abans d'enviar res.
+import math
+
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZE = 50          # Files per pàgina dels llistats
+PICKER_LIMIT = 50       # Opcions que s'envien a cada selector (i increment de "Mostra'n més")
+
+
+def search_rows(df, text, columns):
+    """Files on alguna de les columnes conté 'text' (sense distingir majúscules)."""
+    if not text:
+        return df
+    mask = pd.Series(False, index=df.index)
+    for column in columns:
+        if column in df.columns:
+            mask |= df[column].astype(str).str.contains(text, case=False, regex=False, na=False)
+    return df[mask]
+
+
+def paged_dataframe(df, key, search_columns, page_size=PAGE_SIZE, resolve=None):
+    """
+    Mostra df per pàgines amb un cercador sobre search_columns.
+    resolve(page_df) s'aplica només a la pàgina visible (ex. resoldre camps
+    vinculats), així el cost no depèn de la mida de la taula.
+    Torna la pàgina mostrada.
+    """
+    text = st.text_input("Cerca:", key=f"{key}_search")
+    matches = search_rows(df, text, search_columns)
+    n_pages = max(1, math.ceil(len(matches) / page_size))
+
+    # Si la cerca ha reduït les pàgines, tornem a la primera
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = 1
+
+    col_page, col_info = st.columns([1, 3])
+    page = col_page.number_input("Pàgina:", min_value=1, max_value=n_pages, step=1, key=page_key)
+    col_info.write(f"{len(matches)} registres · pàgina {page} de {n_pages}")
+
+    page_df = matches.iloc[(page - 1) * page_size:page * page_size]
+    if resolve is not None and not page_df.empty:
+        page_df = resolve(page_df.copy())
+    st.dataframe(page_df)
+    return page_df
+
+
+def search_picker(label, values, key, limit=PICKER_LIMIT):
+    """
+    Selectbox amb cercador. Només s'envien les 'limit' primeres coincidències;
+    el botó "Mostra'n més" n'afegeix 'limit' més.
+    values és una llista o Series amb les opcions (en l'ordre a mostrar).
+    Torna l'opció triada o None si no n'hi ha cap.
+    """
+    text = st.text_input(f"Cerca {label}", key=f"{key}_search")
+    options = pd.Series(values, dtype=object).dropna()
+    if text:
+        options = options[options.astype(str).str.contains(text, case=False, regex=False)]
+
+    limit_key = f"{key}_limit"
+    shown = st.session_state.get(limit_key, limit)
+    choice = st.selectbox(label, options.iloc[:shown].tolist(), key=key)
+
+    if len(options) > shown:
+        col_info, col_more = st.columns([3, 1])
+        col_info.write(f"Es mostren {shown} de {len(options)} opcions. Escriu per filtrar-les.")
+        if col_more.button("Mostra'n més", key=f"{key}_more"):
+            st.session_state[limit_key] = shown + limit
+            st.rerun()
+    return choice
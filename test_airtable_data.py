@@ -0,0 +1,75 @@
+# ------------------------------------------------------------------------
+# PROVES: RESOLUCIÓ DE CAMPS VINCULATS (airtable_data.py)
+# ------------------------------------------------------------------------
+import datetime
+
+import pandas as pd
+import pytest
+
+import airtable_data
+import airtable_sync
+import snapshot_store
+from airtable_config import DETALL_TABLE, comanda_url, detall_url
+from airtable_data import fetch_table, get_lookup, lookup_cache, resolve_link_column, resolve_linked_fields
+from airtable_parser import parse_records
+from test_airtable_sync import FakeAirtable
+
+COMANDES = pd.DataFrame({"record_id": ["recC1", "recC2", "recC3", "recC1"], "OrderID": [1, 2, 3, 10]})
+
+
+@pytest.fixture(autouse=True)
+def empty_lookup_cache():
+    lookup_cache.clear()
+    yield
+    lookup_cache.clear()
+
+
+def lookup():
+    return get_lookup(comanda_url, COMANDES, "record_id", "OrderID")
+
+
+def test_lookup_keeps_the_last_repeated_key():
+    assert lookup().to_dict() == {"recC1": "10", "recC2": "2", "recC3": "3"}
+
+
+@pytest.mark.parametrize("column", [
+    # Llistes Python (com pd.DataFrame(records)) i list<string> d'Arrow (airtable_parser)
+    pd.Series([["recC2", "recC3"], [], None, ["recX"], ["recC2", None]], dtype=object),
+    parse_records([("recL1", {"Comanda": ["recC2", "recC3"]}), ("recL2", {"Comanda": []}), ("recL3", {}),
+                   ("recL4", {"Comanda": ["recX"]}), ("recL5", {"Comanda": ["recC2", None]})],
+                  DETALL_TABLE)["Comanda"],
+])
+def test_resolve_link_column(column):
+    assert list(resolve_link_column(column, lookup())) == ["2, 3", "", "Unknown", "Unknown", "2, Unknown"]
+
+
+def test_resolve_single_ids_and_keep_row_order():
+    column = pd.Series(["recC3", "recC2", None], index=[7, 3, 5])
+    assert list(resolve_link_column(column, lookup())) == ["3", "2", "Unknown"]
+
+
+def test_resolve_linked_fields_uses_the_given_table():
+    df = pd.DataFrame({"Comanda": [["recC1"], ["recC2"]], "Quantity": [1, 2]})
+    resolved = resolve_linked_fields(df, [("Comanda", comanda_url, "record_id", "OrderID", COMANDES),
+                                          ("NoHiEs", comanda_url, "record_id", "OrderID", COMANDES)])
+    assert resolved["Comanda"].tolist() == ["10", "2"] and resolved["Quantity"].tolist() == [1, 2]
+
+
+def test_cold_projection_is_seeded_from_the_local_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", str(tmp_path))
+    airtable_sync.reset_snapshots()
+    lines = {f"recL{i}": {"ProductID": [f"recP{i % 3}"], "Quantity": i, "Comanda": ["recC1"]} for i in range(50)}
+    snapshot_store.save_snapshot("detall", parse_records(lines.items(), DETALL_TABLE),
+                                 datetime.datetime.now(datetime.timezone.utc))
+    airtable = FakeAirtable(lines)
+    airtable.records["recL7"] = {"ProductID": ["recP2"], "Quantity": 70}
+    airtable.changed = {"recL7"}
+    monkeypatch.setattr(airtable_data, "client", airtable)
+
+    df, error = fetch_table(detall_url, use_cache=False, fields=["ProductID", "Quantity"])
+    airtable_sync.reset_snapshots()
+    assert error is None and len(df) == 50 and list(df.columns) == ["ProductID", "Quantity", "record_id"]
+    assert df.set_index("record_id").loc["recL7", "Quantity"] == 70
+    # Cap lectura completa: el delta i la llista d'IDs per reconciliar (un sol camp)
+    assert [c["fields[]"] for c in airtable.deltas()] == [["ProductID", "Quantity"]]
+    assert [c["fields[]"] for c in airtable.full_reads()] == [airtable_data.RECONCILE_FIELDS[DETALL_TABLE]]
@@ -0,0 +1,102 @@
+# ------------------------------------------------------------------------
+# PROVES: REINTENTS DEL CLIENT HTTP (airtable_http.py)
+# ------------------------------------------------------------------------
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+import airtable_http
+from airtable_http import AirtableClient
+
+URL = "http://airtable.test/v0/appX/tblX"
+
+
+class FakeResponse:
+    def __init__(self, status_code, records=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._records = records or []
+        self.content = b"{}"
+        self.text = "{}"
+
+    def json(self):
+        return {"records": self._records}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(airtable_http.time, "sleep", lambda s: None)
+    return AirtableClient({"Authorization": "Bearer test"}, rate=1000, max_retries=3)
+
+
+def script(client, monkeypatch, outcomes):
+    """Fa que session.request torni (o llanci) cada element d'outcomes per ordre; torna les crides."""
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        calls.append(method)
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(client.session, "request", fake_request)
+    return calls
+
+
+def refused():
+    return requests.ConnectionError(MaxRetryError(None, URL, NewConnectionError(None, "Connection refused")))
+
+
+def test_get_retries_read_timeout(client, monkeypatch):
+    calls = script(client, monkeypatch, [requests.ReadTimeout("lent"), FakeResponse(200)])
+    assert client.get(URL).status_code == 200
+    assert calls == ["GET", "GET"]
+
+
+def test_post_read_timeout_is_not_retried(client, monkeypatch):
+    calls = script(client, monkeypatch, [requests.ReadTimeout("lent"), FakeResponse(200)])
+    with pytest.raises(requests.ReadTimeout):
+        client.post(URL, json={})
+    assert calls == ["POST"]
+
+
+def test_post_dropped_connection_is_not_retried(client, monkeypatch):
+    calls = script(client, monkeypatch, [requests.ConnectionError("Connection aborted"), FakeResponse(200)])
+    with pytest.raises(requests.ConnectionError):
+        client.post(URL, json={})
+    assert calls == ["POST"]
+
+
+@pytest.mark.parametrize("error", [requests.ConnectTimeout("connect"), refused()])
+def test_post_retries_when_not_sent(client, monkeypatch, error):
+    calls = script(client, monkeypatch, [error, FakeResponse(200)])
+    assert client.post(URL, json={}).status_code == 200
+    assert calls == ["POST", "POST"]
+
+
+def test_post_5xx_is_not_retried_but_429_is(client, monkeypatch):
+    script(client, monkeypatch, [FakeResponse(503), FakeResponse(200)])
+    assert client.post(URL, json={}).status_code == 503
+    script(client, monkeypatch, [FakeResponse(429), FakeResponse(200)])
+    assert client.post(URL, json={}).status_code == 200
+
+
+def test_batch_create_reports_unanswered_batch(client, monkeypatch):
+    fields = [{"n": i} for i in range(12)]
+    script(client, monkeypatch, [requests.ReadTimeout("lent"),
+                                 FakeResponse(200, [{"id": "recA"}, {"id": "recB"}])])
+    ids, failures = client.batch_create(URL, fields)
+    assert ids == [None] * 10 + ["recA", "recB"]
+    assert [f["index"] for f in failures] == list(range(10))
+    assert all(f["status"] is None for f in failures)
+
+
+def test_batch_update_reports_unanswered_batch(client, monkeypatch):
+    updates = [(f"rec{i}", {"Stock": i}) for i in range(12)]
+    script(client, monkeypatch, [requests.ConnectionError("Connection aborted")] * 4 +
+           [FakeResponse(200, [{"id": "rec10"}, {"id": "rec11"}])])
+    updated, failures = client.batch_update(URL, updates)
+    assert updated == ["rec10", "rec11"]
+    assert [f["record_id"] for f in failures] == [f"rec{i}" for i in range(10)]
+    assert all(f["status"] is None for f in failures)
@@ -0,0 +1,88 @@
+# ------------------------------------------------------------------------
+# PROVES: DESCODIFICACIÓ DE REGISTRES (airtable_parser.py)
+# ------------------------------------------------------------------------
+import pandas as pd
+import pytest
+
+from airtable_config import COMANDA_TABLE, DETALL_TABLE, INVENTARI_TABLE
+from airtable_parser import parse_records
+
+
+def test_empty_records():
+    df = parse_records([], DETALL_TABLE)
+    assert df.empty and list(df.columns) == []
+
+
+def test_dicts_and_pairs_give_the_same_frame():
+    records = [{"id": "rec1", "fields": {"Quantity": 2}}, {"id": "rec2", "fields": {"Quantity": 5}}]
+    pairs = [(r["id"], r["fields"]) for r in records]
+    pd.testing.assert_frame_equal(parse_records(records, DETALL_TABLE), parse_records(pairs, DETALL_TABLE))
+
+
+def test_missing_fields_are_null_and_columns_keep_first_seen_order():
+    df = parse_records([("rec1", {"Quantity": 1}), ("rec2", {"ProductID": ["recP"]})], DETALL_TABLE)
+    assert list(df.columns) == ["Quantity", "ProductID", "record_id"]
+    assert pd.isna(df.loc[1, "Quantity"])
+    assert df["ProductID"].isna().tolist() == [True, False]
+
+
+def test_link_columns_are_arrow_lists():
+    df = parse_records([("rec1", {"ProductID": ["recA", "recB"]}), ("rec2", {"ProductID": "brut"}),
+                        ("rec3", {"ProductID": [12]})], DETALL_TABLE)
+    assert str(df["ProductID"].dtype) == "list<item: string>[pyarrow]"
+    assert list(df.loc[0, "ProductID"]) == ["recA", "recB"]
+    assert pd.isna(df.loc[1, "ProductID"])           # No és una llista: nul·la
+    assert list(df.loc[2, "ProductID"]) == ["12"]    # Elements no textuals: a text
+
+
+@pytest.mark.parametrize("values, dtype", [
+    ([1, 2, None], "Int32"),
+    ([1, 2**40], "Int64"),
+    ([1, 2.5], "float64"),
+    (["3", "x"], "Int32"),
+])
+def test_int_columns(values, dtype):
+    df = parse_records([(f"rec{i}", {"Stock": v}) for i, v in enumerate(values)], INVENTARI_TABLE)
+    assert str(df["Stock"].dtype) == dtype
+
+
+def test_int_coercions_keep_values():
+    df = parse_records([("rec1", {"Stock": "3"}), ("rec2", {"Stock": "x"}), ("rec3", {})], INVENTARI_TABLE)
+    assert df["Stock"].tolist()[0] == 3
+    assert df["Stock"].isna().tolist() == [False, True, True]
+
+
+def test_plain_dates():
+    df = parse_records([("rec1", {"Data": "2025-01-02"}), ("rec2", {"Data": None})], COMANDA_TABLE)
+    assert df["Data"].dtype.kind == "M"
+    assert df.loc[0, "Data"] == pd.Timestamp("2025-01-02")
+    assert pd.isna(df.loc[1, "Data"])
+
+
+def test_dates_mixing_naive_and_utc_values():
+    # Snapshot en Parquet ("%Y-%m-%d") barrejat amb registres delta d'un camp datetime ("…Z")
+    df = parse_records([("rec1", {"Data": "2025-01-02"}), ("rec2", {"Data": "2025-01-03T10:30:00.000Z"}),
+                        ("rec3", {"Data": "no és una data"})], COMANDA_TABLE)
+    assert df["Data"].dtype.kind == "M" and df["Data"].dt.tz is None
+    assert df["Data"].tolist()[:2] == [pd.Timestamp("2025-01-02"), pd.Timestamp("2025-01-03 10:30")]
+    assert pd.isna(df.loc[2, "Data"])
+
+
+def test_utc_dates_are_naive():
+    df = parse_records([("rec1", {"Data": "2025-01-03T23:30:00.000+02:00"})], COMANDA_TABLE)
+    assert df["Data"].dt.tz is None
+    assert df.loc[0, "Data"] == pd.Timestamp("2025-01-03 21:30")
+
+
+def test_lookups_become_arrow_lists_and_other_fields_stay():
+    df = parse_records([("rec1", {"Nom": ["A"], "Status": "Pending", "Preu": 1.5}),
+                        ("rec2", {"Nom": ["B", "C"], "Status": None, "Preu": 2})], COMANDA_TABLE)
+    assert "pyarrow" in str(df["Nom"].dtype)
+    assert df["Status"].tolist()[0] == "Pending" and pd.isna(df.loc[1, "Status"])
+    assert df["Preu"].tolist() == [1.5, 2.0]
+
+
+def test_unknown_table_keeps_values():
+    df = parse_records([("rec1", {"Quantity": 2, "Data": "2025-01-02"})])
+    assert df.loc[0, "Quantity"] == 2 and df.loc[0, "Data"] == "2025-01-02"
+    assert df["record_id"].tolist() == ["rec1"]
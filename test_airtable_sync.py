@@ -0,0 +1,160 @@
+# ------------------------------------------------------------------------
+# PROVES: SINCRONITZACIÓ INCREMENTAL (airtable_sync.py)
+# ------------------------------------------------------------------------
+import datetime
+
+import pandas as pd
+import pytest
+
+import airtable_sync
+from airtable_config import COMANDA_TABLE, comanda_url
+from airtable_parser import parse_records
+from airtable_sync import AirtableSyncError, seed_snapshot, sync_table
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self._payload
+
+
+class FakeAirtable:
+    """Taula en memòria: les lectures amb filterByFormula tornen només 'changed'."""
+
+    def __init__(self, records, page_size=2):
+        self.records = dict(records)    # {recXXX: fields}
+        self.changed = set()
+        self.order = None               # Ordre de la vista; per defecte, per record_id
+        self.page_size = page_size
+        self.calls = []
+        self.fail = False
+
+    def get(self, url, params=None):
+        params = dict(params or {})
+        self.calls.append(params)
+        if self.fail:
+            return FakeResponse(503, {"error": "caiguda"})
+        wanted = self.changed if "filterByFormula" in params else self.records
+        ids = [i for i in self.order or sorted(self.records) if i in wanted]
+        start = int(params.get("offset", 0))
+        page = ids[start:start + self.page_size]
+        payload = {"records": [{"id": i, "fields": self.records[i]} for i in page]}
+        if start + self.page_size < len(ids):
+            payload["offset"] = str(start + self.page_size)
+        return FakeResponse(200, payload)
+
+    def deltas(self):
+        return [c for c in self.calls if "filterByFormula" in c and "offset" not in c]
+
+    def full_reads(self):
+        return [c for c in self.calls if "filterByFormula" not in c and "offset" not in c]
+
+
+@pytest.fixture(autouse=True)
+def fresh_snapshots():
+    airtable_sync.reset_snapshots()
+    yield
+    airtable_sync.reset_snapshots()
+
+
+def ids(df):
+    return sorted(df["record_id"])
+
+
+def test_first_sync_reads_every_page_then_only_deltas():
+    airtable = FakeAirtable({f"rec{i}": {"OrderID": i} for i in range(5)})
+    assert ids(sync_table(comanda_url, airtable)) == [f"rec{i}" for i in range(5)]
+
+    airtable.records["rec1"] = {"OrderID": 100}
+    airtable.records["rec9"] = {"OrderID": 9}
+    airtable.changed = {"rec1", "rec9"}
+    df = sync_table(comanda_url, airtable)
+    assert len(airtable.full_reads()) == 1 and len(airtable.deltas()) == 1
+    assert df.set_index("record_id").loc["rec1", "OrderID"] == 100
+    assert "rec9" in set(df["record_id"])
+
+
+def test_delta_overlaps_the_last_sync():
+    airtable = FakeAirtable({"rec1": {}})
+    sync_table(comanda_url, airtable)
+    last_sync = airtable_sync.get_snapshot(comanda_url).last_sync
+    sync_table(comanda_url, airtable)
+    since = last_sync - datetime.timedelta(seconds=airtable_sync.SYNC_OVERLAP)
+    assert airtable.deltas()[0]["filterByFormula"] == airtable_sync.delta_formula(since)
+
+
+def test_deletions_are_reconciled_only_when_due(monkeypatch):
+    airtable = FakeAirtable({"rec1": {}, "rec2": {}})
+    sync_table(comanda_url, airtable)
+    del airtable.records["rec2"]
+    assert ids(sync_table(comanda_url, airtable)) == ["rec1", "rec2"]   # Encara no toca
+    assert ids(sync_table(comanda_url, airtable, reconcile=True)) == ["rec1"]
+
+    del airtable.records["rec1"]
+    monkeypatch.setattr(airtable_sync, "RECONCILE_INTERVAL", 0)
+    assert sync_table(comanda_url, airtable).empty
+
+
+def test_seeded_snapshot_reconciles_on_first_sync():
+    # Snapshot en Parquet de fa dies: rec2 s'ha esborrat des de llavors
+    synced_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=3)
+    assert seed_snapshot(comanda_url, parse_records([("rec1", {}), ("rec2", {})]), synced_at)
+    airtable = FakeAirtable({"rec1": {}})
+    assert ids(sync_table(comanda_url, airtable)) == ["rec1"]
+    assert len(airtable.deltas()) == 1 and len(airtable.full_reads()) == 1
+
+
+def test_seed_does_not_replace_a_synced_snapshot():
+    sync_table(comanda_url, FakeAirtable({"rec1": {}}))
+    assert not seed_snapshot(comanda_url, parse_records([("rec2", {})]), datetime.datetime.now(datetime.timezone.utc))
+
+
+def test_failed_delta_leaves_the_snapshot_untouched():
+    airtable = FakeAirtable({"rec1": {"OrderID": 1}})
+    sync_table(comanda_url, airtable)
+    snapshot = airtable_sync.get_snapshot(comanda_url)
+    last_sync = snapshot.last_sync
+    airtable.fail = True
+    with pytest.raises(AirtableSyncError):
+        sync_table(comanda_url, airtable)
+    assert snapshot.last_sync == last_sync
+    assert snapshot.to_dataframe().to_dict("records") == [{"OrderID": 1, "record_id": "rec1"}]
+
+
+def test_delta_is_merged_in_place_with_types():
+    airtable = FakeAirtable({f"rec{i}": {"OrderID": i} for i in range(3)})
+    sync_table(comanda_url, airtable)
+    airtable.records["rec1"] = {"OrderID": 100, "Data": "2025-02-01"}
+    airtable.records["rec3"] = {"OrderID": 3}
+    airtable.changed = {"rec1", "rec3"}
+    df = sync_table(comanda_url, airtable)
+    # Els modificats es queden on eren; els nous, al final
+    assert df["record_id"].tolist() == ["rec0", "rec1", "rec2", "rec3"]
+    assert df["OrderID"].tolist() == [0, 100, 2, 3] and str(df["OrderID"].dtype) == "Int32"
+    assert df["Data"].isna().tolist() == [True, False, True, True]
+    pd.testing.assert_frame_equal(df, parse_records(sorted(airtable.records.items()), COMANDA_TABLE),
+                                  check_like=True)
+
+
+def test_view_keeps_its_sort_order_after_a_delta():
+    view_url = f"{comanda_url}?view=Per%20data"
+    airtable = FakeAirtable({"rec1": {"OrderID": 1}, "rec2": {"OrderID": 2}, "rec3": {"OrderID": 3}})
+    airtable.order = ["rec1", "rec2", "rec3"]
+    sync_table(view_url, airtable, id_field="OrderID")
+
+    # rec1 canvia de data i passa al final; rec4 és nou i va al principi
+    airtable.records["rec1"] = {"OrderID": 1, "Data": "2025-03-01"}
+    airtable.records["rec4"] = {"OrderID": 4}
+    airtable.order = ["rec4", "rec2", "rec3", "rec1"]
+    airtable.changed = {"rec1", "rec4"}
+    assert sync_table(view_url, airtable, id_field="OrderID")["record_id"].tolist() == ["rec4", "rec2", "rec3", "rec1"]
+    assert [c.get("fields[]") for c in airtable.full_reads()] == [None, "OrderID"]
+
+    # Un delta sense canvis no torna a llegir els IDs
+    airtable.changed = set()
+    sync_table(view_url, airtable, id_field="OrderID")
+    assert len(airtable.full_reads()) == 2
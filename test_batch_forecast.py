@@ -0,0 +1,64 @@
+# ------------------------------------------------------------------------
+# PROVES: DEMANDA DIÀRIA DE LA PREDICCIÓ EN LOT (batch_forecast.py)
+# ------------------------------------------------------------------------
+import pandas as pd
+
+from airtable_config import DETALL_TABLE
+from airtable_parser import parse_records
+from batch_forecast import daily_demand, forecast_all_products, product_histories, run_in_pool
+from demand_cube import DemandCube
+
+DETALL = parse_records([
+    ("recL1", {"ProductID": ["recP1"], "Data": "2025-01-02", "Quantity": 2}),
+    ("recL2", {"ProductID": ["recP1"], "Data": "2025-01-02", "Quantity": 3}),
+    ("recL3", {"ProductID": ["recP2", "recP1"], "Data": "2025-01-03", "Quantity": 1}),
+    ("recL4", {"ProductID": ["recP2"], "Quantity": 7}),     # Sense data: no compta
+    ("recL5", {"Data": "2025-01-04", "Quantity": 4}),        # Sense producte: no compta
+], DETALL_TABLE)
+
+
+def test_daily_demand_resolves_linked_products():
+    demand = daily_demand(DETALL)
+    assert demand.to_dict("records") == [
+        {"ProductID": "recP1", "ds": pd.Timestamp("2025-01-02"), "y": 5},
+        {"ProductID": "recP2", "ds": pd.Timestamp("2025-01-03"), "y": 1},
+    ]
+
+
+def test_daily_demand_matches_the_cube():
+    names = {"recP1": "PROD001"}
+    cube = DemandCube()
+    cube.update(DETALL)
+    pd.testing.assert_frame_equal(daily_demand(DETALL, names), cube.to_frame(names), check_dtype=False)
+
+
+def test_forecast_all_products_takes_df_detall_alone():
+    # Cap producte amb dades: no hi ha res a ajustar, però tampoc cap KeyError
+    forecasts, timings = forecast_all_products(DETALL.iloc[3:], "2025-02-01", max_workers=1)
+    assert forecasts.empty and timings.empty
+
+
+def test_product_histories_are_sorted_training_frames():
+    demand = pd.DataFrame({"ProductID": ["P2", "P1", "P1"], "y": [1, 2, 3],
+                           "ds": pd.to_datetime(["2025-01-01", "2025-01-03", "2025-01-02"])})
+    histories = product_histories(demand)
+    assert list(histories) == ["P1", "P2"]
+    assert histories["P1"].to_dict("list") == {"ds": list(pd.to_datetime(["2025-01-02", "2025-01-03"])),
+                                               "y": [3, 2]}
+    assert histories["P1"].index.tolist() == [0, 1]
+
+
+def square(n):
+    if n < 0:
+        raise ValueError("negatiu")
+    return n * n
+
+
+def test_run_in_pool_reports_each_task_and_worker_errors(tmp_path):
+    calls = []
+    results = run_in_pool(square, {"a": (2,), "b": (-1,), "c": (3,)}, 3, "square",
+                          timing=lambda result: (0.0, result), registry_root=str(tmp_path),
+                          progress=lambda done, total, key, seconds: calls.append((done, total)),
+                          max_workers=1)
+    assert sorted(results) == [("a", 4, None), ("b", None, "negatiu"), ("c", 9, None)]
+    assert calls == [(1, 3), (2, 3), (3, 3)]
@@ -0,0 +1,25 @@
+# ------------------------------------------------------------------------
+# PROVES: EXPORTACIÓ DE TAULES (bulk_io.py)
+# ------------------------------------------------------------------------
+import io
+import json
+
+import pytest
+
+from bulk_io import export_table
+from test_airtable_sync import FakeAirtable
+
+
+def test_export_writes_one_row_per_record():
+    out = io.StringIO()
+    client = FakeAirtable({"rec1": {"CustomerID": "C1", "Name": "Anna"}, "rec2": {"CustomerID": "C2"}})
+    assert export_table("client", out, fmt="jsonl", client=client) == 2
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [row["CustomerID"] for row in rows] == ["C1", "C2"] and rows[1]["Name"] is None
+
+
+def test_failed_read_is_a_runtime_error(tmp_path):
+    client = FakeAirtable({f"rec{i}": {"CustomerID": f"C{i}"} for i in range(5)})
+    client.fail = True
+    with pytest.raises(RuntimeError, match="HTTP 503"):
+        export_table("client", str(tmp_path / "clients.csv"), client=client)
@@ -0,0 +1,93 @@
+# ------------------------------------------------------------------------
+# PROVES: CÀRREGA MASSIVA REPRENIBLE (bulk_seed.py)
+# ------------------------------------------------------------------------
+import threading
+
+import pytest
+
+from bulk_seed import SeedJournal, bulk_create
+
+URL = "http://airtable.test/v0/appX/tblX"
+
+
+class FakeClient:
+    """batch_create que crea recN per cada registre; pot fallar o aturar-se després de n lots."""
+
+    def __init__(self, stop_after=None, reject=()):
+        self.created = []
+        self.stop_after = stop_after
+        self.reject = set(reject)   # Valors de "n" dels lots que Airtable rebutja
+        self.batches = 0
+        self.lock = threading.Lock()
+
+    def batch_create(self, url, fields_list):
+        with self.lock:
+            if self.stop_after is not None and self.batches >= self.stop_after:
+                raise KeyboardInterrupt
+            self.batches += 1
+            if any(f["n"] in self.reject for f in fields_list):
+                return [None] * len(fields_list), [{"index": i, "fields": f, "status": 422, "error": "rebutjat"}
+                                                   for i, f in enumerate(fields_list)]
+            ids = []
+            for f in fields_list:
+                self.created.append(f["n"])
+                ids.append(f"rec{f['n']}")
+            return ids, []
+
+
+FIELDS = [{"n": i} for i in range(35)]
+
+
+def test_creates_everything_in_batches(tmp_path):
+    client = FakeClient()
+    ids, failures = bulk_create(client, URL, FIELDS, SeedJournal(str(tmp_path / "j.jsonl")), "clients", workers=3)
+    assert ids == [f"rec{i}" for i in range(35)] and failures == []
+    assert client.batches == 4
+
+
+def test_resume_only_creates_what_is_missing(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    first = FakeClient(stop_after=2)
+    with pytest.raises(KeyboardInterrupt):
+        bulk_create(first, URL, FIELDS, SeedJournal(path), "clients", workers=1)
+
+    journal = SeedJournal(path)
+    assert journal.resumed and len(journal.done("clients")) == 20
+    second = FakeClient()
+    ids, failures = bulk_create(second, URL, FIELDS, journal, "clients", workers=2)
+    assert ids == [f"rec{i}" for i in range(35)] and failures == []
+    assert sorted(first.created + second.created) == list(range(35))
+
+
+def test_failures_keep_their_original_index(tmp_path):
+    journal = SeedJournal(str(tmp_path / "j.jsonl"))
+    journal.record("clients", {i: f"rec{i}" for i in range(10)})
+    ids, failures = bulk_create(FakeClient(reject={25}), URL, FIELDS, journal, "clients", workers=2)
+    assert [f["index"] for f in failures] == list(range(20, 30))
+    assert ids[20:30] == [None] * 10 and ids[30] == "rec30"
+
+
+def test_remember_fixes_values_across_runs(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    assert SeedJournal(path).remember("seed", lambda: 42) == 42
+    assert SeedJournal(path).remember("seed", lambda: 7) == 42
+
+
+def test_torn_last_line_is_ignored_and_closed(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    SeedJournal(path).record("clients", {0: "rec0"})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"step": "clients", "ids": {"1"')    # El procés es va aturar escrivint
+    journal = SeedJournal(path)
+    assert journal.done("clients") == {0: "rec0"}
+    journal.record("clients", {2: "rec2"})
+    assert SeedJournal(path).done("clients") == {0: "rec0", 2: "rec2"}
+
+
+def test_finish_keeps_the_journal_aside(tmp_path):
+    path = tmp_path / "j.jsonl"
+    journal = SeedJournal(str(path))
+    journal.record("clients", {0: "rec0"})
+    journal.finish()
+    assert not path.exists() and (tmp_path / "j.jsonl.done").exists()
+    assert not SeedJournal(str(path)).resumed
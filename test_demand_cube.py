@@ -0,0 +1,136 @@
+# ------------------------------------------------------------------------
+# PROVES: CUB DE DEMANDA INCREMENTAL (demand_cube.py)
+# ------------------------------------------------------------------------
+import pandas as pd
+import pytest
+
+import airtable_sync
+import demand_cube
+from airtable_config import DETALL_TABLE, detall_url
+from airtable_parser import parse_records
+from airtable_sync import get_snapshot, sync_table
+from demand_cube import DEMAND_FIELDS, DemandCube, detall_lines
+from test_airtable_sync import FakeAirtable
+
+
+def detall(lines):
+    """lines: {recL: (producte, data, quantitat)} -> df_detall com el de fetch_table."""
+    return parse_records([(rec_id, {"ProductID": [p] if p else None, "Data": d, "Quantity": q})
+                          for rec_id, (p, d, q) in lines.items()], DETALL_TABLE)
+
+
+def full_rebuild(df):
+    cube = DemandCube()
+    cube.update(df)
+    return cube.to_frame()
+
+
+def check_matches_rebuild(cube, df):
+    pd.testing.assert_frame_equal(cube.to_frame(), full_rebuild(df), check_dtype=False)
+
+
+BASE = {
+    "recL1": ("recP1", "2025-01-02", 2),
+    "recL2": ("recP1", "2025-01-02", 3),
+    "recL3": ("recP2", "2025-01-03", 1),
+}
+
+
+def test_detall_lines_takes_the_first_linked_product():
+    df = parse_records([("recL1", {"ProductID": ["recP2", "recP1"], "Data": "2025-01-02T10:00:00.000Z",
+                                   "Quantity": "x"})], DETALL_TABLE)
+    lines = detall_lines(df)
+    assert lines.loc["recL1"].tolist() == ["recP2", pd.Timestamp("2025-01-02"), 0]
+
+
+def test_first_update_aggregates_per_product_and_day():
+    cube = DemandCube()
+    assert cube.update(detall(BASE)) == 3
+    assert cube.to_frame().to_dict("records") == [
+        {"ProductID": "recP1", "ds": pd.Timestamp("2025-01-02"), "y": 5},
+        {"ProductID": "recP2", "ds": pd.Timestamp("2025-01-03"), "y": 1},
+    ]
+
+
+def test_unchanged_read_is_a_no_op():
+    cube = DemandCube()
+    cube.update(detall(BASE))
+    assert cube.update(detall(BASE)) == 0
+
+
+def test_added_modified_and_deleted_lines():
+    cube = DemandCube()
+    cube.update(detall(BASE))
+    lines = dict(BASE)
+    lines["recL4"] = ("recP2", "2025-01-04", 4)          # Nova
+    lines["recL1"] = ("recP1", "2025-01-02", 10)         # Quantitat canviada
+    lines["recL3"] = ("recP1", "2025-01-05", 1)          # Canvi de producte i de dia
+    del lines["recL2"]                                    # Esborrada
+    assert cube.update(detall(lines)) == 4
+    check_matches_rebuild(cube, detall(lines))
+    # La cel·la (recP2, 2025-01-03) es queda sense línies: desapareix
+    assert (cube.to_frame()["ds"] == pd.Timestamp("2025-01-03")).sum() == 0
+
+
+def test_lines_without_product_or_date_do_not_count_until_completed():
+    cube = DemandCube()
+    lines = dict(BASE, recL4=(None, "2025-01-04", 4), recL5=("recP2", None, 7))
+    cube.update(detall(lines))
+    check_matches_rebuild(cube, detall(BASE))
+    lines["recL4"] = ("recP2", "2025-01-04", 4)
+    cube.update(detall(lines))
+    check_matches_rebuild(cube, detall(lines))
+
+
+def test_emptied_table_clears_the_cube():
+    cube = DemandCube()
+    cube.update(detall(BASE))
+    assert cube.update(pd.DataFrame()) == 3
+    assert cube.to_frame().empty
+
+
+def test_product_names():
+    cube = DemandCube()
+    cube.update(detall(BASE))
+    assert cube.to_frame({"recP1": "PROD001"})["ProductID"].tolist() == ["PROD001", "recP2"]
+
+
+@pytest.fixture
+def detall_sync():
+    """Detall comanda a Airtable + funció que en sincronitza la projecció del cub."""
+    airtable_sync.reset_snapshots()
+    airtable = FakeAirtable({rec_id: {"ProductID": [p], "Data": d, "Quantity": q}
+                             for rec_id, (p, d, q) in BASE.items()})
+    yield airtable, lambda **kwargs: sync_table(detall_url, airtable, fields=DEMAND_FIELDS, **kwargs)
+    airtable_sync.reset_snapshots()
+
+
+def test_sync_applies_only_the_delta_lines(detall_sync, monkeypatch):
+    airtable, sync = detall_sync
+    cube = DemandCube()
+    sync()
+    snapshot = get_snapshot(detall_url, DEMAND_FIELDS)
+    assert cube.sync(snapshot) == 3
+
+    parsed = []
+    monkeypatch.setattr(demand_cube, "detall_lines", lambda df: parsed.append(len(df)) or detall_lines(df))
+    airtable.records["recL1"] = {"ProductID": ["recP1"], "Data": "2025-01-02", "Quantity": 10}
+    airtable.records["recL4"] = {"ProductID": ["recP2"], "Data": "2025-01-04", "Quantity": 4}
+    airtable.changed = {"recL1", "recL4"}
+    del airtable.records["recL3"]
+    df = sync(reconcile=True)
+    assert cube.sync(snapshot) == 3 and parsed == [2]      # Només les dues línies del delta
+    check_matches_rebuild(cube, df)
+    assert cube.sync(snapshot) == 0                         # Res de nou des de l'última crida
+
+
+def test_sync_after_a_full_reload_compares_everything(detall_sync):
+    airtable, sync = detall_sync
+    cube = DemandCube()
+    sync()
+    cube.sync(get_snapshot(detall_url, DEMAND_FIELDS))
+    airtable_sync.reset_snapshots()                         # Un snapshot nou (lectura completa)
+    airtable.records["recL2"]["Quantity"] = 1
+    df = sync()
+    assert cube.sync(get_snapshot(detall_url, DEMAND_FIELDS)) == 1
+    check_matches_rebuild(cube, df)
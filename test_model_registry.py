@@ -0,0 +1,110 @@
+# ------------------------------------------------------------------------
+# PROVES: NETEJA I CAPACITAT DEL REGISTRE DE MODELS (model_registry.py)
+# ------------------------------------------------------------------------
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import model_registry
+from model_registry import ModelRegistry, registry_run
+
+CUTOFF = "2025-01-01"
+
+
+@pytest.fixture(autouse=True)
+def fake_serialize(monkeypatch):
+    # Els models són text: no cal ajustar Prophet per provar el registre
+    import prophet.serialize
+    monkeypatch.setattr(prophet.serialize, "model_to_json", lambda model: model)
+    monkeypatch.setattr(prophet.serialize, "model_from_json", lambda text: text)
+
+
+def train(n):
+    return pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=n), "y": range(n)})
+
+
+def models_on_disk(root):
+    return sorted(name for name in os.listdir(root) if name.endswith(".json"))
+
+
+def age(root, seconds):
+    """Fa que tots els models semblin usats fa 'seconds' segons."""
+    then = time.time() - seconds
+    for name in models_on_disk(root):
+        os.utime(os.path.join(root, name), (then, then))
+
+
+def test_get_or_fit_reuses_the_saved_model(tmp_path):
+    registry = ModelRegistry(root=tmp_path)
+    fits = []
+    fit = lambda df: fits.append(len(df)) or f"model{len(df)}"
+    assert registry.get_or_fit("P1", CUTOFF, train(5), fit) == ("model5", False)
+    assert ModelRegistry(root=tmp_path).get_or_fit("P1", CUTOFF, train(5), fit) == ("model5", True)
+    assert fits == [5]
+
+
+def test_evicts_least_recently_used_over_capacity(tmp_path):
+    registry = ModelRegistry(root=tmp_path, max_models=2, auto_evict=False)
+    for n in (2, 3, 4):
+        registry.save("P1", CUTOFF, train(n), f"model{n}")
+        age(tmp_path, 100 - n)      # El més nou, l'últim desat
+    registry.load("P1", CUTOFF, train(2))   # Usat ara: passa a ser el més recent
+    assert registry.evict() == 1
+    assert registry.load("P1", CUTOFF, train(3)) is None
+    assert len(models_on_disk(tmp_path)) == 2
+
+
+def test_evicts_by_age(tmp_path):
+    registry = ModelRegistry(root=tmp_path, max_age_days=1, auto_evict=False)
+    registry.save("P1", CUTOFF, train(2), "model")
+    age(tmp_path, 2 * 86400)
+    assert registry.evict() == 1 and models_on_disk(tmp_path) == []
+
+
+def test_save_evicts_at_most_once_per_interval(tmp_path, monkeypatch):
+    registry = ModelRegistry(root=tmp_path, max_models=1)
+    listings = []
+    listdir = os.listdir
+    monkeypatch.setattr(model_registry.os, "listdir", lambda root: listings.append(root) or listdir(root))
+    for n in (2, 3, 4):
+        registry.save("P1", CUTOFF, train(n), f"model{n}")
+    assert len(listings) == 1
+
+
+def test_reservation_lasts_only_while_the_run_does(tmp_path):
+    with registry_run(tmp_path, 5, max_models=2):
+        assert ModelRegistry(root=tmp_path, max_models=2).capacity() == 5
+        with registry_run(tmp_path, 3, max_models=2):
+            assert ModelRegistry(root=tmp_path, max_models=2).capacity() == 8
+    assert ModelRegistry(root=tmp_path, max_models=2).capacity() == 2
+    assert os.listdir(tmp_path) == []         # Res desat al registre
+
+
+def test_run_keeps_every_model_it_touched(tmp_path):
+    registry = ModelRegistry(root=tmp_path, max_models=2, auto_evict=False)
+    registry.save("OLD", CUTOFF, train(2), "old")
+    age(tmp_path, 3600)
+    with registry_run(tmp_path, 3, max_models=2):
+        # Els processos fills desen sense netejar
+        worker = ModelRegistry(root=tmp_path, max_models=2, auto_evict=False)
+        for product in ("P1", "P2", "P3"):
+            worker.save(product, CUTOFF, train(3), product)
+    assert [name.split("__")[0] for name in models_on_disk(tmp_path)] == ["P1", "P2", "P3"]
+    # Després de l'execució, la capacitat torna a max_models
+    ModelRegistry(root=tmp_path, max_models=2).save("P4", CUTOFF, train(3), "P4")
+    assert len(models_on_disk(tmp_path)) == 2
+
+
+def test_failed_run_releases_and_evicts(tmp_path):
+    registry = ModelRegistry(root=tmp_path, max_models=1, auto_evict=False)
+    for n in (2, 3):
+        registry.save("OLD", CUTOFF, train(n), f"old{n}")
+    age(tmp_path, 3600)
+    with pytest.raises(RuntimeError):
+        with registry_run(tmp_path, 4, max_models=1):
+            ModelRegistry(root=tmp_path, max_models=1, auto_evict=False).save("P1", CUTOFF, train(3), "P1")
+            raise RuntimeError("procés fill caigut")
+    assert ModelRegistry(root=tmp_path, max_models=1).capacity() == 1
+    assert [name.split("__")[0] for name in models_on_disk(tmp_path)] == ["P1"]
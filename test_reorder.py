@@ -0,0 +1,61 @@
+# ------------------------------------------------------------------------
+# PROVES: TRIA DE LA PREDICCIÓ I PLA DE REPOSICIÓ (reorder.py)
+# ------------------------------------------------------------------------
+import os
+
+import pandas as pd
+
+from reorder import forecast_files, history_rate, latest_forecast, reorder_plan
+
+
+def write_forecast(directory, cutoff, days, yhat=1.0):
+    path = os.path.join(directory, f"forecast_{cutoff}.csv")
+    pd.DataFrame({"ProductID": "PROD001", "ds": pd.date_range(cutoff, periods=days), "yhat": yhat,
+                  "yhat_lower": 0.0, "yhat_upper": 2.0}).to_csv(path, index=False)
+    return path
+
+
+def test_files_are_ordered_by_cutoff_not_mtime(tmp_path):
+    newer = write_forecast(tmp_path, "2025-03-01", 31)
+    older = write_forecast(tmp_path, "2025-01-01", 31)     # Escrit després: mtime més nou
+    (tmp_path / "forecast_brut.csv").write_text("x")
+    assert forecast_files(tmp_path) == [(pd.Timestamp("2025-03-01"), newer), (pd.Timestamp("2025-01-01"), older)]
+
+
+def test_picks_the_newest_forecast_covering_the_window(tmp_path):
+    write_forecast(tmp_path, "2025-01-01", 31, yhat=1.0)
+    write_forecast(tmp_path, "2025-01-10", 31, yhat=2.0)
+    write_forecast(tmp_path, "2025-02-01", 31, yhat=3.0)    # Data de tall futura
+    forecasts, cutoff = latest_forecast(tmp_path, today="2025-01-15", lead_time_days=7)
+    assert cutoff == pd.Timestamp("2025-01-10")
+    assert forecasts["ds"].min() == pd.Timestamp("2025-01-15")
+    assert (forecasts["yhat"] == 2.0).all()
+
+
+def test_expired_forecast_is_rejected(tmp_path):
+    write_forecast(tmp_path, "2025-01-01", 31)
+    assert latest_forecast(tmp_path, today="2025-01-28", lead_time_days=7) == (None, None)
+    assert latest_forecast(tmp_path, today="2025-01-25", lead_time_days=7)[1] == pd.Timestamp("2025-01-01")
+
+
+def test_expired_forecast_falls_back_to_history(tmp_path):
+    write_forecast(tmp_path, "2025-01-01", 31, yhat=50.0)
+    forecasts, _ = latest_forecast(tmp_path, today="2025-06-01", lead_time_days=7)
+    inventari = pd.DataFrame({"record_id": ["recP1"], "ProductID": ["PROD001"], "Stock": [10], "ReorderLevel": [2]})
+    demand = pd.DataFrame({"ProductID": "PROD001", "ds": pd.date_range("2025-03-03", periods=90), "y": 1.0})
+    plan = reorder_plan(inventari, forecasts, demand, lead_time_days=7, review_days=7)
+    assert plan.loc[0, "demand_source"] == "històric"
+    assert plan.loc[0, "daily_demand"] == 1.0
+    assert plan.loc[0, "reorder_point"] == 9 and plan.loc[0, "Reposition"] == 0
+
+
+def test_history_window_ends_at_each_product_last_sale():
+    demand = pd.concat([
+        pd.DataFrame({"ProductID": "P1", "ds": pd.date_range("2024-12-01", "2025-03-31"), "y": 1}),
+        pd.DataFrame({"ProductID": "P2", "ds": pd.date_range("2024-11-01", "2025-01-31"), "y": 2}),   # Aturat
+        pd.DataFrame({"ProductID": "P3", "ds": pd.date_range("2025-03-22", "2025-03-31"), "y": 3}),   # Nou
+    ])
+    assert history_rate(demand, 90).to_dict() == {"P1": 1.0, "P2": 2.0, "P3": 3.0}
+    # Amb una data de tall comuna, el producte aturat no té vendes a la finestra
+    rate = history_rate(demand, 30, until="2025-03-31")
+    assert rate["P1"] == 1.0 and rate["P3"] == 3.0 and pd.isna(rate.get("P2"))
@@ -0,0 +1,56 @@
+# ------------------------------------------------------------------------
+# PROVES: SNAPSHOTS EN PARQUET (snapshot_store.py)
+# ------------------------------------------------------------------------
+import datetime
+
+import pandas as pd
+import pytest
+
+import airtable_sync
+import snapshot_store
+from airtable_config import DETALL_TABLE, detall_url
+from airtable_parser import parse_records
+from airtable_sync import sync_table
+from snapshot_store import load_snapshot, save_snapshot, seed_sync_snapshot
+from test_airtable_sync import FakeAirtable
+
+REFRESHED_AT = datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc)
+RECORDS = [
+    ("recL1", {"ProductID": ["recP1"], "Quantity": 2, "Data": "2025-01-02", "Notes": "urgent"}),
+    ("recL2", {"ProductID": ["recP2", "recP1"], "Quantity": 5, "Data": "2025-01-03T10:00:00.000Z"}),
+    ("recL3", {"Quantity": 1}),
+]
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", str(tmp_path))
+    airtable_sync.reset_snapshots()
+    save_snapshot("detall", parse_records(RECORDS, DETALL_TABLE), REFRESHED_AT)
+    yield
+    airtable_sync.reset_snapshots()
+
+
+def test_load_gives_the_same_typed_frame_as_the_parser():
+    df, refreshed_at = load_snapshot("detall")
+    assert refreshed_at == REFRESHED_AT
+    pd.testing.assert_frame_equal(df, parse_records(RECORDS, DETALL_TABLE))
+
+
+def test_load_only_the_requested_columns():
+    df, _ = load_snapshot("detall", ["Quantity"])
+    assert list(df.columns) == ["Quantity", "record_id"]
+    # Un camp que el fitxer no té quedaria buit als registres sense canvis: no se sembra
+    assert load_snapshot("detall", ["Quantity", "CampNou"]) == (None, None)
+
+
+def test_view_is_seeded_and_reconciled_to_the_view():
+    view_url = f"{detall_url}?view=Pendents"
+    assert seed_sync_snapshot(view_url, ["Quantity"])
+    assert not seed_sync_snapshot(view_url, ["Quantity"])   # Ja té dades
+    # La vista només té recL3 i recL1, en aquest ordre; cap canvi des del fitxer
+    airtable = FakeAirtable({"recL3": {"Quantity": 1}, "recL1": {"Quantity": 2}})
+    airtable.order = ["recL3", "recL1"]
+    df = sync_table(view_url, airtable, id_field="Quantity", fields=["Quantity"])
+    assert df["record_id"].tolist() == ["recL3", "recL1"]
+    assert len(airtable.full_reads()) == 1 and airtable.full_reads()[0]["fields[]"] == "Quantity"
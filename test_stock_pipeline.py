@@ -0,0 +1,163 @@
+# ------------------------------------------------------------------------
+# PROVES: DIARI I DESCOMPTE IDEMPOTENT D'ESTOC (stock_pipeline.py)
+# ------------------------------------------------------------------------
+import json
+
+import pandas as pd
+import pytest
+
+import airtable_data
+import stock_pipeline
+from stock_pipeline import StockLedger, apply_stock_decrements, recover, sync_stock
+
+
+class FakeInventari:
+    """Stock a Airtable: update_airtable_records aplica els canvis, o en deixa caure/falla alguns."""
+
+    def __init__(self, stock):
+        self.stock = dict(stock)
+        self.patches = []
+        self.reject = set()         # Productes que Airtable rebutja
+        self.crash_after = False    # Aplica el PATCH i s'atura abans de tornar (procés mort)
+
+    def update(self, url, updates):
+        self.patches.append(updates)
+        updated = []
+        for rec_id, fields in updates:
+            if rec_id not in self.reject:
+                self.stock[rec_id] = fields["Stock"]
+                updated.append(rec_id)
+        if self.crash_after:
+            raise SystemExit("procés aturat")
+        failures = [{"record_id": r, "status": 422, "error": "rebutjat"} for r, _ in updates if r in self.reject]
+        return updated, failures
+
+
+@pytest.fixture
+def inventari(monkeypatch):
+    fake = FakeInventari({"recP1": 10, "recP2": 5})
+    monkeypatch.setattr(stock_pipeline, "_current_stock", lambda: {k: float(v) for k, v in fake.stock.items()})
+    monkeypatch.setattr(airtable_data, "update_airtable_records", fake.update)
+    return fake
+
+
+@pytest.fixture
+def ledger_path(tmp_path):
+    return str(tmp_path / "stock_ledger.jsonl")
+
+
+def lines(*rows):
+    return pd.DataFrame([{"record_id": r, "ProductID": [p] if p else None, "Quantity": q} for r, p, q in rows])
+
+
+LINES = lines(("recL1", "recP1", 2), ("recL2", "recP1", 3), ("recL3", "recP2", 1))
+
+
+def test_decrements_once_per_line(inventari, ledger_path):
+    ledger = StockLedger(ledger_path)
+    result = apply_stock_decrements(LINES, ledger)
+    assert inventari.stock == {"recP1": 5, "recP2": 4}
+    assert result.set_index("product")["stock_after"].to_dict() == {"recP1": 5, "recP2": 4}
+    assert result["updated"].all()
+
+    # La mateixa lectura (o una altra execució amb el diari desat) no torna a descomptar
+    assert apply_stock_decrements(LINES, ledger).empty
+    assert apply_stock_decrements(LINES, StockLedger(ledger_path)).empty
+    assert inventari.stock == {"recP1": 5, "recP2": 4} and len(inventari.patches) == 1
+
+
+def test_only_new_lines_are_decremented(inventari, ledger_path):
+    ledger = StockLedger(ledger_path)
+    apply_stock_decrements(LINES.iloc[:1], ledger)
+    apply_stock_decrements(LINES, ledger)
+    assert inventari.stock == {"recP1": 5, "recP2": 4}
+
+
+def test_crash_after_patch_is_not_applied_twice(inventari, ledger_path):
+    inventari.crash_after = True
+    with pytest.raises(SystemExit):
+        apply_stock_decrements(LINES, StockLedger(ledger_path))
+    inventari.crash_after = False
+
+    # En tornar a arrencar: intent sense commit, però el Stock ja és l'esperat
+    ledger = StockLedger(ledger_path)
+    assert set(ledger.open_products()) == {"recP1", "recP2"}
+    assert apply_stock_decrements(LINES, ledger).empty
+    assert inventari.stock == {"recP1": 5, "recP2": 4}
+    assert ledger.open_products() == {} and {"recL1", "recL2", "recL3"} <= ledger.applied
+
+
+def test_crash_before_patch_is_applied_on_retry(inventari, ledger_path):
+    ledger = StockLedger(ledger_path)
+    ledger.intend({"recP1": {"expected": 5.0, "lines": ["recL1", "recL2"]}})   # Aturat abans del PATCH
+
+    ledger = StockLedger(ledger_path)
+    result = apply_stock_decrements(LINES, ledger)
+    assert inventari.stock == {"recP1": 5, "recP2": 4}
+    assert set(result["product"]) == {"recP1", "recP2"}
+    with open(ledger_path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    resolved = [entry for entry in entries if "resolved" in entry]
+    assert len(resolved) == 1 and resolved[0]["products"] == {"recP1": False}
+
+
+def test_rejected_product_stays_pending_until_it_succeeds(inventari, ledger_path):
+    ledger = StockLedger(ledger_path)
+    inventari.reject = {"recP2"}
+    result = apply_stock_decrements(LINES, ledger).set_index("product")
+    assert result["updated"].to_dict() == {"recP1": True, "recP2": False}
+    assert "recL3" not in ledger.applied and set(ledger.open_products()) == {"recP2"}
+
+    inventari.reject = set()
+    apply_stock_decrements(LINES, ledger)
+    assert inventari.stock == {"recP1": 5, "recP2": 4}
+    assert "recL3" in ledger.applied and ledger.open_products() == {}
+
+
+def test_lines_of_unknown_products_wait(inventari, ledger_path):
+    ledger = StockLedger(ledger_path)
+    result = apply_stock_decrements(lines(("recL1", "recPX", 2), ("recL2", None, 1)), ledger)
+    assert result.empty and inventari.patches == []
+    assert "recL1" not in ledger.applied
+
+
+def test_recover_compares_with_expected_stock(ledger_path):
+    ledger = StockLedger(ledger_path)
+    ledger.intend({"recP1": {"expected": 5.0, "lines": ["recL1"]}, "recP2": {"expected": 4.0, "lines": ["recL3"]}})
+    assert recover(ledger, {"recP1": 5.0, "recP2": 5.0}) == 1
+    assert ledger.applied == {"recL1"} and ledger.open_products() == {}
+
+
+def test_baseline_and_truncated_last_line(ledger_path):
+    ledger = StockLedger(ledger_path)
+    ledger.baseline(["recL1", "recL2"])
+    with open(ledger_path, "a", encoding="utf-8") as f:
+        f.write('{"intent": "abc", "prod')    # El procés es va aturar escrivint
+    reloaded = StockLedger(ledger_path)
+    assert reloaded.has_baseline and reloaded.applied == {"recL1", "recL2"}
+    assert reloaded.open_products() == {}
+
+    # Les entrades noves no s'enganxen a la línia a mitges
+    reloaded.baseline(["recL3"])
+    assert StockLedger(ledger_path).applied == {"recL1", "recL2", "recL3"}
+
+
+def test_ui_line_that_failed_before_the_first_sync_is_still_decremented(inventari, ledger_path, monkeypatch):
+    def unreachable():
+        raise RuntimeError("Airtable no respon")
+
+    ledger = StockLedger(ledger_path)
+    new_line = lines(("recL4", "recP1", 4))
+    monkeypatch.setattr(stock_pipeline, "_current_stock", unreachable)
+    with pytest.raises(RuntimeError):
+        apply_stock_decrements(new_line, ledger)      # Pantalla de Detall comanda
+    monkeypatch.undo()
+    monkeypatch.setattr(stock_pipeline, "_current_stock", lambda: {k: float(v) for k, v in inventari.stock.items()})
+    monkeypatch.setattr(airtable_data, "update_airtable_records", inventari.update)
+    monkeypatch.setattr(airtable_data, "fetch_table", lambda *args, **kwargs: (pd.concat([LINES, new_line]), None))
+
+    # Primera sincronització: recL1-3 ja són a l'estoc actual, recL4 no
+    result = sync_stock(StockLedger(ledger_path))
+    assert result.set_index("product")["quantity"].to_dict() == {"recP1": 4}
+    assert inventari.stock == {"recP1": 6, "recP2": 5}
+    assert sync_stock(StockLedger(ledger_path)).empty